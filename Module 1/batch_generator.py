@@ -0,0 +1,141 @@
+###############################################################################
+# batch_generator.py  –  Generate many decks from a job manifest in one process
+###############################################################################
+"""
+Run every (folder, prompt, output) job of a JSONL or CSV manifest through
+deck_generator with one shared Azure OpenAI client.
+
+Jobs run on a thread pool. LLM requests from all jobs share a cap of
+--llm_concurrency in-flight calls, while reading input files and building
+pptx files happen outside that cap, so they overlap with other jobs'
+waits on the model. A JSON status report is written for the whole batch.
+
+Manifest rows need `folder` and `prompt`; `output` defaults to
+<output_dir>/<folder name>.pptx, with a numeric suffix when two folders
+share a name. Relative paths in the manifest are resolved against its
+directory, --output_dir against the current directory. Two jobs may not
+write the same output file.
+
+    python batch_generator.py --manifest jobs.jsonl --report report.json
+"""
+import argparse
+import csv
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import deck_generator
+from deck_generator import DeckGenerationError, add_generation_arguments, generate_deck
+from common.instrumentation import add_report_arguments, write_report_from_args
+
+
+def load_manifest(path: Path, output_dir: Path):
+    """Return a list of job dicts {folder, prompt, output} from JSONL or CSV"""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    base = path.parent
+    jobs, claimed = [], {}
+    for n, row in enumerate(rows, 1):
+        if not row.get("folder") or not row.get("prompt"):
+            raise ValueError(f"{path}: job {n} needs both 'folder' and 'prompt'")
+        folder = base / Path(row["folder"]).expanduser()
+        if row.get("output"):
+            output = (base / Path(row["output"]).expanduser()).resolve()
+        else:
+            output = (output_dir / f"{folder.name}.pptx").resolve()
+            suffix = 2
+            while output in claimed:
+                output = output.with_name(f"{folder.name}_{suffix}.pptx")
+                suffix += 1
+        if output in claimed:
+            raise ValueError(f"{path}: jobs {claimed[output]} and {n} both write {output}")
+        claimed[output] = n
+        jobs.append({
+            "job": n,
+            "folder": str(folder),
+            "prompt": row["prompt"],
+            "output": str(output),
+        })
+    return jobs
+
+
+def run_job(job, args, llm_slots):
+    """Generate one deck and return its status record"""
+    start = time.perf_counter()
+    status = dict(job)
+    try:
+        Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+        status["slides"] = generate_deck(job["folder"], job["prompt"], job["output"],
+                                         args, llm_slots=llm_slots)
+        status["status"] = "ok"
+    except DeckGenerationError as ex:
+        status.update(status="failed", error=str(ex))
+    except Exception as ex:
+        status.update(status="failed", error=f"{type(ex).__name__}: {ex}")
+    status["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"[job {job['job']}] {status['status']}: {job['output']}")
+    return status
+
+
+def run_batch(jobs, args, jobs_in_flight=16, llm_concurrency=8):
+    """Run all jobs and return their status records in manifest order"""
+    llm_slots = threading.BoundedSemaphore(max(1, llm_concurrency))
+    with ThreadPoolExecutor(max_workers=max(1, jobs_in_flight)) as pool:
+        return list(pool.map(lambda job: run_job(job, args, llm_slots), jobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate many PowerPoint decks from a job manifest')
+    parser.add_argument('--manifest', '-m', required=True, help='JSONL or CSV file of folder/prompt/output jobs')
+    parser.add_argument('--output_dir', default='decks', help='Folder for jobs without an output path (default: decks)')
+    parser.add_argument('--report', default='batch_report.json', help='Where to write the per-job status report')
+    parser.add_argument('--jobs', '-j', type=int, default=16, help='Decks processed at the same time (default: 16)')
+    parser.add_argument('--llm_concurrency', type=int, default=8,
+                        help='LLM requests in flight across all jobs (default: 8)')
+    add_generation_arguments(parser)
+    add_report_arguments(parser, "<report>.metrics.json")
+    args = parser.parse_args()
+
+    manifest = Path(args.manifest).expanduser()
+    try:
+        jobs = load_manifest(manifest, Path(args.output_dir).expanduser())
+    except (OSError, ValueError) as ex:
+        print(f"Error: could not read manifest: {ex}")
+        return
+
+    # One client (and connection pool) for every job in the batch
+    deck_generator.configure_llm(args)
+
+    print(f"Running {len(jobs)} jobs ({args.jobs} at a time, {args.llm_concurrency} LLM requests in flight)...")
+    start = time.perf_counter()
+    results = run_batch(jobs, args, jobs_in_flight=args.jobs, llm_concurrency=args.llm_concurrency)
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if r["status"] != "ok"]
+    report = {
+        "manifest": str(manifest),
+        "total": len(results),
+        "succeeded": len(results) - len(failed),
+        "failed": len(failed),
+        "seconds": round(elapsed, 3),
+        "jobs": results,
+    }
+    Path(args.report).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print(f"\n{report['succeeded']}/{len(results)} decks generated in {elapsed:.1f}s")
+    for r in failed:
+        print(f"  job {r['job']} ({r['folder']}): {r['error']}")
+    print(f"Status report written to {args.report}")
+    write_report_from_args(args, str(Path(args.report).with_suffix(".metrics.json")),
+                           decks=len(results), failed=len(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,63 @@
 ###############################################################################  
 # ppt_generator.py  –  AI slide-deck generator that outputs PowerPoint (.pptx)  
 ###############################################################################  
-import os, base64, mimetypes, json, textwrap, re, io, argparse
+import os, sys, base64, mimetypes, json, textwrap, re, argparse, contextlib, threading
 from pathlib import Path  
   
 from dotenv import load_dotenv  
-from langchain_openai import AzureChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from pptx import Presentation                 # pip install python-pptx  
-from pptx.util import Inches, Pt  
+# langchain, python-pptx and Pillow are imported where they are first used,  
+# so --help and argument errors return immediately  
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))   # repo root, for common/
+from common.llm_cache import CacheMissError, add_llm_cache_arguments, cached_llm_from_args
+from common.instrumentation import (add_report_arguments, record_llm_call, span,
+                                    write_report_from_args)
+from image_prep import (prepare_image_b64, b64_mime, DEFAULT_MAX_EDGE, DEFAULT_QUALITY,
+                        DEFAULT_FORMAT)
+from picture_embed import PictureEmbedder, DEFAULT_EMBED_DPI
+from image_dedup import ImageSet, dedupe_images, DEFAULT_DEDUP_DISTANCE
+from outline_mapreduce import map_reduce_markdown, DEFAULT_CHUNK_CHARS, DEFAULT_REDUCE_CHARS
+from slide_stream import iter_slides, read_ahead, until_broken
+import incremental
   
 ###############################################################################  
 # 1.  Azure OpenAI client  
 ###############################################################################  
 load_dotenv()  
 
-# Initialize Azure OpenAI client
-llm = AzureChatOpenAI(
-            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-            azure_deployment="gpt-4o",
-            api_version="2024-06-01",
-            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-            max_tokens=None,
-            temperature=0.7,
-)
+AZURE_DEPLOYMENT = "gpt-4o"
+TEMPERATURE = 0.7
+
+# Azure OpenAI client, built on first use by get_llm()
+llm = None
+_llm_lock = threading.Lock()
+
+def create_llm():
+    """Initialize Azure OpenAI client"""
+    from langchain_openai import AzureChatOpenAI
+    return AzureChatOpenAI(
+                azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+                azure_deployment=AZURE_DEPLOYMENT,
+                api_version="2024-06-01",
+                api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+                max_tokens=None,
+                temperature=TEMPERATURE,
+    )
+
+def get_llm():
+    """Return the shared client, creating it on first use"""
+    global llm
+    if llm is None:
+        with _llm_lock:
+            if llm is None:
+                llm = create_llm()
+    return llm
+
+def configure_llm(args):
+    """Put the shared client behind the response cache chosen on the command line"""
+    global llm
+    llm = cached_llm_from_args(llm or create_llm, args,
+                               deployment=AZURE_DEPLOYMENT, temperature=TEMPERATURE)
   
 ###############################################################################  
 # 2.  Helper functions  
@@ -33,18 +67,76 @@ IMG_EXT = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
 def image_to_b64(p: Path) -> str:  
     return base64.b64encode(p.read_bytes()).decode("utf-8")  
   
-def read_folder(folder: Path):  
-    """Return (markdown_text, images_dict {filename: b64}) for every file."""  
-    md_chunks, image_dict = [], {}  
-    for fp in folder.rglob("*"):  
-        if fp.suffix.lower() == ".md":  
-            md_chunks.append(fp.read_text(encoding="utf-8", errors="ignore"))  
-        elif fp.suffix.lower() in IMG_EXT:  
+def read_markdown_files(folder: Path):  
+    """Return [(relative_path, text)] for every markdown file."""  
+    return [(str(fp.relative_to(folder)), fp.read_text(encoding="utf-8", errors="ignore"))  
+            for fp in folder.rglob("*") if fp.suffix.lower() == ".md"]  
+  
+def read_images(folder: Path, max_edge=DEFAULT_MAX_EDGE, quality=DEFAULT_QUALITY,  
+                fmt=DEFAULT_FORMAT, only=None, dedup_distance=None):  
+    """Return images_dict {filename: b64} for every image file.  
+  
+    Images are downscaled to `max_edge` pixels and re-encoded before being  
+    base64-encoded; pass max_edge=None to send the original files. `only`  
+    limits the result to a set of relative paths. With `dedup_distance`,  
+    near-identical images are sent once and the others are listed in the  
+    result's `aliases` (see image_dedup).  
+    """  
+    files = [fp for fp in folder.rglob("*") if fp.suffix.lower() in IMG_EXT  
+             and (only is None or str(fp.relative_to(folder)) in only)]  
+    aliases = {}  
+    if dedup_distance is not None and len(files) > 1:  
+        files, clusters = dedupe_images(files, distance=dedup_distance)  
+        aliases = {rep.name: [fp.name for fp in members] for rep, members in clusters.items()}  
+        if clusters:  
+            skipped = sum(len(members) for members in clusters.values())  
+            print(f"Skipping {skipped} near-duplicate images ({len(files)} distinct)")  
+  
+    image_dict = ImageSet(aliases=aliases)  
+    for fp in files:  
+        if max_edge is None:  
             image_dict[fp.name] = image_to_b64(fp)  
-    return "\n\n".join(md_chunks), image_dict  
+        else:  
+            image_dict[fp.name] = prepare_image_b64(fp, max_edge=max_edge,  
+                                                    quality=quality, fmt=fmt)  
+    return image_dict  
   
-def build_initial_messages(prompt: str, md: str, images: dict):  
-    """First call – supply markdown text + pictures as context."""  
+def read_folder(folder: Path, args, only=None):  
+    """Return ([(relative_path, text)], images_dict) as set up by the parsed options.  
+  
+    `only` limits both to a set of relative paths.  
+    """  
+    with span("read_folder") as current:
+        md_files = [(name, text) for name, text in read_markdown_files(folder)  
+                    if only is None or name in only]  
+        images_dict = read_images(  
+            folder,  
+            max_edge=None if args.original_images else args.max_image_edge,  
+            quality=args.image_quality,  
+            fmt=args.image_format,  
+            only=only,  
+            dedup_distance=None if args.keep_duplicate_images else args.dedup_distance,  
+        )  
+        current.add("markdown_files", len(md_files))  
+        current.add("markdown_bytes", sum(len(text.encode("utf-8")) for _, text in md_files))  
+        current.add("images", len(images_dict))  
+        current.add("image_b64_bytes", sum(len(b64) for b64 in images_dict.values()))  
+    return md_files, images_dict  
+  
+def labelled_markdown(md_files):  
+    """Join markdown files with a marker naming each one, for source tracking."""  
+    return "\n\n".join(f"<!-- file: {name} -->\n{text}" for name, text in md_files)  
+  
+def build_initial_messages(prompt: str, md: str, images: dict, track_sources=False):  
+    """First call – supply markdown text + pictures as context.  
+  
+    With track_sources, every slide must also list the markdown files it is  
+    based on (used by incremental regeneration).  
+    """  
+    sources_rule = textwrap.dedent("""  
+        • Add "sources":["file.md"] to every slide: the markdown files  
+          (named in the <!-- file: ... --> markers) the slide is based on.  
+    """) if track_sources else ""  
     sys_msg = {  
         "role": "system",  
         "content": textwrap.dedent("""  
@@ -65,7 +157,7 @@ def build_initial_messages(prompt: str, md: str, images: dict):
             • The file names in the images array MUST match exactly the files  
               you have been shown (case-sensitive).  
             • Do NOT embed base-64.  Do NOT output HTML.  
-        """).strip(),  
+        """).strip() + sources_rule.rstrip(),  
     }  
   
     user_parts = [{"type": "text", "text": prompt}]  
@@ -74,17 +166,20 @@ def build_initial_messages(prompt: str, md: str, images: dict):
                            "text": f"\n\nHere are the markdown files:\n\n{md}"})  
     for fn, b64 in images.items():  
         mime, _ = mimetypes.guess_type(fn)  
-        mime = mime or "image/png"  
+        mime = b64_mime(b64, default=mime or "image/png")   # may be re-encoded  
         # show model the actual picture  
         user_parts.append({  
             "type": "image_url",  
             "image_url": {"url": f"data:{mime};base64,{b64}"},  
         })  
-        user_parts.append({"type": "text", "text": f"(filename: {fn})"})  
+        same = getattr(images, "aliases", {}).get(fn)  
+        label = f"(filename: {fn}; same image as: {', '.join(same)})" if same else f"(filename: {fn})"  
+        user_parts.append({"type": "text", "text": label})  
   
     return [sys_msg, {"role": "user", "content": user_parts}]  
   
 def openai_call(messages):  
+    from langchain_core.messages import HumanMessage, SystemMessage
     messages_mod = [
             SystemMessage(
                 content="You are a slide deck generator that creates PowerPoint presentations. Return only valid JSON following the specified format."
@@ -92,10 +187,23 @@ def openai_call(messages):
             HumanMessage(content=messages),
     ]
 
-    resp = llm.invoke(messages)
+    with span("openai_call") as current:
+        resp = get_llm().invoke(messages)
+        record_llm_call(current, messages, resp)
     
     return resp.content.strip()  
   
+def openai_stream(messages):  
+    """Yield the reply text chunk by chunk as the model produces it."""  
+    with span("openai_stream") as current:
+        parts, last = [], None
+        for chunk in get_llm().stream(messages):  
+            last = chunk if getattr(chunk, "usage_metadata", None) else last
+            if chunk.content:  
+                parts.append(chunk.content)
+                yield chunk.content  
+        record_llm_call(current, messages, last, text="".join(parts))
+  
 def parse_slides_json(raw: str) -> dict:  
     """  
     Ensure the assistant reply is valid JSON.  
@@ -108,78 +216,277 @@ def parse_slides_json(raw: str) -> dict:
   
 # -------------------------- PowerPoint generation -------------------------  
   
-def build_pptx(slides_dict: dict, folder: Path) -> bytes:  
-    prs = Presentation()  
+def add_slide(prs, slide_data: dict, folder: Path, embedder=None):  
+    """Append one slide from the JSON schema to `prs`.  
+  
+    Pictures go through `embedder` (a PictureEmbedder), which resamples  
+    them to their displayed size; by default a new one at the default DPI.  
+    """  
+    embedder = embedder or PictureEmbedder()
+    from pptx.util import Inches, Pt  
     title_content_layout = prs.slide_layouts[1]   # Title and Content  
   
-    for slide_data in slides_dict.get("slides", []):  
-        title_text   = slide_data.get("title", "")  
-        bullets      = slide_data.get("points", []) or []  
-        images       = slide_data.get("images", []) or []  
-        notes_text   = slide_data.get("notes", "")  
-  
-        slide = prs.slides.add_slide(title_content_layout)  
-  
-        # Title  
-        slide.shapes.title.text = title_text  
-  
-        # Bullets  
-        body = slide.shapes.placeholders[1].text_frame  
-        body.clear()                 # remove default bullet  
-        for idx, b in enumerate(bullets):  
-            p = body.add_paragraph() if idx else body.paragraphs[0]  
-            p.text  = b  
-            p.level = 0  
-            p.font.size = Pt(18)  
-  
-        # Images – stack under the body placeholder  
-        pic_left = Inches(5.5)      # right-hand side  
-        pic_top  = Inches(1.5)  
-        maxw     = Inches(3.0)  
-        for img in images:  
-            img_path = folder / img  
-            if img_path.exists():  
-                slide.shapes.add_picture(str(img_path), pic_left, pic_top,  
-                                          width=maxw)  
-                pic_top += Inches(2.5)  
-  
-        # Speaker notes  
-        if notes_text:  
-            notes = slide.notes_slide.notes_text_frame  
-            notes.text = notes_text  
+    title_text   = slide_data.get("title", "")  
+    bullets      = slide_data.get("points", []) or []  
+    images       = slide_data.get("images", []) or []  
+    notes_text   = slide_data.get("notes", "")  
+  
+    slide = prs.slides.add_slide(title_content_layout)  
+  
+    # Title  
+    slide.shapes.title.text = title_text  
+  
+    # Bullets  
+    body = slide.shapes.placeholders[1].text_frame  
+    body.clear()                 # remove default bullet  
+    for idx, b in enumerate(bullets):  
+        p = body.add_paragraph() if idx else body.paragraphs[0]  
+        p.text  = b  
+        p.level = 0  
+        p.font.size = Pt(18)  
+  
+    # Images – stack under the body placeholder  
+    pic_left = Inches(5.5)      # right-hand side  
+    pic_top  = Inches(1.5)  
+    maxw     = Inches(3.0)  
+    for img in images:  
+        img_path = folder / img  
+        if img_path.exists():  
+            embedder.add_picture(slide, img_path, pic_left, pic_top, maxw)  
+            pic_top += Inches(2.5)  
+  
+    # Speaker notes  
+    if notes_text:  
+        notes = slide.notes_slide.notes_text_frame  
+        notes.text = notes_text  
+  
+    return slide  
+  
+def build_pptx(slides_dict: dict, folder: Path, embedder=None) -> bytes:  
+    from pptx import Presentation                 # pip install python-pptx  
+    with span("build_pptx") as current:
+        prs = Presentation()  
+        embedder = embedder or PictureEmbedder()  
+  
+        for slide_data in slides_dict.get("slides", []):  
+            add_slide(prs, slide_data, folder, embedder)  
+        current.add("slides", len(prs.slides))
   
     return prs
 
+def build_pptx_streaming(chunks, folder: Path, embedder=None):
+    """
+    Build the deck from a stream of reply text, adding each slide as soon as
+    its JSON object is complete. If the stream breaks off, the slides
+    received so far are kept; errors while building a slide propagate.
+    """
+    from pptx import Presentation
+    prs = Presentation()
+    embedder = embedder or PictureEmbedder()
+    errors = []
+    for n, slide_data in enumerate(iter_slides(until_broken(chunks, errors, fatal=CacheMissError)), 1):
+        add_slide(prs, slide_data, folder, embedder)
+        print(f"Added slide {n}: {slide_data.get('title', '')}")
+    if errors:
+        print(f"Warning: reply stream interrupted after {len(prs.slides)} slides: {errors[0]}")
+    return prs
+
 def save_presentation(prs, output_path):
     """Save the presentation to the specified path"""
-    prs.save(output_path)
+    with span("save_pptx") as current:
+        prs.save(output_path)
+        current.add("bytes", os.path.getsize(output_path))
     print(f"Presentation saved to {output_path}")
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description='Generate PowerPoint presentations using AI')
-    parser.add_argument('--folder', '-f', required=True, help='Path to folder with markdown and images')
-    parser.add_argument('--prompt', '-p', required=True, help='Prompt describing what slides to generate')
-    parser.add_argument('--output', '-o', default='deck.pptx', help='Output PowerPoint file name')
-    args = parser.parse_args()
+class DeckGenerationError(Exception):
+    """A deck could not be generated; the message is meant for the user."""
+
+def add_generation_arguments(parser):
+    """Add the options shared by every deck-generating CLI"""
+    parser.add_argument('--max_image_edge', type=int, default=DEFAULT_MAX_EDGE,
+                        help=f'Downscale images sent to the model to this many pixels on the long edge, 0 to keep size (default: {DEFAULT_MAX_EDGE})')
+    parser.add_argument('--image_quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'JPEG/WebP quality for images sent to the model (default: {DEFAULT_QUALITY})')
+    parser.add_argument('--image_format', default=DEFAULT_FORMAT, choices=['auto', 'jpeg', 'png', 'webp'],
+                        help='Format for images sent to the model; auto keeps transparency as PNG (default: auto)')
+    parser.add_argument('--original_images', action='store_true',
+                        help='Send images to the model exactly as they are on disk')
+    parser.add_argument('--dedup_distance', type=int, default=DEFAULT_DEDUP_DISTANCE,
+                        help='Send near-identical images once: images whose perceptual hashes differ in at most '
+                             f'this many of 64 bits count as one (default: {DEFAULT_DEDUP_DISTANCE})')
+    parser.add_argument('--keep_duplicate_images', action='store_true',
+                        help='Send every image, even near-duplicates')
+    parser.add_argument('--embed_dpi', type=int, default=DEFAULT_EMBED_DPI,
+                        help='Resample pictures in the deck to their displayed size at this DPI, '
+                             f'0 to embed the original files (default: {DEFAULT_EMBED_DPI})')
+    parser.add_argument('--chunked', choices=['auto', 'always', 'never'], default='auto',
+                        help='Summarise markdown in parallel chunks before building slides; '
+                             f'auto does so above {DEFAULT_REDUCE_CHARS} characters (default: auto)')
+    parser.add_argument('--chunk_chars', type=int, default=DEFAULT_CHUNK_CHARS,
+                        help=f'Markdown characters per summarisation request (default: {DEFAULT_CHUNK_CHARS})')
+    parser.add_argument('--concurrency', '-c', type=int, default=8,
+                        help='Parallel summarisation requests in chunked mode (default: 8)')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream the reply and add slides as they arrive; keeps a partial deck if the stream breaks')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep a manifest next to the output and on later runs regenerate only '
+                             'the slides whose source files changed (ignores --stream)')
+    add_llm_cache_arguments(parser)
+
+UPDATE_INSTRUCTIONS = textwrap.dedent("""
+    Return ONLY the slides marked [REPLACE], rewritten from the files below,
+    plus any new slides needed for material that no slide covers yet.
+    Give every replacement a "replaces" field with the number of the slide
+    it replaces; leave it out for new slides. Slides to replace:
+""").strip()
+
+def slide_entry(slide_data: dict, hashes: dict):
+    """Manifest record for a slide: its JSON plus the files it depends on"""
+    return {"data": slide_data,
+            "deps": sorted(incremental.slide_dependencies(slide_data, hashes))}
+
+def update_deck(folder_path, prompt, output_path, args, call, embedder=None):
+    """
+    Incremental run: regenerate only the slides whose source files changed
+    and splice them into the existing deck. Returns the slide count, or None
+    when there is nothing to update from and a full build is needed.
+    """
+    manifest_file = incremental.manifest_path(output_path)
+    manifest = incremental.load_manifest(manifest_file)
+    if manifest is None or not Path(output_path).exists():
+        return None
     
-    # Convert folder path to Path object and validate
-    folder_path = Path(args.folder).expanduser()
-    if not folder_path.is_dir():
-        print(f"Error: {args.folder} is not a valid directory")
-        return
+    from pptx import Presentation
+    hashes = incremental.file_hashes(folder_path, IMG_EXT)
+    prs = Presentation(output_path)
+    plan = incremental.plan_update(manifest, hashes, prompt, len(prs.slides))
+    if plan is None:
+        print("Deck no longer matches its manifest; rebuilding from scratch...")
+        return None
+    affected, changed, removed = plan
+    if not changed and not removed:
+        print("No source files changed; deck is up to date")
+        return len(prs.slides)
+    print(f"{len(changed)} changed and {len(removed)} removed files affect "
+          f"{len(affected)} of {len(prs.slides)} slides")
+    
+    # Context: the changed files plus everything the affected slides were built from
+    needed = set(changed)
+    for i in affected:
+        needed.update(manifest["slides"][i]["deps"])
+    needed -= removed
+    md_files, images_dict = read_folder(folder_path, args, only=needed)
+    
+    outline = "\n".join(
+        f"{i+1}. {entry['data'].get('title', '')}" + ("   [REPLACE]" if i in affected else "")
+        for i, entry in enumerate(manifest["slides"])
+    )
+    to_replace = [dict(manifest["slides"][i]["data"], replaces=i + 1) for i in affected]
+    update_prompt = "\n\n".join([
+        prompt,
+        f"You are updating an existing deck. Its current outline is:\n{outline}",
+        f"Changed or new files: {', '.join(sorted(changed)) or 'none'}\n"
+        f"Deleted files: {', '.join(sorted(removed)) or 'none'}",
+        UPDATE_INSTRUCTIONS + "\n" + json.dumps(to_replace, indent=1),
+    ])
     
+    print(f"Regenerating {len(affected)} slides with AI...")
+    openai_messages = build_initial_messages(update_prompt, labelled_markdown(md_files),
+                                             images_dict, track_sources=True)
+    new_slides = parse_slides_json(call(openai_messages)).get("slides", [])
+    
+    placed = incremental.place_replacements(
+        affected, new_slides, incremental.orphaned_slides(manifest, affected, removed))
+    order = incremental.splice_slides(prs, affected, placed,
+                                      lambda p, data: add_slide(p, data, folder_path, embedder))
+    save_presentation(prs, output_path)
+    incremental.save_manifest(manifest_file, prompt, hashes, [
+        manifest["slides"][item] if isinstance(item, int) else slide_entry(item, hashes)
+        for item in order
+    ])
+    return len(prs.slides)
+
+def build_request(folder_path, prompt, args, call):
+    """
+    Read the folder and return the messages for the slide request.
+
+    Large markdown corpora are first condensed by parallel `call`s, as
+    chosen by args.chunked.
+    """
     # Read content from the folder
     print(f"Reading content from {folder_path}...")
-    md_text, images_dict = read_folder(folder_path)
+    md_files, images_dict = read_folder(folder_path, args)
+    if args.incremental:
+        md_text = labelled_markdown(md_files)
+    else:
+        md_text = "\n\n".join(text for _, text in md_files)
+    
+    # Condense large corpora with parallel map calls before the final request
+    if args.chunked == 'always' or (args.chunked == 'auto' and len(md_text) > DEFAULT_REDUCE_CHARS):
+        md_text = map_reduce_markdown(call, prompt, md_files,
+                                      max_chars=args.chunk_chars,
+                                      concurrency=args.concurrency)
     
     # Build the initial messages
     print("Building request for AI model...")
-    openai_messages = build_initial_messages(args.prompt, md_text, images_dict)
+    return build_initial_messages(prompt, md_text, images_dict,
+                                  track_sources=args.incremental)
+
+def generate_deck(folder, prompt, output_path, args, llm_slots=None):
+    """
+    Generate one deck from `folder` and save it to `output_path`.
+
+    `args` carries the options from add_generation_arguments. `llm_slots`
+    (e.g. a Semaphore shared by several decks) is held around every LLM
+    request so reading files and building slides never wait on it.
+    Returns the number of slides; raises DeckGenerationError on failure.
+    """
+    llm_slots = llm_slots or contextlib.nullcontext()
+    
+    def call(messages):
+        with llm_slots:
+            return openai_call(messages)
     
-    # Call OpenAI
-    print("Generating slide content with AI...")
-    raw_reply = openai_call(openai_messages)
+    # Convert folder path to Path object and validate
+    folder_path = Path(folder).expanduser()
+    if not folder_path.is_dir():
+        raise DeckGenerationError(f"{folder} is not a valid directory")
+    embedder = PictureEmbedder(dpi=args.embed_dpi)
+    
+    if args.incremental:
+        try:
+            slide_count = update_deck(folder_path, prompt, output_path, args, call, embedder)
+        except CacheMissError as ex:
+            raise DeckGenerationError(str(ex)) from ex
+        except Exception as ex:
+            raise DeckGenerationError(f"Could not update PowerPoint: {ex}") from ex
+        if slide_count is not None:
+            return slide_count
+    
+    try:
+        openai_messages = build_request(folder_path, prompt, args, call)
+        
+        if args.stream and not args.incremental:
+            # Stream the reply, adding slides to the deck as they complete
+            print("Streaming slide content from AI...")
+            # The LLM slot is held only while the reply is read, not while slides are built
+            chunks = read_ahead(openai_stream(openai_messages), hold=llm_slots)
+            try:
+                prs = build_pptx_streaming(chunks, folder_path, embedder)
+            except CacheMissError:
+                raise
+            except Exception as ex:
+                raise DeckGenerationError(f"Could not build PowerPoint: {ex}") from ex
+            if not len(prs.slides):
+                raise DeckGenerationError("Could not build PowerPoint: no complete slides received")
+            save_presentation(prs, output_path)
+            return len(prs.slides)
+        
+        # Call OpenAI
+        print("Generating slide content with AI...")
+        raw_reply = call(openai_messages)
+    except CacheMissError as ex:
+        raise DeckGenerationError(str(ex)) from ex
     
     # Parse the JSON response
     try:
@@ -188,15 +495,41 @@ def main():
         
         # Build the PowerPoint presentation
         print("Building PowerPoint presentation...")
-        prs = build_pptx(slides_dict, folder_path)
+        prs = build_pptx(slides_dict, folder_path, embedder)
         
         # Save the presentation
-        output_path = args.output
         save_presentation(prs, output_path)
         
+        # Record which files each slide came from for the next incremental run
+        if args.incremental:
+            hashes = incremental.file_hashes(folder_path, IMG_EXT)
+            incremental.save_manifest(incremental.manifest_path(output_path), prompt, hashes,
+                                      [slide_entry(data, hashes) for data in slides_dict.get("slides", [])])
+        
     except Exception as ex:
-        print(f"Error: Could not build PowerPoint: {ex}")
+        raise DeckGenerationError(f"Could not build PowerPoint: {ex}") from ex
+    return len(prs.slides)
+
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description='Generate PowerPoint presentations using AI')
+    parser.add_argument('--folder', '-f', required=True, help='Path to folder with markdown and images')
+    parser.add_argument('--prompt', '-p', required=True, help='Prompt describing what slides to generate')
+    parser.add_argument('--output', '-o', default='deck.pptx', help='Output PowerPoint file name')
+    add_generation_arguments(parser)
+    add_report_arguments(parser, "<output>.metrics.json")
+    args = parser.parse_args()
+    
+    # Serve repeated requests from the local response cache
+    configure_llm(args)
+    
+    try:
+        generate_deck(args.folder, args.prompt, args.output, args)
+    except DeckGenerationError as ex:
+        print(f"Error: {ex}")
         return
+    finally:
+        write_report_from_args(args, f"{args.output}.metrics.json")
 
 if __name__ == "__main__":
     main()
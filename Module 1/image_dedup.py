@@ -0,0 +1,100 @@
+"""
+Find near-identical input images before they are sent to the model.
+
+Asset folders often hold the same screenshot several times, or one image
+exported at several sizes. Each image gets a 64-bit difference hash (dHash)
+of a 9x8 greyscale thumbnail plus its mean colour; images whose hashes
+differ in at most `distance` bits and whose mean colours are close form a
+cluster. Only one representative per cluster (the largest) is sent; the
+others are listed as aliases so the model may still name any of them.
+Hashing runs in a thread pool, since Pillow releases the GIL while
+decoding.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_DEDUP_DISTANCE = 6
+HASH_SIZE = 8
+COLOUR_TOLERANCE = 24         # max difference of the mean R, G or B (0-255)
+
+
+class ImageSet(dict):
+    """{filename: b64} of the images to send, plus `aliases` {filename: [duplicates]}"""
+
+    def __init__(self, images=(), aliases=None):
+        super().__init__(images)
+        self.aliases = aliases or {}
+
+
+def image_fingerprint(path):
+    """(dhash, mean RGB, pixel count) of an image file, or None if unreadable"""
+    import numpy as np
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            area = img.width * img.height
+            img.draft("RGB", (HASH_SIZE * 4, HASH_SIZE * 4))    # fast JPEG decode at reduced size
+            small = img.convert("RGB").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    except (OSError, ValueError):
+        return None
+    pixels = np.asarray(small, dtype=np.float32)
+    grey = pixels @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    bits = (grey[:, 1:] > grey[:, :-1]).ravel()
+    dhash = int.from_bytes(np.packbits(bits).tobytes(), "big")
+    return dhash, pixels.mean(axis=(0, 1)), area
+
+
+def fingerprint_images(paths, workers=None):
+    """{path: fingerprint} for every path, hashed in a thread pool"""
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(paths, pool.map(image_fingerprint, paths)))
+
+
+def cluster_images(fingerprints, distance=DEFAULT_DEDUP_DISTANCE):
+    """Group paths whose fingerprints match; returns a list of clusters (lists of paths)"""
+    import numpy as np
+    paths = [p for p, fp in fingerprints.items() if fp is not None]
+    parent = list(range(len(paths)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if paths:
+        hashes = np.array([fingerprints[p][0] for p in paths], dtype=np.uint64)
+        colours = np.array([fingerprints[p][1] for p in paths])
+        popcount = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+        for i in range(len(paths) - 1):
+            xor = (hashes[i + 1:] ^ hashes[i]).view(np.uint8).reshape(-1, 8)
+            bits = popcount[xor].sum(axis=1, dtype=np.int32)
+            close = np.abs(colours[i + 1:] - colours[i]).max(axis=1) <= COLOUR_TOLERANCE
+            for j in np.nonzero((bits <= distance) & close)[0]:
+                parent[find(i + 1 + int(j))] = find(i)
+
+    clusters = {}
+    for i, path in enumerate(paths):
+        clusters.setdefault(find(i), []).append(path)
+    unreadable = [[p] for p, fp in fingerprints.items() if fp is None]
+    return list(clusters.values()) + unreadable
+
+
+def dedupe_images(paths, distance=DEFAULT_DEDUP_DISTANCE, workers=None):
+    """
+    Return (representatives, aliases) for image `paths`.
+
+    The representative of a cluster is its largest image (ties: first by
+    name); `aliases` maps it to the paths of the other members.
+    """
+    fingerprints = fingerprint_images(list(paths), workers)
+    representatives, aliases = [], {}
+    for cluster in cluster_images(fingerprints, distance):
+        cluster.sort(key=lambda p: (-(fingerprints[p] or (0, 0, 0))[2], str(p)))
+        representatives.append(cluster[0])
+        if len(cluster) > 1:
+            aliases[cluster[0]] = cluster[1:]
+    order = {p: n for n, p in enumerate(paths)}
+    representatives.sort(key=order.get)
+    return representatives, aliases
@@ -0,0 +1,92 @@
+"""
+Downscale and re-encode input images before they are sent to the model.
+
+The model never needs full-resolution phone photos, so every image is
+resized to fit a maximum edge length and re-encoded. Results are kept in a
+thumbnail cache keyed by the file's content hash and mtime plus the
+encoding settings, so repeat runs skip the resize entirely. The original
+files are left untouched for build_pptx.
+"""
+import base64
+import hashlib
+import io
+import os
+from pathlib import Path
+
+DEFAULT_MAX_EDGE = 1536
+DEFAULT_QUALITY = 85
+DEFAULT_FORMAT = "auto"       # PNG for images with transparency, JPEG otherwise
+THUMBNAIL_CACHE_DIR = Path(os.getenv(
+    "THUMBNAIL_CACHE_DIR", Path.home() / ".cache" / "deck_automation" / "thumbnails"))
+
+
+def _has_alpha(img):
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def encode_image(data: bytes, max_edge=DEFAULT_MAX_EDGE, quality=DEFAULT_QUALITY,
+                 fmt=DEFAULT_FORMAT) -> bytes:
+    """Resize image bytes to fit `max_edge` (0 keeps the size) and re-encode them"""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)          # phone photos store rotation in EXIF
+        fmt = fmt.upper()
+        if fmt == "AUTO":
+            fmt = "PNG" if _has_alpha(img) else "JPEG"
+        if max_edge and max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if fmt == "JPEG":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA")
+        out = io.BytesIO()
+        save_kwargs = {"optimize": True} if fmt == "PNG" else {"quality": quality}
+        img.save(out, format=fmt, **save_kwargs)
+    return out.getvalue()
+
+
+def prepare_image_b64(p: Path, max_edge=DEFAULT_MAX_EDGE, quality=DEFAULT_QUALITY,
+                      fmt=DEFAULT_FORMAT, cache_dir=THUMBNAIL_CACHE_DIR) -> str:
+    """
+    Return the base64 of a downscaled copy of image `p`.
+
+    Falls back to the original bytes if Pillow cannot read the file.
+    """
+    data = p.read_bytes()
+    key = hashlib.sha256(data).hexdigest()
+    settings = f"{p.stat().st_mtime_ns}_{max_edge}_{quality}_{fmt.lower()}"
+    cached = None
+    if cache_dir is not None:
+        cached = Path(cache_dir) / key[:2] / f"{key}_{settings}"
+        if cached.exists():
+            return base64.b64encode(cached.read_bytes()).decode("utf-8")
+
+    try:
+        encoded = encode_image(data, max_edge=max_edge, quality=quality, fmt=fmt)
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not downscale {p.name} ({e}); sending original")
+        return base64.b64encode(data).decode("utf-8")
+
+    # Only keep the re-encoded copy if it is actually smaller
+    if len(encoded) >= len(data) and (p.suffix.lower() in (".jpg", ".jpeg", ".png", ".webp")):
+        encoded = data
+    if cached is not None:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(encoded)
+        os.replace(tmp, cached)
+    return base64.b64encode(encoded).decode("utf-8")
+
+
+def b64_mime(b64: str, default="image/png") -> str:
+    """Sniff the image type of base64 data from its magic bytes"""
+    head = base64.b64decode(b64[:16])
+    if head.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    return default
@@ -0,0 +1,177 @@
+"""
+Incremental deck regeneration driven by a content-hash manifest.
+
+A manifest saved next to the output deck records the hash of every source
+file and, for each slide, the slide JSON and the files it was built from
+(its `sources` plus the images it shows). On the next run only the slides
+whose sources changed or disappeared are sent back to the model, and the
+replacements are spliced into the existing pptx; every other slide is kept
+exactly as it is.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+SOURCE_EXT = {".md"}
+
+
+def manifest_path(output_path):
+    """Manifest file that belongs to an output deck"""
+    return Path(f"{output_path}.manifest.json")
+
+
+def file_hashes(folder: Path, image_ext):
+    """Return {relative_path: sha256} for every markdown and image file"""
+    hashes = {}
+    for fp in sorted(folder.rglob("*")):
+        suffix = fp.suffix.lower()
+        if fp.is_file() and (suffix in SOURCE_EXT or suffix in image_ext):
+            hashes[str(fp.relative_to(folder))] = hashlib.sha256(fp.read_bytes()).hexdigest()
+    return hashes
+
+
+def load_manifest(path: Path):
+    """Return the saved manifest, or None if it is missing or unreadable"""
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(path: Path, prompt, hashes, slides):
+    """Atomically write the manifest for a deck"""
+    manifest = {"version": MANIFEST_VERSION, "prompt": prompt, "files": hashes, "slides": slides}
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def slide_dependencies(slide_data, hashes):
+    """Files a slide depends on: its declared sources plus the images it shows"""
+    by_name = {}
+    for rel in hashes:
+        by_name.setdefault(Path(rel).name, []).append(rel)
+    deps = set()
+    for ref in (slide_data.get("sources") or []) + (slide_data.get("images") or []):
+        if ref in hashes:
+            deps.add(ref)
+        else:
+            deps.update(by_name.get(Path(ref).name, [ref]))
+    return deps
+
+
+def plan_update(manifest, hashes, prompt, slide_count):
+    """
+    Work out what an incremental run has to regenerate.
+
+    Returns None when the deck must be rebuilt from scratch (no manifest,
+    different prompt, or the deck no longer matches the manifest), otherwise
+    (affected_slide_indices, changed_files, removed_files). A slide with no
+    recorded dependencies is treated as depending on every file.
+    """
+    if manifest is None or manifest.get("prompt") != prompt:
+        return None
+    if len(manifest.get("slides", [])) != slide_count:
+        return None
+    old = manifest.get("files", {})
+    changed = {f for f, h in hashes.items() if old.get(f) != h}
+    removed = set(old) - set(hashes)
+    dirty = changed | removed
+    affected = []
+    if dirty:
+        for i, slide in enumerate(manifest["slides"]):
+            deps = set(slide.get("deps", []))
+            if not deps or deps & dirty:
+                affected.append(i)
+    return affected, changed, removed
+
+
+def orphaned_slides(manifest, affected, removed):
+    """Affected slides whose recorded dependencies were all removed"""
+    gone = []
+    for i in affected:
+        deps = set(manifest["slides"][i].get("deps", []))
+        if deps and deps <= removed:
+            gone.append(i)
+    return gone
+
+
+def place_replacements(affected, replacements, orphaned=()):
+    """
+    Decide where replacement slides go.
+
+    Each replacement may carry `"replaces": <1-based slide number>`; it then
+    takes that slide's place. Others follow the last affected slide (or go
+    to the end of the deck when nothing was affected). An affected slide
+    that nothing replaces is kept, unless it is in `orphaned` (all of its
+    sources were removed), in which case it is deleted. Returns
+    {original_index or None: [original_index or slide_data, ...]}, where
+    None means append.
+    """
+    placed = {i: [] for i in affected}
+    extra = []
+    for slide in replacements:
+        target = slide.pop("replaces", None)
+        try:
+            target = int(target) - 1
+        except (TypeError, ValueError):
+            target = None
+        if target in placed:
+            placed[target].append(slide)
+        else:
+            extra.append(slide)
+    for i, slides in placed.items():
+        if not slides and i not in orphaned:
+            slides.append(i)
+    anchor = affected[-1] if affected else None
+    placed.setdefault(anchor, []).extend(extra)
+    return placed
+
+
+def remove_slide(prs, index):
+    """Drop slide `index` and its relationship from the presentation"""
+    sld_ids = prs.slides._sldIdLst
+    sld_id = sld_ids[index]
+    prs.part.drop_rel(sld_id.rId)
+    sld_ids.remove(sld_id)
+
+
+def splice_slides(prs, affected, placed, add_slide):
+    """
+    Replace the `affected` slides of `prs` in place.
+
+    `placed` comes from place_replacements; `add_slide(prs, slide_data)`
+    appends a slide. Affected slides that `placed` keeps stay as they are.
+    Returns the new deck order as a list whose items are either an original
+    slide index (kept as is) or a new slide_data dict.
+    """
+    sld_ids = prs.slides._sldIdLst
+    original = list(sld_ids)
+    order = []
+    for i, _ in enumerate(original):
+        if i in placed:
+            order.extend(placed[i])
+        else:
+            order.append(i)
+    order.extend(placed.get(None, []))
+
+    # Build new slides at the end, then put every sldId into the final order
+    elements = []
+    for item in order:
+        if isinstance(item, int):
+            elements.append(original[item])
+        else:
+            add_slide(prs, item)
+            elements.append(sld_ids[-1])
+    kept = {item for item in order if isinstance(item, int)}
+    for i in sorted(set(affected) - kept, reverse=True):
+        remove_slide(prs, i)
+    for el in elements:
+        sld_ids.remove(el)
+        sld_ids.append(el)
+    return order
@@ -0,0 +1,110 @@
+"""
+Map-reduce outline generation for markdown corpora too large for one request.
+
+The markdown is split by file and heading into chunks, each chunk is
+summarised by a parallel LLM call (map), and the summaries are handed to
+the normal slide-building request in place of the raw markdown (reduce).
+If the summaries themselves are still too large they are merged again in
+further parallel rounds until they fit.
+"""
+import re
+import textwrap
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_CHUNK_CHARS = 24000       # markdown per map request
+DEFAULT_REDUCE_CHARS = 60000      # summaries allowed into the final request
+
+_HEADING = re.compile(r"^#{1,6}\s")
+
+MAP_SYSTEM_MESSAGE = textwrap.dedent("""
+    You condense documentation into material for a slide deck.
+    Summarise the markdown you are given as concise bullet points under
+    short headings. Keep facts, figures, names, conclusions and any image
+    file names that are referenced. Drop boilerplate and repetition.
+    Return markdown only.
+""").strip()
+
+
+def split_sections(text):
+    """Split markdown into sections, each starting at a heading line"""
+    sections, current = [], []
+    for line in text.splitlines(keepends=True):
+        if _HEADING.match(line) and current:
+            sections.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append("".join(current))
+    return sections
+
+
+def _hard_split(section, max_chars):
+    """Split an oversized section at paragraph breaks, then at max_chars"""
+    pieces, current = [], ""
+    for para in re.split(r"(?<=\n\n)", section):
+        while len(para) > max_chars:
+            pieces.append(para[:max_chars])
+            para = para[max_chars:]
+        if current and len(current) + len(para) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += para
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def chunk_markdown(md_files, max_chars=DEFAULT_CHUNK_CHARS):
+    """
+    Pack [(source_name, text)] into chunks of at most `max_chars`.
+
+    Chunks never span files, and sections are only split mid-way when a
+    single section is larger than the budget. Returns [(source_name, text)].
+    """
+    chunks = []
+    for name, text in md_files:
+        current = ""
+        for section in split_sections(text):
+            for piece in _hard_split(section, max_chars):
+                if current and len(current) + len(piece) > max_chars:
+                    chunks.append((name, current))
+                    current = ""
+                current += piece
+        if current.strip():
+            chunks.append((name, current))
+    return chunks
+
+
+def summarise_chunk(call, prompt, name, text):
+    """Map step: one LLM call condensing one chunk"""
+    messages = [
+        {"role": "system", "content": MAP_SYSTEM_MESSAGE},
+        {"role": "user", "content": f"The deck being built: {prompt}\n\n"
+                                    f"Source: {name}\n\n{text}"},
+    ]
+    return name, call(messages)
+
+
+def map_reduce_markdown(call, prompt, md_files, max_chars=DEFAULT_CHUNK_CHARS,
+                        reduce_chars=DEFAULT_REDUCE_CHARS, concurrency=8):
+    """
+    Condense [(source_name, text)] into markdown that fits one request.
+
+    `call` takes a list of messages and returns the reply text (openai_call).
+    Chunks are summarised `concurrency` at a time; rounds repeat until the
+    combined summaries are under `reduce_chars`.
+    """
+    chunks = chunk_markdown(md_files, max_chars=max_chars)
+    round_no = 1
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while True:
+            print(f"Summarising {len(chunks)} markdown chunks (round {round_no})...")
+            summaries = list(pool.map(lambda c: summarise_chunk(call, prompt, *c), chunks))
+            combined = "\n\n".join(f"<!-- file: {name} -->\n{summary}" for name, summary in summaries)
+            if len(combined) <= reduce_chars or len(summaries) == 1:
+                return combined
+            chunks = chunk_markdown([("summaries", combined)], max_chars=max_chars)
+            if len(chunks) >= len(summaries):
+                # Summaries are not shrinking any further; send what we have
+                return combined
+            round_no += 1
@@ -0,0 +1,113 @@
+"""
+Resample pictures to their displayed size before they go into the deck.
+
+Slides show every picture 3 inches wide, so embedding the original file
+(often a multi-megapixel photo) only makes the .pptx large and slow to
+save, upload and open. Each picture is resized to its displayed width at
+a target DPI and re-encoded: PNG for images with transparency or few
+colours (charts, diagrams, screenshots), JPEG for photos. Results are
+cached on disk by the source's content hash and the target width. An
+asset shown on several slides gives identical bytes every time, which
+python-pptx stores as one image part in the package.
+"""
+import hashlib
+import io
+import math
+import os
+from pathlib import Path
+
+from image_prep import DEFAULT_QUALITY, _has_alpha
+
+DEFAULT_EMBED_DPI = 150
+PALETTE_COLOURS = 256         # at most this many colours: encode as PNG
+EMU_PER_INCH = 914400
+EMBED_CACHE_DIR = Path(os.getenv(
+    "EMBED_CACHE_DIR", Path.home() / ".cache" / "deck_automation" / "embedded"))
+
+
+def target_width_px(width_emu, dpi):
+    """Pixels needed to show `width_emu` at `dpi`"""
+    return max(1, math.ceil(width_emu / EMU_PER_INCH * dpi))
+
+
+def choose_format(img):
+    """PNG for transparency and flat graphics, JPEG for photographic content"""
+    if _has_alpha(img):
+        return "PNG"
+    return "PNG" if img.getcolors(PALETTE_COLOURS) is not None else "JPEG"
+
+
+def resample_picture(data: bytes, width_px, quality=DEFAULT_QUALITY) -> bytes:
+    """Shrink image bytes to `width_px` wide (never enlarge) and re-encode them"""
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)          # phone photos store rotation in EXIF
+        if img.width > width_px:
+            height = max(1, round(img.height * width_px / img.width))
+            img = img.resize((width_px, height), Image.LANCZOS)
+        fmt = choose_format(img)
+        if fmt == "JPEG":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+            img = img.convert("RGBA")
+        out = io.BytesIO()
+        save_kwargs = {"optimize": True} if fmt == "PNG" else {"quality": quality}
+        img.save(out, format=fmt, **save_kwargs)
+    return out.getvalue()
+
+
+class PictureEmbedder:
+    """
+    Adds pictures to slides at their displayed size.
+
+    `dpi=0` embeds the original files. One embedder can serve several
+    presentations.
+    """
+
+    def __init__(self, dpi=DEFAULT_EMBED_DPI, quality=DEFAULT_QUALITY,
+                 cache_dir=EMBED_CACHE_DIR):
+        self.dpi = dpi
+        self.quality = quality
+        self.cache_dir = cache_dir
+        self._hashes = {}                       # (path, mtime_ns, size) -> sha256
+
+    def source_hash(self, path: Path):
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        if key not in self._hashes:
+            self._hashes[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+        return self._hashes[key]
+
+    def picture_bytes(self, path: Path, width_px) -> bytes:
+        """The picture at `path` resampled to `width_px`, from the cache if possible"""
+        key = self.source_hash(path)
+        cached = None
+        if self.cache_dir is not None:
+            cached = Path(self.cache_dir) / key[:2] / f"{key}_{width_px}_{self.quality}"
+            if cached.exists():
+                return cached.read_bytes()
+
+        data = path.read_bytes()
+        try:
+            encoded = resample_picture(data, width_px, quality=self.quality)
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not resample {path.name} ({e}); embedding original")
+            return data
+
+        # Small or already well-compressed files are kept as they are
+        if len(encoded) >= len(data) and path.suffix.lower() in (".jpg", ".jpeg", ".png"):
+            encoded = data
+        if cached is not None:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(encoded)
+            os.replace(tmp, cached)
+        return encoded
+
+    def add_picture(self, slide, path: Path, left, top, width):
+        """Add the picture at `path` to `slide`, `width` EMU wide, keeping its aspect"""
+        if not self.dpi:
+            return slide.shapes.add_picture(str(path), left, top, width=width)
+
+        data = self.picture_bytes(path, target_width_px(width, self.dpi))
+        return slide.shapes.add_picture(io.BytesIO(data), left, top, width=width)
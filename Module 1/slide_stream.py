@@ -0,0 +1,126 @@
+"""
+Incremental parser for a streamed {"slides": [...]} reply.
+
+The model's tokens are fed in as they arrive and every slide object is
+yielded as soon as its closing brace is seen, so slides can be added to the
+deck while the rest of the reply is still being generated. Text before the
+JSON (e.g. a ```json fence) is ignored, and only the slide currently being
+read is buffered.
+"""
+import contextlib
+import json
+import queue
+import threading
+
+
+class SlideStreamParser:
+    """Feed text chunks in, get completed slide dicts out"""
+
+    def __init__(self):
+        self._stack = []          # open '{' / '[' outside strings
+        self._in_string = False
+        self._escape = False
+        self._buf = []            # characters of the slide being read
+        self._reading = False
+
+    def _slide_depth(self):
+        # {"slides": [ {...} ]}  or a bare  [ {...} ]
+        return self._stack in (["{", "["], ["["])
+
+    def feed(self, text):
+        """Consume a chunk and return the slides it completed"""
+        slides = []
+        for ch in text:
+            if self._reading:
+                self._buf.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if ch == "{" and not self._reading and self._slide_depth():
+                    self._reading = True
+                    self._buf = [ch]
+                self._stack.append(ch)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._reading and self._slide_depth():
+                    self._reading = False
+                    slide = self._parse("".join(self._buf))
+                    self._buf = []
+                    if slide is not None:
+                        slides.append(slide)
+        return slides
+
+    @staticmethod
+    def _parse(text):
+        try:
+            slide = json.loads(text)
+        except ValueError:
+            return None
+        return slide if isinstance(slide, dict) else None
+
+
+def iter_slides(chunks):
+    """Yield slide dicts from an iterable of text chunks"""
+    parser = SlideStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def until_broken(chunks, errors, fatal=()):
+    """
+    Yield from a reply stream until it ends or fails.
+
+    An exception raised by the stream itself (a dropped connection, a
+    timeout) ends it quietly and is appended to `errors`; exception types
+    in `fatal` still propagate. Errors raised by the code consuming the
+    chunks are not affected.
+    """
+    try:
+        yield from chunks
+    except fatal:
+        raise
+    except Exception as ex:
+        errors.append(ex)
+
+
+class _Failed:
+    def __init__(self, error):
+        self.error = error
+
+
+def read_ahead(chunks, hold=None):
+    """
+    Read `chunks` on a background thread and yield them as they arrive.
+
+    The stream is read inside the `hold` context (e.g. a slot of a shared
+    LLM request limit), which is released as soon as the stream ends,
+    however long the consumer then takes. An exception raised by the
+    stream is re-raised here after the chunks that came before it.
+    """
+    buffered = queue.Queue()
+    end = object()
+
+    def reader():
+        try:
+            with hold or contextlib.nullcontext():
+                for chunk in chunks:
+                    buffered.put(chunk)
+        except BaseException as ex:
+            buffered.put(_Failed(ex))
+        finally:
+            buffered.put(end)
+
+    threading.Thread(target=reader, name="reply-stream", daemon=True).start()
+    while (item := buffered.get()) is not end:
+        if isinstance(item, _Failed):
+            raise item.error
+        yield item
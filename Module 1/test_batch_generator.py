@@ -0,0 +1,111 @@
+import argparse
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from pptx import Presentation
+
+import batch_generator
+import deck_generator
+
+
+class FakeLLM:
+    """Two-slide decks after `delay` seconds; fails for prompts containing 'boom'"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+    def invoke(self, messages):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if "boom" in json.dumps(messages):
+                raise RuntimeError("model unavailable")
+            slides = [{"title": f"Slide {i}", "points": ["a point"]} for i in range(2)]
+            return SimpleNamespace(content=json.dumps({"slides": slides}))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def generation_args():
+    parser = argparse.ArgumentParser()
+    deck_generator.add_generation_arguments(parser)
+    return parser.parse_args(["--no_llm_cache"])
+
+
+def make_folders(root, names):
+    for name in names:
+        (root / name).mkdir(parents=True)
+        (root / name / "notes.md").write_text(f"# {name}\nSome notes", encoding="utf-8")
+
+
+def test_jsonl_and_csv_manifests_resolve_paths(tmp_path, monkeypatch):
+    tmp_path = tmp_path.resolve()
+    manifests = tmp_path / "manifests"
+    manifests.mkdir()
+    (manifests / "jobs.jsonl").write_text(
+        '{"folder": "a", "prompt": "First"}\n\n'
+        '{"folder": "x/a", "prompt": "Second"}\n'
+        '{"folder": "b", "prompt": "Third", "output": "out/b.pptx"}\n', encoding="utf-8")
+    (manifests / "jobs.csv").write_text("folder,prompt,output\na,First,\nb,Third,out/b.pptx\n",
+                                        encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    jobs = batch_generator.load_manifest(manifests / "jobs.jsonl", batch_generator.Path("decks"))
+
+    assert [j["folder"] for j in jobs] == [str(manifests / "a"), str(manifests / "x/a"), str(manifests / "b")]
+    # --output_dir is relative to the current directory, and folders sharing a name get distinct outputs
+    assert [j["output"] for j in jobs] == [str(tmp_path / "decks/a.pptx"), str(tmp_path / "decks/a_2.pptx"),
+                                           str(manifests / "out/b.pptx")]
+    csv_jobs = batch_generator.load_manifest(manifests / "jobs.csv", batch_generator.Path("decks"))
+    assert [(j["prompt"], j["output"]) for j in csv_jobs] == [
+        ("First", str(tmp_path / "decks/a.pptx")), ("Third", str(manifests / "out/b.pptx"))]
+
+
+def test_manifest_errors(tmp_path):
+    missing = tmp_path / "missing.jsonl"
+    missing.write_text('{"folder": "a"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="job 1 needs both 'folder' and 'prompt'"):
+        batch_generator.load_manifest(missing, tmp_path)
+
+    clash = tmp_path / "clash.jsonl"
+    clash.write_text('{"folder": "a", "prompt": "p", "output": "deck.pptx"}\n'
+                     '{"folder": "b", "prompt": "p", "output": "deck.pptx"}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="jobs 1 and 2 both write"):
+        batch_generator.load_manifest(clash, tmp_path)
+
+
+def test_failing_jobs_are_reported_and_others_finish(tmp_path, monkeypatch):
+    make_folders(tmp_path, ["a", "b", "c"])
+    monkeypatch.setattr(deck_generator, "llm", FakeLLM())
+    jobs = [{"job": n, "folder": str(tmp_path / folder), "prompt": prompt,
+             "output": str(tmp_path / "decks" / f"{n}.pptx")}
+            for n, (folder, prompt) in enumerate([("a", "ok"), ("b", "boom"), ("missing", "ok"), ("c", "ok")], 1)]
+
+    results = batch_generator.run_batch(jobs, generation_args(), jobs_in_flight=4)
+
+    assert [r["status"] for r in results] == ["ok", "failed", "failed", "ok"]
+    assert "model unavailable" in results[1]["error"]
+    assert "not a valid directory" in results[2]["error"]
+    assert len(Presentation(results[3]["output"]).slides) == 2
+
+
+def test_llm_requests_share_the_concurrency_limit(tmp_path, monkeypatch):
+    names = [f"f{i}" for i in range(6)]
+    make_folders(tmp_path, names)
+    llm = FakeLLM(delay=0.05)
+    monkeypatch.setattr(deck_generator, "llm", llm)
+    jobs = [{"job": n, "folder": str(tmp_path / name), "prompt": "p",
+             "output": str(tmp_path / "decks" / f"{name}.pptx")} for n, name in enumerate(names, 1)]
+
+    results = batch_generator.run_batch(jobs, generation_args(), jobs_in_flight=6, llm_concurrency=2)
+
+    assert all(r["status"] == "ok" for r in results)
+    assert llm.peak == 2
@@ -0,0 +1,46 @@
+from PIL import Image, ImageDraw
+
+from deck_generator import build_initial_messages, read_images
+from image_dedup import dedupe_images
+
+
+def make_chart(path, size, bars=(3, 7, 5, 9), colour="teal"):
+    img = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(img)
+    for n, value in enumerate(bars):
+        draw.rectangle([40 + n * 90, 290 - value * 30, 100 + n * 90, 290], fill=colour)
+    img.resize(size, Image.LANCZOS).save(path)
+    return path
+
+
+def test_resized_copies_cluster_and_largest_is_kept(tmp_path):
+    big = make_chart(tmp_path / "chart_big.png", (1600, 1200))
+    small = make_chart(tmp_path / "chart_small.jpg", (400, 300))
+    other = make_chart(tmp_path / "other.png", (800, 600), bars=(9, 2, 8, 1))
+    black = tmp_path / "black.png"
+    white = tmp_path / "white.png"
+    Image.new("RGB", (64, 64), "black").save(black)
+    Image.new("RGB", (64, 64), "white").save(white)
+    broken = tmp_path / "broken.png"
+    broken.write_bytes(b"not an image")
+
+    paths = [small, other, big, black, white, broken]
+    representatives, aliases = dedupe_images(paths, workers=3)
+
+    assert representatives == [other, big, black, white, broken]
+    assert aliases == {big: [small]}
+
+
+def test_read_images_sends_one_image_per_cluster(tmp_path):
+    make_chart(tmp_path / "a.png", (800, 600))
+    make_chart(tmp_path / "a_copy.png", (800, 600))
+    make_chart(tmp_path / "b.png", (800, 600), bars=(1, 9, 1, 9), colour="orange")
+
+    images = read_images(tmp_path, dedup_distance=6, max_edge=None)
+    assert sorted(images) == ["a.png", "b.png"]
+    assert images.aliases == {"a.png": ["a_copy.png"]}
+    labels = [part["text"] for part in build_initial_messages("p", "", images)[1]["content"]
+              if part["type"] == "text"]
+    assert "(filename: a.png; same image as: a_copy.png)" in labels
+
+    assert sorted(read_images(tmp_path, max_edge=None)) == ["a.png", "a_copy.png", "b.png"]
@@ -0,0 +1,45 @@
+import base64
+import io
+
+from PIL import Image
+
+from image_prep import b64_mime, prepare_image_b64
+
+
+def make_photo(path, size=(4000, 3000)):
+    Image.linear_gradient("L").resize(size).convert("RGB").save(path, quality=95)
+    return path
+
+
+def decode(b64):
+    return Image.open(io.BytesIO(base64.b64decode(b64)))
+
+
+def test_large_photo_is_downscaled_to_max_edge(tmp_path):
+    photo = make_photo(tmp_path / "photo.jpg")
+    b64 = prepare_image_b64(photo, max_edge=800, cache_dir=tmp_path / "thumbs")
+
+    assert decode(b64).size == (800, 600)
+    assert len(base64.b64decode(b64)) < photo.stat().st_size
+    assert b64_mime(b64) == "image/jpeg"
+
+
+def test_transparent_png_stays_png(tmp_path):
+    path = tmp_path / "logo.png"
+    Image.new("RGBA", (2000, 1000), (255, 0, 0, 128)).save(path)
+    b64 = prepare_image_b64(path, max_edge=500, cache_dir=None)
+
+    img = decode(b64)
+    assert b64_mime(b64) == "image/png"
+    assert img.size == (500, 250) and img.mode == "RGBA"
+
+
+def test_repeat_runs_use_thumbnail_cache(tmp_path, monkeypatch):
+    photo = make_photo(tmp_path / "photo.jpg")
+    first = prepare_image_b64(photo, max_edge=800, cache_dir=tmp_path / "thumbs")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("resized again")
+
+    monkeypatch.setattr("image_prep.encode_image", fail)
+    assert prepare_image_b64(photo, max_edge=800, cache_dir=tmp_path / "thumbs") == first
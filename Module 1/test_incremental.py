@@ -0,0 +1,88 @@
+from pptx import Presentation
+
+import incremental
+
+
+def make_deck(titles):
+    prs = Presentation()
+    for title in titles:
+        add_titled_slide(prs, {"title": title})
+    return prs
+
+
+def add_titled_slide(prs, data):
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = data["title"]
+
+
+def titles(prs):
+    return [s.shapes.title.text for s in prs.slides]
+
+
+def manifest_for(deps_per_slide, files):
+    return {"version": incremental.MANIFEST_VERSION, "prompt": "p", "files": files,
+            "slides": [{"data": {}, "deps": deps} for deps in deps_per_slide]}
+
+
+def test_only_slides_built_from_changed_files_are_affected():
+    manifest = manifest_for([["a.md"], ["b.md", "chart.png"], ["c.md"]],
+                            {"a.md": "1", "b.md": "2", "c.md": "3", "chart.png": "4"})
+    hashes = {"a.md": "1", "b.md": "2", "c.md": "3", "chart.png": "changed"}
+
+    assert incremental.plan_update(manifest, hashes, "p", 3) == ([1], {"chart.png"}, set())
+    assert incremental.plan_update(manifest, hashes, "other prompt", 3) is None
+    assert incremental.plan_update(manifest, hashes, "p", 4) is None
+
+
+def test_removed_files_and_unknown_deps_mark_slides_affected():
+    manifest = manifest_for([["a.md"], [], ["c.md"]], {"a.md": "1", "c.md": "3"})
+    affected, changed, removed = incremental.plan_update(manifest, {"c.md": "3"}, "p", 3)
+
+    assert affected == [0, 1]
+    assert removed == {"a.md"} and not changed
+
+
+def test_slide_dependencies_resolve_image_names_to_paths():
+    hashes = {"docs/intro.md": "1", "img/logo.png": "2"}
+    deps = incremental.slide_dependencies(
+        {"sources": ["docs/intro.md"], "images": ["logo.png"]}, hashes)
+    assert deps == {"docs/intro.md", "img/logo.png"}
+
+
+def test_splice_replaces_affected_slides_in_place():
+    prs = make_deck(["One", "Two", "Three", "Four"])
+    kept = prs.slides[0]
+
+    placed = incremental.place_replacements(
+        [1, 3], [{"title": "Two v2", "replaces": 2}, {"title": "New"}, {"title": "Four v2", "replaces": 4}])
+    order = incremental.splice_slides(prs, [1, 3], placed, add_titled_slide)
+
+    assert titles(prs) == ["One", "Two v2", "Three", "Four v2", "New"]
+    assert prs.slides[0] is kept or prs.slides[0].slide_id == kept.slide_id
+    assert order[0] == 0 and order[2] == 2
+    assert order[1]["title"] == "Two v2"
+
+
+def test_new_slides_are_appended_when_nothing_is_affected():
+    prs = make_deck(["One"])
+    placed = incremental.place_replacements([], [{"title": "Extra", "replaces": 7}])
+    incremental.splice_slides(prs, [], placed, add_titled_slide)
+    assert titles(prs) == ["One", "Extra"]
+
+
+def test_unreplaced_slides_are_kept_unless_their_sources_are_gone():
+    manifest = manifest_for([["a.md"], ["b.md"], ["c.md", "d.md"], ["e.md"]],
+                            {f: "1" for f in ["a.md", "b.md", "c.md", "d.md", "e.md"]})
+    affected, _, removed = incremental.plan_update(
+        manifest, {"a.md": "1", "b.md": "changed", "d.md": "1"}, "p", 4)
+    assert affected == [1, 2, 3]
+    orphaned = incremental.orphaned_slides(manifest, affected, removed)
+    assert orphaned == [3]
+
+    prs = make_deck(["One", "Two", "Three", "Four"])
+    placed = incremental.place_replacements(affected, [{"title": "New"}], orphaned)
+    order = incremental.splice_slides(prs, affected, placed, add_titled_slide)
+
+    # Two changed and Three lost one of two sources: nothing replaced them, so they stay
+    assert titles(prs) == ["One", "Two", "Three", "New"]
+    assert order[:3] == [0, 1, 2]
@@ -0,0 +1,49 @@
+import threading
+
+from outline_mapreduce import chunk_markdown, map_reduce_markdown, split_sections
+
+
+DOC = "# Intro\nhello\n\n## Details\n" + "detail line\n" * 20 + "# Outro\nbye\n"
+
+
+def test_split_sections_starts_each_section_at_a_heading():
+    sections = split_sections(DOC)
+    assert [s.splitlines()[0] for s in sections] == ["# Intro", "## Details", "# Outro"]
+    assert "".join(sections) == DOC
+
+
+def test_chunks_respect_budget_and_never_span_files():
+    chunks = chunk_markdown([("a.md", DOC), ("b.md", "# B\nshort\n")], max_chars=100)
+
+    assert all(len(text) <= 100 for _, text in chunks)
+    assert chunks[-1] == ("b.md", "# B\nshort\n")
+    assert "".join(text for name, text in chunks if name == "a.md") == DOC
+
+
+def test_map_reduce_summarises_chunks_in_parallel():
+    # Each call waits for two others; run one at a time, the barrier times out
+    barrier = threading.Barrier(3, timeout=5)
+
+    def call(messages):
+        barrier.wait()
+        return "summary"
+
+    files = [(f"doc{i}.md", f"# Doc {i}\n" + "x" * 50) for i in range(6)]
+    combined = map_reduce_markdown(call, "deck", files, max_chars=80, concurrency=3)
+
+    assert combined.count("summary") == 6
+    assert "<!-- file: doc5.md -->" in combined
+
+
+def test_map_reduce_runs_extra_rounds_until_summaries_fit():
+    calls = []
+
+    def call(messages):
+        calls.append(messages)
+        return "s" * 40
+
+    files = [(f"doc{i}.md", "y" * 90) for i in range(8)]
+    combined = map_reduce_markdown(call, "deck", files, max_chars=200, reduce_chars=120)
+
+    assert len(combined) <= 120
+    assert len(calls) > 8
@@ -0,0 +1,61 @@
+import io
+import zipfile
+
+from PIL import Image
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+from deck_generator import build_pptx
+from picture_embed import PictureEmbedder, resample_picture
+
+
+def make_photo(path, size=(4000, 3000)):
+    bands = [Image.effect_noise(size, sigma) for sigma in (30, 40, 50)]
+    Image.merge("RGB", bands).save(path, quality=95)
+    return path
+
+
+def media(pptx_path):
+    with zipfile.ZipFile(pptx_path) as zf:
+        return {name: zf.read(name) for name in zf.namelist() if name.startswith("ppt/media/")}
+
+
+def test_pictures_are_resampled_and_shared_between_slides(tmp_path):
+    make_photo(tmp_path / "photo.jpg")
+    Image.new("RGB", (2400, 1200), "navy").save(tmp_path / "chart.png")
+    slides = {"slides": [{"title": f"Slide {i}", "points": ["a"], "images": ["photo.jpg", "chart.png"]}
+                         for i in range(3)]}
+    embedder = PictureEmbedder(dpi=100, cache_dir=tmp_path / "cache")
+
+    prs = build_pptx(slides, tmp_path, embedder)
+    prs.save(tmp_path / "deck.pptx")
+
+    parts = media(tmp_path / "deck.pptx")
+    assert len(parts) == 2
+    sizes = sorted(Image.open(io.BytesIO(data)).size for data in parts.values())
+    assert sizes == [(300, 150), (300, 225)]
+    formats = sorted(Image.open(io.BytesIO(data)).format for data in parts.values())
+    assert formats == ["JPEG", "PNG"]
+    for slide in prs.slides:
+        pictures = [shape for shape in slide.shapes if shape.shape_type == MSO_SHAPE_TYPE.PICTURE]
+        assert [p.width for p in pictures] == [Inches(3)] * 2
+        assert pictures[0].height == Inches(2.25)
+
+
+def test_cache_and_original_embedding(tmp_path):
+    photo = make_photo(tmp_path / "photo.jpg", size=(1200, 900))
+    first = PictureEmbedder(cache_dir=tmp_path / "cache").picture_bytes(photo, 450)
+    assert Image.open(io.BytesIO(first)).size == (450, 338)
+    assert len(list((tmp_path / "cache").rglob("*_450_*"))) == 1
+    assert PictureEmbedder(cache_dir=tmp_path / "cache").picture_bytes(photo, 450) == first
+
+    slides = {"slides": [{"title": "Original", "images": ["photo.jpg"]}]}
+    build_pptx(slides, tmp_path, PictureEmbedder(dpi=0)).save(tmp_path / "deck.pptx")
+    assert list(media(tmp_path / "deck.pptx").values()) == [photo.read_bytes()]
+
+
+def test_transparent_images_stay_png_and_small_ones_are_not_enlarged():
+    buffer = io.BytesIO()
+    Image.new("RGBA", (200, 100), (255, 0, 0, 128)).save(buffer, "PNG")
+    img = Image.open(io.BytesIO(resample_picture(buffer.getvalue(), 450)))
+    assert (img.format, img.mode, img.size) == ("PNG", "RGBA", (200, 100))
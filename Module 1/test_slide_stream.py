@@ -0,0 +1,71 @@
+import json
+import threading
+
+import pytest
+
+import deck_generator
+from deck_generator import build_pptx_streaming
+from slide_stream import SlideStreamParser, iter_slides, read_ahead
+
+SLIDES = {"slides": [
+    {"title": "Intro", "points": ["a {brace}", "quote \" and ] bracket"]},
+    {"title": "Data", "points": [], "images": ["chart.png"], "notes": "n"},
+    {"title": "End", "points": ["bye"]},
+]}
+
+
+def test_slides_are_yielded_as_soon_as_they_close():
+    text = "```json\n" + json.dumps(SLIDES) + "\n```"
+    parser = SlideStreamParser()
+    completed_at = []
+    for pos, ch in enumerate(text):
+        for slide in parser.feed(ch):
+            completed_at.append((pos, slide))
+
+    assert [s for _, s in completed_at] == SLIDES["slides"]
+    # The first slide is available long before the reply ends
+    assert completed_at[0][0] < len(text) // 2
+
+
+def test_bare_array_reply_is_accepted():
+    chunks = [json.dumps(SLIDES["slides"])[i:i + 7] for i in range(0, 200, 7)]
+    assert list(iter_slides(chunks)) == SLIDES["slides"]
+
+
+def test_truncated_stream_keeps_completed_slides():
+    text = json.dumps(SLIDES)
+    cut = text.index('"End"')
+    assert list(iter_slides([text[:cut]])) == SLIDES["slides"][:2]
+
+
+def broken_stream(text, cut):
+    yield text[:cut]
+    raise ConnectionError("connection reset")
+
+
+def test_broken_stream_keeps_slides_but_build_errors_propagate(tmp_path, monkeypatch):
+    text = json.dumps(SLIDES)
+    prs = build_pptx_streaming(broken_stream(text, text.index('"End"')), tmp_path)
+    assert [s.shapes.title.text for s in prs.slides] == ["Intro", "Data"]
+
+    def failing_add_slide(prs, slide_data, folder, embedder=None):
+        raise ValueError("bad layout")
+    monkeypatch.setattr(deck_generator, "add_slide", failing_add_slide)
+    with pytest.raises(ValueError, match="bad layout"):
+        build_pptx_streaming([text], tmp_path)
+
+
+def test_read_ahead_releases_the_slot_when_the_stream_ends():
+    slot = threading.Semaphore(1)
+    chunks = read_ahead(iter(["a", "b", "c"]), hold=slot)
+
+    assert next(chunks) == "a"
+    # The consumer is still busy with "a", but the whole reply has been read
+    assert slot.acquire(timeout=5)
+    slot.release()
+    assert list(chunks) == ["b", "c"]
+
+    failing = read_ahead(broken_stream("xyz", 1), hold=slot)
+    assert next(failing) == "x"
+    with pytest.raises(ConnectionError):
+        next(failing)
@@ -1,113 +1,337 @@
 """
 Simple script to apply a PowerPoint template to an existing presentation.
 """
+import argparse
+import glob
+import io
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from pptx import Presentation
+from pptx.util import Inches
 
-def copy_slides_to_template(source_path, template_path, output_path):
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))   # repo root, for common/
+from common.instrumentation import (add, add_report_arguments, recorder, span, timed,
+                                    write_report_from_args)
+from layout_index import TEXT_KINDS, LayoutIndex, content_shapes, slide_signature
+from shape_copy import MediaStore, copy_notes, copy_shape, is_copyable, media_hashes
+from stream_theme import prepare_stream_template, stream_slides_to_template
+
+class PreparedTemplate:
+    """
+    A template parsed and stripped of its slides once, kept in memory.
+    
+    The stripped package is saved to a byte snapshot; every output deck is
+    created from that snapshot instead of reparsing the template file, so
+    theming many decks with one template costs a single parse of the file.
+    The template's layouts are analysed once into `layout_index` and its
+    media hashed once into `media_hashes`.
+    """
+    
+    def __init__(self, template_path):
+        self.path = template_path
+        template = Presentation(template_path)
+        
+        # Remove existing slides (keeping the masters and layouts)
+        for i in range(len(template.slides) - 1, -1, -1):
+            rId = template.slides._sldIdLst[i].rId
+            template.part.drop_rel(rId)
+            template.slides._sldIdLst.remove(template.slides._sldIdLst[i])
+        
+        self.layout_index = LayoutIndex.from_presentation(template)
+        self.media_hashes = media_hashes(template.part.package)
+        
+        buffer = io.BytesIO()
+        template.save(buffer)
+        self.snapshot = buffer.getvalue()
+    
+    def new_presentation(self):
+        """Return a fresh, empty presentation with the template's masters and layouts"""
+        return Presentation(io.BytesIO(self.snapshot))
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+def prepare_template(template_path):
+    """Return the PreparedTemplate for a file, loading it only once per process"""
+    key = (os.path.abspath(template_path), os.stat(template_path).st_mtime_ns)
+    with _templates_lock:
+        if key not in _templates:
+            _templates[key] = PreparedTemplate(template_path)
+        return _templates[key]
+
+def keep_unplaced_text(shapes, slide, filled, output):
+    """
+    Put the text of `shapes`, which found no free placeholder, into the last
+    body placeholder filled on `slide`, or else a text box where the first
+    of them was, so no content is lost.
+    """
+    if filled is None:
+        first = shapes[0]
+        if first.left is None or first.width is None:
+            margin = Inches(0.5)
+            box = (margin, Inches(1.5), output.slide_width - 2 * margin, output.slide_height - Inches(2))
+        else:
+            box = (first.left, first.top, first.width, first.height)
+        filled = slide.shapes.add_textbox(*box)
+        filled.text_frame.word_wrap = True
+        filled.text_frame.text = shapes[0].text
+        shapes = shapes[1:]
+    for shape in shapes:
+        filled.text_frame.add_paragraph().text = shape.text
+
+@timed("theme_presentation")
+def theme_presentation(source, template, log=print):
+    """
+    Return a new presentation with the slides of `source` (a Presentation)
+    on the layouts of `template` (a PreparedTemplate). Nothing is read from
+    or written to disk.
+    """
+    # Create output presentation from the stripped template
+    log("Creating new presentation...")
+    output = template.new_presentation()
+    media = MediaStore(output.part.package, template.media_hashes)
+    
+    log(f"Copying {len(source.slides)} slides from source presentation...")
+    
+    # Copy slides from source to output
+    index = template.layout_index
+    for i, slide in enumerate(source.slides):
+        log(f"Processing slide {i+1}...")
+        
+        # Choose the layout whose placeholders best fit the slide's content
+        content = content_shapes(slide)
+        kinds, slots = slide_signature(content)
+        layout_idx = index.best_layout(kinds)
+        new_slide = output.slides.add_slide(output.slide_layouts[layout_idx])
+        
+        # Copy content into the placeholders the index maps each shape to
+        placeholders = {ph.placeholder_format.idx: ph for ph in new_slide.placeholders}
+        targets = index.placeholder_mapping(layout_idx, slots)
+        kind_of = dict(index.layouts[layout_idx])
+        filled, unplaced = None, []
+        for (shape, kind), target in zip(content, targets):
+            if kind not in TEXT_KINDS and kind != "text":
+                # Pictures and tables keep their own shape; drop the empty placeholder
+                if is_copyable(shape):
+                    copy_shape(shape, new_slide, media)
+                    if target is not None:
+                        placeholders[target]._element.getparent().remove(placeholders[target]._element)
+                continue
+            if target is None:
+                unplaced.append(shape)
+                continue
+            placeholders[target].text = shape.text
+            if kind_of.get(target) != "title":
+                filled = placeholders[target]
+        if unplaced:
+            keep_unplaced_text(unplaced, new_slide, filled, output)
+        
+        # Pictures, tables and groups outside placeholders, then speaker notes
+        for shape in slide.shapes:
+            if not shape.is_placeholder and is_copyable(shape):
+                copy_shape(shape, new_slide, media)
+        copy_notes(slide, new_slide)
+    
+    return output
+
+@timed("copy_slides_to_template")
+def copy_slides_to_template(source_path, template_path, output_path, verbose=True):
     """
     Copy slides from source presentation to template.
+    
+    `template_path` may also be a PreparedTemplate, which skips loading the
+    template file altogether. With verbose=False only errors are printed.
     """
-    print(f"Checking source file: {source_path}")
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log(f"Checking source file: {source_path}")
     if not os.path.exists(source_path):
         print(f"ERROR: Source file not found: {source_path}")
         return False
         
-    print(f"Checking template file: {template_path}")
-    if not os.path.exists(template_path):
-        print(f"ERROR: Template file not found: {template_path}")
-        return False
+    if not isinstance(template_path, PreparedTemplate):
+        log(f"Checking template file: {template_path}")
+        if not os.path.exists(template_path):
+            print(f"ERROR: Template file not found: {template_path}")
+            return False
         
     try:
         # Load presentations
-        print("Loading source presentation...")
+        log("Loading source presentation...")
         source = Presentation(source_path)
         
-        print("Loading template presentation...")
-        template = Presentation(template_path)
-        
-        # Save template slides for reference
-        print("Creating new presentation...")
-        template_slides = [slide for slide in template.slides]
-        
-        # Create output presentation from template
-        output = Presentation(template_path)
-        
-        # Remove existing slides from output (keeping the master)
-        for i in range(len(output.slides) - 1, -1, -1):
-            rId = output.slides._sldIdLst[i].rId
-            output.part.drop_rel(rId)
-            output.slides._sldIdLst.remove(output.slides._sldIdLst[i])
+        log("Loading template presentation...")
+        template = template_path
+        if not isinstance(template, PreparedTemplate):
+            template = prepare_template(template_path)
         
-        print(f"Copying {len(source.slides)} slides from source presentation...")
+        output = theme_presentation(source, template, log)
         
-        # Copy slides from source to output
-        for i, slide in enumerate(source.slides):
-            print(f"Processing slide {i+1}...")
-            
-            # Choose appropriate layout
-            layout_idx = 0 if i == 0 else 1  # Title slide for first, Title & Content for others
-            new_slide = output.slides.add_slide(output.slide_layouts[layout_idx])
-            
-            # Copy text from placeholders
-            for shape in slide.shapes:
-                if not hasattr(shape, "text"):
-                    continue
-                    
-                # Find matching placeholder in new slide
-                for placeholder in new_slide.placeholders:
-                    if hasattr(placeholder, "text"):
-                        try:
-                            # Try to match by index or type
-                            if shape.placeholder_format.idx == placeholder.placeholder_format.idx:
-                                placeholder.text = shape.text
-                                break
-                        except (AttributeError, TypeError):
-                            # If not a placeholder or other issue, skip
-                            pass
-                else:
-                    # If we didn't find a match, put it in the first available text placeholder
-                    for placeholder in new_slide.placeholders:
-                        if hasattr(placeholder, "text"):
-                            placeholder.text = shape.text
-                            break
-            
         # Save the result
-        print(f"Saving presentation to: {output_path}")
-        output.save(output_path)
-        print("Done!")
+        log(f"Saving presentation to: {output_path}")
+        with span("save_pptx") as current:
+            output.save(output_path)
+            current.add("bytes", os.path.getsize(output_path))
+        log("Done!")
         return True
         
     except Exception as e:
         import traceback
+        add("failed")
         print(f"ERROR: {str(e)}")
         traceback.print_exc()
         return False
 
+def find_decks(inputs):
+    """Expand files, directories (their *.pptx) and glob patterns into deck paths"""
+    decks = []
+    for item in inputs:
+        if os.path.isdir(item):
+            decks.extend(sorted(glob.glob(os.path.join(item, "*.pptx"))))
+        elif any(ch in item for ch in "*?["):
+            decks.extend(sorted(glob.glob(item, recursive=True)))
+        else:
+            decks.append(item)
+    # Skip PowerPoint lock files and duplicates, keep order
+    seen = set()
+    return [d for d in decks
+            if not os.path.basename(d).startswith("~$") and not (d in seen or seen.add(d))]
+
+# engine name -> (prepare the template once, theme one deck)
+ENGINES = {
+    "pptx": (prepare_template, copy_slides_to_template),
+    "stream": (prepare_stream_template, timed("stream_slides_to_template")(stream_slides_to_template)),
+}
+
+# Template and engine of the current worker process, set once by _init_worker
+_worker_template = None
+_worker_engine = "pptx"
+
+def _init_worker(template_path, engine="pptx"):
+    global _worker_template, _worker_engine
+    _worker_engine = engine
+    _worker_template = ENGINES[engine][0](template_path)
+
+def _theme_one(job):
+    source_path, output_path = job
+    start = time.perf_counter()
+    theme = ENGINES[_worker_engine][1]
+    ok = theme(source_path, _worker_template, output_path, verbose=False)
+    return source_path, output_path, ok, time.perf_counter() - start
+
+def batch_jobs(decks, output_dir):
+    """
+    (source, output) pairs that keep each deck's file name inside `output_dir`.
+    
+    Raises ValueError if two decks share a file name or an output would
+    overwrite one of the inputs.
+    """
+    sources = {os.path.realpath(d): d for d in decks}
+    claimed = {}
+    jobs = []
+    for d in decks:
+        output = os.path.join(output_dir, os.path.basename(d))
+        key = os.path.realpath(output)
+        if key in sources:
+            raise ValueError(f"{output} would overwrite the input {sources[key]}")
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {d} would both be written to {output}")
+        claimed[key] = d
+        jobs.append((d, output))
+    return jobs
+
+def apply_template_batch(decks, template_path, output_dir, workers=None, engine="pptx"):
+    """
+    Theme every deck in `decks` with one template across a process pool.
+    
+    Each worker process parses the template once and reuses it for every
+    deck it handles. Outputs keep their file names inside `output_dir`
+    (see batch_jobs). Returns a list of (source, output, ok, seconds).
+    """
+    jobs = batch_jobs(decks, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template_path, engine)) as pool:
+        results = list(pool.map(_theme_one, jobs))
+    # Spans inside the workers stay there; record each deck's time here
+    for _, _, ok, seconds in results:
+        recorder.record(ENGINES[engine][1].__name__, seconds, error=not ok)
+    return results
+
 def main():
     # Get the current directory
     current_dir = os.path.dirname(os.path.abspath(__file__))
     if not current_dir:
         current_dir = os.getcwd()
     
-    # Paths
-    source_path = os.path.join(current_dir, "AI_ML_Healthcare_Presentation.pptx")
-    template_path = os.path.join(current_dir, "template", "Modern project kickoff presentation.pptx")
-    output_path = os.path.join(current_dir, "AI_ML_Healthcare_Themed.pptx")
+    # Paths default to the sample deck and template next to this script
+    parser = argparse.ArgumentParser(description='Apply a PowerPoint template to one or many presentations')
+    parser.add_argument('--input', '-i', nargs='+',
+                        default=[os.path.join(current_dir, "AI_ML_Healthcare_Presentation.pptx")],
+                        help='Presentation(s) to theme: files, directories or glob patterns')
+    parser.add_argument('--template', '-t',
+                        default=os.path.join(current_dir, "template", "Modern project kickoff presentation.pptx"),
+                        help='Template presentation')
+    parser.add_argument('--output', '-o',
+                        help='Output file for a single input, or output folder for many '
+                             '(default: AI_ML_Healthcare_Themed.pptx / themed/)')
+    parser.add_argument('--workers', '-w', type=int, help='Worker processes for batches (default: CPU count)')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='pptx',
+                        help='pptx: python-pptx object model (default); '
+                             'stream: zip-to-zip copy in bounded memory for very large decks')
+    add_report_arguments(parser, "<output>.metrics.json, or run_metrics.json in the output folder")
+    args = parser.parse_args()
+    
+    decks = find_decks(args.input)
+    if not decks:
+        print("ERROR: No presentations matched the input")
+        return
+    
+    print(f"Template presentation: {args.template}")
+    if not os.path.exists(args.template):
+        print(f"ERROR: Template file not found: {args.template}")
+        return
     
-    print(f"Source presentation: {source_path}")
-    print(f"Template presentation: {template_path}")
-    print(f"Output path: {output_path}")
+    # A single file keeps the original, verbose behaviour
+    if len(decks) == 1 and not os.path.isdir(args.input[0]):
+        source_path = decks[0]
+        output_path = args.output or os.path.join(current_dir, "AI_ML_Healthcare_Themed.pptx")
+        print(f"Source presentation: {source_path}")
+        print(f"Output path: {output_path}")
+        
+        # Apply the template
+        success = ENGINES[args.engine][1](source_path, args.template, output_path)
+        
+        if success:
+            print(f"\nPresentation successfully themed and saved to:")
+            print(output_path)
+        else:
+            print("\nFailed to apply template. See error messages above.")
+        write_report_from_args(args, f"{output_path}.metrics.json")
+        return
     
-    # Apply the template
-    success = copy_slides_to_template(source_path, template_path, output_path)
+    output_dir = args.output or os.path.join(current_dir, "themed")
+    print(f"Theming {len(decks)} presentations into {output_dir}...")
+    start = time.perf_counter()
+    try:
+        results = apply_template_batch(decks, args.template, output_dir, workers=args.workers,
+                                       engine=args.engine)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return
+    elapsed = time.perf_counter() - start
     
-    if success:
-        print(f"\nPresentation successfully themed and saved to:")
-        print(output_path)
-    else:
-        print("\nFailed to apply template. See error messages above.")
+    failed = 0
+    for source_path, output_path, ok, seconds in results:
+        print(f"{'OK    ' if ok else 'FAILED'} {seconds:6.2f}s  {source_path}")
+        failed += not ok
+    print(f"\n{len(results) - failed}/{len(results)} presentations themed in {elapsed:.1f}s "
+          f"({len(results) / max(elapsed, 1e-9):.1f} decks/s)")
+    write_report_from_args(args, os.path.join(output_dir, "run_metrics.json"),
+                           decks=len(results), failed=failed)
 
 if __name__ == "__main__":
     main()
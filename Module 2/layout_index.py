@@ -0,0 +1,158 @@
+"""
+Template analysis for copy_slides_to_template.
+
+A LayoutIndex is built once per template. It records, for every slide
+layout, which kinds of placeholder it offers and their idx values. A
+source slide is reduced to a signature (the kinds of content it carries),
+and the best layout and the placeholder each source shape should go to
+are then looked up in memoised dicts instead of being searched slide by
+slide and shape by shape.
+"""
+from collections import Counter
+
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.shapes.picture import Picture
+
+# Placeholder types reduced to the kind of content they hold
+_KINDS = {
+    PP_PLACEHOLDER.TITLE: "title",
+    PP_PLACEHOLDER.CENTER_TITLE: "title",
+    PP_PLACEHOLDER.VERTICAL_TITLE: "title",
+    PP_PLACEHOLDER.SUBTITLE: "subtitle",
+    PP_PLACEHOLDER.BODY: "body",
+    PP_PLACEHOLDER.VERTICAL_BODY: "body",
+    PP_PLACEHOLDER.OBJECT: "body",
+    PP_PLACEHOLDER.VERTICAL_OBJECT: "body",
+    PP_PLACEHOLDER.PICTURE: "picture",
+    PP_PLACEHOLDER.BITMAP: "picture",
+    PP_PLACEHOLDER.TABLE: "table",
+    PP_PLACEHOLDER.CHART: "chart",
+    PP_PLACEHOLDER.ORG_CHART: "chart",
+    PP_PLACEHOLDER.MEDIA_CLIP: "media",
+}
+# The same, for the `type` attribute of <p:ph> in raw slide XML (default "obj")
+XML_KINDS = {
+    "title": "title", "ctrTitle": "title", "vertTitle": "title", "subTitle": "subtitle",
+    "body": "body", "obj": "body", "pic": "picture", "clipArt": "picture",
+    "tbl": "table", "chart": "chart", "dgm": "chart", "media": "media",
+}
+TEXT_KINDS = ("title", "subtitle", "body")
+# Content-placeholder kinds that can also take text
+_ACCEPTS = {"body": ("body", "subtitle"), "subtitle": ("subtitle", "body"), "title": ("title",)}
+
+
+def shape_kind(shape):
+    """Kind of a placeholder shape, "text" for other text shapes, else None"""
+    if shape.is_placeholder:
+        # A filled content placeholder holds whatever was inserted into it
+        if shape.has_table:
+            return "table"
+        if shape.has_chart:
+            return "chart"
+        if isinstance(shape, Picture):
+            return "picture"
+        try:
+            return _KINDS.get(shape.placeholder_format.type)
+        except ValueError:
+            return "body"
+    if getattr(shape, "has_text_frame", False) and shape.text_frame.text.strip():
+        return "text"
+    return None
+
+
+def content_shapes(slide):
+    """[(shape, kind)] for every shape of a slide that carries content"""
+    content = []
+    for shape in slide.shapes:
+        kind = shape_kind(shape)
+        if kind is not None:
+            content.append((shape, kind))
+    return content
+
+
+def slide_signature(content):
+    """
+    Describe a slide's content_shapes for layout lookup.
+
+    Returns (kinds, slots): `kinds` is a hashable multiset of the content
+    kinds on the slide, `slots` the (idx, kind) of each content shape in
+    shape order (idx is None for plain text shapes).
+    """
+    kinds, slots = Counter(), []
+    for shape, kind in content:
+        if kind == "text":
+            slots.append((None, "text"))
+            continue
+        kinds[kind] += 1
+        slots.append((shape.placeholder_format.idx, kind))
+    if any(kind == "text" for _, kind in slots) and not kinds["body"]:
+        kinds["body"] += 1      # loose text boxes want a body placeholder
+    return tuple(sorted(kinds.items())), tuple(slots)
+
+
+class LayoutIndex:
+    """Layouts of a template keyed by the placeholder kinds and idx values they offer"""
+
+    def __init__(self, layouts):
+        self.layouts = layouts      # per layout: [(idx, kind)] in placeholder order
+        self._layout_for = {}
+        self._mapping_for = {}
+
+    @classmethod
+    def from_presentation(cls, presentation):
+        layouts = []
+        for layout in presentation.slide_layouts:
+            slots = []
+            for ph in layout.placeholders:
+                kind = _KINDS.get(ph.placeholder_format.type)
+                if kind is not None:
+                    slots.append((ph.placeholder_format.idx, kind))
+            layouts.append(slots)
+        return cls(layouts)
+
+    @staticmethod
+    def _score(offered, wanted):
+        matched = sum(min(offered[k], n) for k, n in wanted.items())
+        missing = sum(wanted.values()) - matched
+        unused = sum(offered.values()) - matched
+        return 3 * matched - 2 * missing - unused
+
+    def best_layout(self, kinds):
+        """Position of the layout that best fits a slide signature"""
+        if kinds not in self._layout_for:
+            wanted = Counter(dict(kinds))
+            scores = [self._score(Counter(kind for _, kind in slots), wanted)
+                      for slots in self.layouts]
+            self._layout_for[kinds] = max(range(len(scores)), key=lambda i: (scores[i], -i))
+        return self._layout_for[kinds]
+
+    def placeholder_mapping(self, layout_pos, slots):
+        """
+        Target placeholder idx for each source slot, in slot order.
+
+        Exact idx matches of the same kind come first, then the first free
+        placeholder of a compatible kind, then any free text placeholder.
+        None means no free placeholder is left for that shape.
+        """
+        key = (layout_pos, slots)
+        if key not in self._mapping_for:
+            offered = self.layouts[layout_pos]
+            kind_of = dict(offered)
+            free = [idx for idx, _ in offered]
+            targets = [None] * len(slots)
+            for n, (idx, kind) in enumerate(slots):
+                if idx is not None and kind_of.get(idx) == kind and idx in free:
+                    targets[n] = idx
+                    free.remove(idx)
+            for n, (idx, kind) in enumerate(slots):
+                if targets[n] is not None:
+                    continue
+                accepts = _ACCEPTS.get(kind, (kind,)) if kind != "text" else ("body", "subtitle")
+                match = next((i for i in free if kind_of[i] in accepts), None)
+                if match is None and kind in TEXT_KINDS + ("text",):
+                    match = next((i for i in free if kind_of[i] in TEXT_KINDS), None)
+                if match is not None:
+                    targets[n] = match
+                    free.remove(match)
+            self._mapping_for[key] = tuple(targets)
+        return self._mapping_for[key]
@@ -0,0 +1,138 @@
+"""
+Full-fidelity copying of slide content for copy_slides_to_template.
+
+Pictures, tables and groups are copied as XML, so cropping, borders and
+cell formatting survive. Every relationship the copied XML refers to is
+re-created on the new slide: external links are kept as they are, and
+image and media parts go through a MediaStore, which keeps a single part
+per distinct content hash for the whole output package.
+"""
+import copy
+import hashlib
+import re
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import Part
+from pptx.opc.packuri import PackURI
+from pptx.parts.image import ImagePart
+from pptx.shapes.picture import Picture
+
+MEDIA_RELTYPES = {RT.IMAGE, RT.MEDIA, RT.VIDEO, RT.AUDIO}
+TABLE_URI = "http://schemas.openxmlformats.org/drawingml/2006/table"
+_R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+
+def media_hashes(package):
+    """Return {sha1: partname} for the media parts already in a package"""
+    return {hashlib.sha1(part.blob).hexdigest(): str(part.partname)
+            for part in package.iter_parts() if part.partname.startswith("/ppt/media/")}
+
+
+class MediaStore:
+    """
+    Image and media parts of one output package, one per distinct content.
+
+    Parts are looked up by the source part first and by the SHA1 of their
+    bytes second, so each source image is hashed once and identical images
+    (within the source deck or already in the template) share one part.
+    """
+
+    def __init__(self, package, known_hashes=None):
+        self.package = package
+        parts = {str(part.partname): part for part in package.iter_parts()}
+        if known_hashes is None:
+            known_hashes = media_hashes(package)
+        self.by_hash = {sha: parts[name] for sha, name in known_hashes.items() if name in parts}
+        self.by_source = {}
+        self._partnames = set(parts)
+        self._counters = {}
+
+    def part_for(self, source_part):
+        """Return the output part holding the same bytes as `source_part`"""
+        part = self.by_source.get(source_part)
+        if part is None:
+            blob = source_part.blob
+            digest = hashlib.sha1(blob).hexdigest()
+            part = self.by_hash.get(digest)
+            if part is None:
+                part = self._new_part(source_part, blob)
+                self.by_hash[digest] = part
+            self.by_source[source_part] = part
+        return part
+
+    def _new_part(self, source_part, blob):
+        stem = re.sub(r"\d*\.[^.]*$", "", source_part.partname.filename) or "media"
+        n = self._counters.get(stem, 0)
+        while True:
+            n += 1
+            name = f"/ppt/media/{stem}{n}.{source_part.partname.ext}"
+            if name not in self._partnames:
+                break
+        self._counters[stem] = n
+        self._partnames.add(name)
+        cls = ImagePart if isinstance(source_part, ImagePart) else Part
+        return cls(PackURI(name), source_part.content_type, self.package, blob)
+
+
+def is_copyable(shape):
+    """True for the shapes copied as XML: pictures, tables and simple groups"""
+    if isinstance(shape, Picture) or shape.has_table:
+        return True
+    if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+        # Charts and diagrams inside a group need parts of their own
+        return not shape._element.xpath(f".//a:graphicData[@uri!='{TABLE_URI}']")
+    return False
+
+
+def _remap_rels(element, source_part, target_part, media):
+    """Point every r:* attribute in `element` at a relationship of `target_part`"""
+    for node in element.iter():
+        for attr, rId in list(node.attrib.items()):
+            if not attr.startswith(_R_NS):
+                continue
+            rel = source_part.rels.get(rId)
+            if rel is not None and rel.is_external:
+                node.set(attr, target_part.relate_to(rel.target_ref, rel.reltype, is_external=True))
+            elif rel is not None and rel.reltype in MEDIA_RELTYPES:
+                node.set(attr, target_part.relate_to(media.part_for(rel.target_part), rel.reltype))
+            else:
+                del node.attrib[attr]
+
+
+def copy_shape(shape, new_slide, media):
+    """
+    Append a copy of `shape` to `new_slide` and return the new shape.
+
+    A placeholder is copied as an ordinary shape at the position it had on
+    the source slide, since the template's layouts may place it elsewhere.
+    """
+    element = copy.deepcopy(shape._element)
+    _remap_rels(element, shape.part, new_slide.part, media)
+    for ph in element.xpath("./*[1]/p:nvPr/p:ph"):
+        ph.getparent().remove(ph)
+
+    sp_tree = new_slide.shapes._spTree
+    next_id = max((int(v) for v in sp_tree.xpath("//@id") if v.isdigit()), default=0) + 1
+    for c_nv_pr in element.xpath(".//p:cNvPr"):
+        c_nv_pr.set("id", str(next_id))
+        next_id += 1
+    sp_tree.append(element)
+
+    new_shape = new_slide.shapes[len(new_slide.shapes) - 1]
+    if shape.is_placeholder:
+        new_shape.left, new_shape.top = shape.left, shape.top
+        new_shape.width, new_shape.height = shape.width, shape.height
+    return new_shape
+
+
+def copy_notes(slide, new_slide):
+    """Copy the speaker notes text of `slide` to `new_slide`"""
+    if not slide.has_notes_slide:
+        return
+    frame = slide.notes_slide.notes_text_frame
+    if frame is None or not frame.text.strip():
+        return
+    target = new_slide.notes_slide.notes_text_frame
+    if target is not None:
+        target.text = frame.text
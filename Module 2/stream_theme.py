@@ -0,0 +1,466 @@
+"""
+Low-memory theming engine that works directly on the OPC zip packages.
+
+copy_slides_to_template loads the source deck and the template into
+python-pptx's object model. This engine never does. It copies the
+template's entries (minus its slides) and the source slides from zip to
+zip, and parses one slide XML part at a time with iterparse. Each slide
+is pointed at the template layout that best fits its placeholders; a
+placeholder with no counterpart there becomes a plain shape at the
+position it inherited from its old layout. Media entries are copied as
+raw bytes, once per distinct content, and already-compressed formats are
+stored without deflating them again. Any other
+part a slide uses (charts, embedded workbooks, notes) is copied with its
+relationships rewritten. Relationship ids are kept, so no XML apart from
+the slides' placeholder references has to be rewritten, and memory is
+bounded by the largest single XML part rather than by the deck size.
+"""
+import copy
+import hashlib
+import os
+import posixpath
+import shutil
+import threading
+import zipfile
+from collections import Counter
+
+from lxml import etree
+
+from layout_index import XML_KINDS, LayoutIndex
+
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+P14_SECTIONS = "{http://schemas.microsoft.com/office/powerpoint/2010/main}sectionLst"
+
+RT_OFFICE_DOCUMENT = f"{R_NS}/officeDocument"
+RT_SLIDE = f"{R_NS}/slide"
+RT_SLIDE_LAYOUT = f"{R_NS}/slideLayout"
+RT_SLIDE_MASTER = f"{R_NS}/slideMaster"
+RT_NOTES_SLIDE = f"{R_NS}/notesSlide"
+RT_NOTES_MASTER = f"{R_NS}/notesMaster"
+SLIDE_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+
+COPY_CHUNK = 1 << 20
+# Stored as they are: deflating these again only costs time
+COMPRESSED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp", ".wdp", ".tif", ".tiff",
+                         ".mp4", ".m4v", ".mov", ".wmv", ".avi", ".mp3", ".m4a", ".wma",
+                         ".xlsx", ".docx", ".pptx", ".zip"}
+
+
+def _q(ns, tag):
+    return f"{{{ns}}}{tag}"
+
+
+def rels_name(part):
+    """Name of the relationships entry of a part ("" is the package itself)"""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def resolve(part, target):
+    """Absolute entry name of a relationship target relative to `part`"""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def relative(part, target):
+    """Relationship target pointing from `part` to entry `target`"""
+    return posixpath.relpath(target, posixpath.dirname(part) or ".")
+
+
+def read_rels(zf, part):
+    """Return [(rId, type, target, mode)] of a part, [] when it has none"""
+    try:
+        data = zf.read(rels_name(part))
+    except KeyError:
+        return []
+    return [(rel.get("Id"), rel.get("Type"), rel.get("Target"), rel.get("TargetMode"))
+            for rel in etree.fromstring(data).iter(_q(REL_NS, "Relationship"))]
+
+
+def copy_entry(src_zip, name, out, out_name=None):
+    """Stream one zip entry into `out`, deflating it unless it is already compressed"""
+    info = zipfile.ZipInfo(out_name or name, date_time=src_zip.getinfo(name).date_time)
+    stored = posixpath.splitext(name)[1].lower() in COMPRESSED_EXTENSIONS
+    info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+    with src_zip.open(name) as src, out.open(info, "w") as dst:
+        shutil.copyfileobj(src, dst, COPY_CHUNK)
+
+
+def rels_xml(rels):
+    root = etree.Element(_q(REL_NS, "Relationships"), nsmap={None: REL_NS})
+    for rId, reltype, target, mode in rels:
+        rel = etree.SubElement(root, _q(REL_NS, "Relationship"), Id=rId, Type=reltype, Target=target)
+        if mode:
+            rel.set("TargetMode", mode)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+class ContentTypes:
+    """[Content_Types].xml: defaults by extension and overrides by entry name"""
+
+    def __init__(self, zf):
+        root = etree.fromstring(zf.read("[Content_Types].xml"))
+        self.defaults = {el.get("Extension").lower(): el.get("ContentType")
+                         for el in root.iter(_q(CT_NS, "Default"))}
+        self.overrides = {el.get("PartName").lstrip("/"): el.get("ContentType")
+                          for el in root.iter(_q(CT_NS, "Override"))}
+
+    def type_of(self, name):
+        if name in self.overrides:
+            return self.overrides[name]
+        return self.defaults.get(posixpath.splitext(name)[1][1:].lower())
+
+    def xml(self, overrides):
+        root = etree.Element(_q(CT_NS, "Types"), nsmap={None: CT_NS})
+        for ext, content_type in sorted(self.defaults.items()):
+            etree.SubElement(root, _q(CT_NS, "Default"), Extension=ext, ContentType=content_type)
+        for name, content_type in overrides.items():
+            etree.SubElement(root, _q(CT_NS, "Override"), PartName=f"/{name}", ContentType=content_type)
+        return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def placeholders(root):
+    """The <p:ph> elements of a slide or layout's own shapes"""
+    return root.iterfind(f".//{_q(P_NS, 'nvPr')}/{_q(P_NS, 'ph')}")
+
+
+class StreamTemplate:
+    """
+    What the streaming engine needs from a template, read once.
+
+    Only the package structure and the layout XML parts are parsed; the
+    entries themselves are copied from the template file for every deck.
+    """
+
+    def __init__(self, template_path):
+        self.path = template_path
+        with zipfile.ZipFile(template_path) as zf:
+            self.types = ContentTypes(zf)
+            self.presentation = next(resolve("", target) for _, reltype, target, _ in read_rels(zf, "")
+                                     if reltype == RT_OFFICE_DOCUMENT)
+            self.presentation_xml = zf.read(self.presentation)
+            self.presentation_rels = [rel for rel in read_rels(zf, self.presentation)
+                                      if rel[1] != RT_SLIDE]
+            self.notes_master = next((resolve(self.presentation, target)
+                                      for _, reltype, target, _ in self.presentation_rels
+                                      if reltype == RT_NOTES_MASTER), None)
+            self.entries = self._reachable(zf)
+            self.layouts, self.layout_types = self._layouts(zf)
+        self.layout_index = LayoutIndex([list(types.items()) for types in self.layout_kinds()])
+
+    def _reachable(self, zf):
+        """Entries reachable from the package relationships without going through a slide"""
+        names = set(zf.namelist())
+        seen, todo = set(), [""]
+        while todo:
+            part = todo.pop()
+            if rels_name(part) in names:
+                seen.add(rels_name(part))
+            for _, reltype, target, mode in read_rels(zf, part):
+                if mode == "External" or reltype in (RT_SLIDE, RT_NOTES_SLIDE):
+                    continue
+                name = resolve(part, target)
+                if name in names and name not in seen:
+                    seen.add(name)
+                    todo.append(name)
+        return sorted(seen)
+
+    def _layouts(self, zf):
+        """Layout entry names in master order, with {idx: ph type} for each"""
+        layouts, layout_types = [], []
+        pres = etree.fromstring(self.presentation_xml)
+        pres_rels = {rId: resolve(self.presentation, target) for rId, _, target, _ in self.presentation_rels}
+        for master_id in pres.iter(_q(P_NS, "sldMasterId")):
+            master = pres_rels[master_id.get(_q(R_NS, "id"))]
+            master_rels = {rId: resolve(master, target) for rId, _, target, _ in read_rels(zf, master)}
+            for layout_id in etree.fromstring(zf.read(master)).iter(_q(P_NS, "sldLayoutId")):
+                layout = master_rels[layout_id.get(_q(R_NS, "id"))]
+                types = {}
+                for ph in placeholders(etree.fromstring(zf.read(layout))):
+                    if XML_KINDS.get(ph.get("type", "obj")):
+                        types[int(ph.get("idx", "0"))] = ph.get("type", "obj")
+                layouts.append(layout)
+                layout_types.append(types)
+        return layouts, layout_types
+
+    def layout_kinds(self):
+        return [{idx: XML_KINDS[ph_type] for idx, ph_type in types.items()} for types in self.layout_types]
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def prepare_stream_template(template_path):
+    """Return the StreamTemplate for a file, reading it only once per process"""
+    key = (os.path.abspath(template_path), os.stat(template_path).st_mtime_ns)
+    with _templates_lock:
+        if key not in _templates:
+            _templates[key] = StreamTemplate(template_path)
+        return _templates[key]
+
+
+class _PackageWriter:
+    """Copies source parts into the output zip, renaming them where names clash"""
+
+    def __init__(self, source, out, template):
+        self.source = source
+        self.out = out
+        self.template = template
+        self.types = ContentTypes(source)
+        self.names = set(source.namelist())
+        self.used = set(template.entries)
+        self.mapped = {}            # source entry -> output entry
+        self.by_hash = {}           # sha1 of a binary entry -> output entry
+        self.overrides = {}         # output entry -> content type
+
+    def allocate(self, name):
+        if name not in self.used:
+            self.used.add(name)
+            return name
+        stem, ext = posixpath.splitext(name)
+        stem = stem.rstrip("0123456789")
+        n = 1
+        while f"{stem}{n}{ext}" in self.used:
+            n += 1
+        self.used.add(f"{stem}{n}{ext}")
+        return f"{stem}{n}{ext}"
+
+    def _sha1(self, name):
+        digest = hashlib.sha1()
+        with self.source.open(name) as src:
+            for block in iter(lambda: src.read(COPY_CHUNK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def copy_part(self, name):
+        """Copy a source entry (and what it relates to); return its output name"""
+        if name in self.mapped:
+            return self.mapped[name]
+        content_type = self.types.type_of(name) or "application/octet-stream"
+        if not content_type.endswith("xml"):
+            digest = self._sha1(name)
+            if digest in self.by_hash:
+                self.mapped[name] = self.by_hash[digest]
+                return self.mapped[name]
+        out_name = self.mapped[name] = self.allocate(name)
+        if not content_type.endswith("xml"):
+            self.by_hash[digest] = out_name
+        copy_entry(self.source, name, self.out, out_name)
+        self.overrides[out_name] = content_type
+        self.write_rels(name, out_name)
+        return out_name
+
+    def write_rels(self, name, out_name, layout=None):
+        """Rewrite the relationships of a copied part for its new place"""
+        rels = []
+        for rId, reltype, target, mode in read_rels(self.source, name):
+            if mode == "External":
+                rels.append((rId, reltype, target, mode))
+                continue
+            target_name = resolve(name, target)
+            if reltype == RT_SLIDE_LAYOUT:
+                target_name = layout
+            elif reltype == RT_NOTES_MASTER:
+                target_name = self.template.notes_master
+            elif reltype == RT_NOTES_SLIDE and self.template.notes_master is None:
+                target_name = None      # notes need a notes master in the template
+            elif reltype == RT_SLIDE_MASTER or target_name not in self.names:
+                target_name = None
+            else:
+                target_name = self.copy_part(target_name)
+            if target_name is not None:
+                rels.append((rId, reltype, relative(out_name, target_name), None))
+        if rels:
+            self.out.writestr(rels_name(out_name), rels_xml(rels))
+
+
+def _source_slides(source):
+    """Slide entry names of a source package in presentation order"""
+    presentation = next(resolve("", target) for _, reltype, target, _ in read_rels(source, "")
+                        if reltype == RT_OFFICE_DOCUMENT)
+    rels = {rId: resolve(presentation, target) for rId, _, target, _ in read_rels(source, presentation)}
+    root = etree.fromstring(source.read(presentation))
+    return [rels[el.get(_q(R_NS, "id"))] for el in root.iter(_q(P_NS, "sldId"))]
+
+
+class _InheritedGeometry:
+    """Placeholder positions of the source deck's layouts and masters, read once per part"""
+
+    def __init__(self, source):
+        self.source = source
+        self._parts = {}
+
+    def _part(self, name):
+        """({idx: xfrm}, {type: xfrm}) of the placeholders of a layout or master"""
+        if name not in self._parts:
+            by_idx, by_type = {}, {}
+            for ph in placeholders(etree.fromstring(self.source.read(name))):
+                shape = ph.getparent().getparent().getparent()
+                xfrm = shape.find(f"{_q(P_NS, 'spPr')}/{_q(A_NS, 'xfrm')}")
+                if xfrm is not None:
+                    by_idx.setdefault(ph.get("idx", "0"), xfrm)
+                    by_type.setdefault(ph.get("type", "obj"), xfrm)
+            self._parts[name] = by_idx, by_type
+        return self._parts[name]
+
+    def _related(self, part, reltype):
+        return next((resolve(part, target) for _, kind, target, mode in read_rels(self.source, part)
+                     if kind == reltype and mode != "External"), None)
+
+    def xfrm(self, slide, ph):
+        """The a:xfrm a slide placeholder inherits from its layout or master, else None"""
+        layout = self._related(slide, RT_SLIDE_LAYOUT)
+        if layout is None:
+            return None
+        by_idx, by_type = self._part(layout)
+        ph_type = ph.get("type", "obj")
+        found = by_idx.get(ph.get("idx", "0")) if ph.get("idx") else None
+        found = found if found is not None else by_type.get(ph_type)
+        master = self._related(layout, RT_SLIDE_MASTER)
+        if found is None and master is not None:
+            _, master_types = self._part(master)
+            found = master_types.get(ph_type, master_types.get("body" if ph_type == "obj" else ph_type))
+        return found
+
+
+def _unplace(ph, xfrm):
+    """Turn a placeholder shape into a plain shape, keeping `xfrm` if it has no own position"""
+    shape = ph.getparent().getparent().getparent()
+    ph.getparent().remove(ph)
+    if xfrm is None:
+        return
+    if shape.tag == _q(P_NS, "graphicFrame"):
+        if shape.find(_q(P_NS, "xfrm")) is None:
+            frame_xfrm = etree.Element(_q(P_NS, "xfrm"))
+            frame_xfrm.extend(copy.deepcopy(child) for child in xfrm)
+            shape[0].addnext(frame_xfrm)
+        return
+    sp_pr = shape.find(_q(P_NS, "spPr"))
+    if sp_pr is not None and sp_pr.find(_q(A_NS, "xfrm")) is None:
+        sp_pr.insert(0, copy.deepcopy(xfrm))
+
+
+def _theme_slide(source, name, template, geometry=None):
+    """Parse one slide, point its placeholders at the best layout; return (xml, layout)"""
+    kinds, slots, phs = Counter(), [], []
+    with source.open(name) as f:
+        context = etree.iterparse(f, events=("end",), tag=_q(P_NS, "ph"))
+        for _, ph in context:
+            kind = XML_KINDS.get(ph.get("type", "obj"))
+            if kind is not None:
+                kinds[kind] += 1
+                slots.append((int(ph.get("idx", "0")), kind))
+                phs.append(ph)
+        root = context.root
+    index = template.layout_index
+    layout_pos = index.best_layout(tuple(sorted(kinds.items())))
+    types = template.layout_types[layout_pos]
+    geometry = geometry or _InheritedGeometry(source)
+    for ph, target in zip(phs, index.placeholder_mapping(layout_pos, tuple(slots))):
+        if target is not None:
+            ph.set("type", types[target])
+            ph.set("idx", str(target))
+        else:
+            # No such placeholder in the new layout: keep the shape where it was
+            _unplace(ph, geometry.xfrm(name, ph))
+    xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+    return xml, template.layouts[layout_pos]
+
+
+def _presentation_xml(template, slide_rids):
+    """The template's presentation part listing the new slides"""
+    root = etree.fromstring(template.presentation_xml)
+    sld_id_lst = root.find(_q(P_NS, "sldIdLst"))
+    if sld_id_lst is None:
+        sld_id_lst = etree.Element(_q(P_NS, "sldIdLst"))
+        anchor = root.find(_q(P_NS, "sldSz"))
+        if anchor is None:
+            anchor = root.find(_q(P_NS, "notesSz"))
+        anchor.addprevious(sld_id_lst)
+    sld_id_lst.clear()
+    for n, rId in enumerate(slide_rids):
+        etree.SubElement(sld_id_lst, _q(P_NS, "sldId"), {"id": str(256 + n), _q(R_NS, "id"): rId})
+    # Custom shows and sections refer to the template's own slides
+    for el in list(root.iter(_q(P_NS, "custShowLst"), P14_SECTIONS)):
+        parent = el.getparent()
+        if el.tag == P14_SECTIONS and parent.tag == _q(P_NS, "ext"):
+            el, parent = parent, parent.getparent()
+        parent.remove(el)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def stream_slides_to_template(source_path, template_path, output_path, verbose=True):
+    """
+    Theme `source_path` with a template without loading either into memory.
+
+    `template_path` may also be a StreamTemplate. Same contract as
+    copy_slides_to_template: returns True on success, prints errors.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    log(f"Checking source file: {source_path}")
+    if not os.path.exists(source_path):
+        print(f"ERROR: Source file not found: {source_path}")
+        return False
+
+    if not isinstance(template_path, StreamTemplate):
+        log(f"Checking template file: {template_path}")
+        if not os.path.exists(template_path):
+            print(f"ERROR: Template file not found: {template_path}")
+            return False
+
+    try:
+        template = template_path
+        if not isinstance(template, StreamTemplate):
+            template = prepare_stream_template(template_path)
+
+        with zipfile.ZipFile(source_path) as source, zipfile.ZipFile(template.path) as tpl, \
+                zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as out:
+            log("Copying template parts...")
+            pres_rels = rels_name(template.presentation)
+            for name in template.entries:
+                if name not in (template.presentation, pres_rels):
+                    copy_entry(tpl, name, out)
+            overrides = {name: template.types.overrides[name]
+                         for name in template.entries if name in template.types.overrides}
+
+            writer = _PackageWriter(source, out, template)
+            slides = _source_slides(source)
+            log(f"Copying {len(slides)} slides from source presentation...")
+            for i, name in enumerate(slides):
+                writer.mapped[name] = writer.allocate(f"ppt/slides/slide{i+1}.xml")
+
+            last_id = max((int(rId[3:]) for rId, *_ in template.presentation_rels
+                           if rId.startswith("rId") and rId[3:].isdigit()), default=0)
+            slide_rels, slide_rids = [], []
+            geometry = _InheritedGeometry(source)
+            for i, name in enumerate(slides):
+                log(f"Processing slide {i+1}...")
+                out_name = writer.mapped[name]
+                xml, layout = _theme_slide(source, name, template, geometry)
+                out.writestr(out_name, xml)
+                writer.overrides[out_name] = SLIDE_CONTENT_TYPE
+                writer.write_rels(name, out_name, layout=layout)
+
+                rId = f"rId{last_id + i + 1}"
+                slide_rids.append(rId)
+                slide_rels.append((rId, RT_SLIDE, relative(template.presentation, out_name), None))
+
+            log(f"Saving presentation to: {output_path}")
+            out.writestr(template.presentation, _presentation_xml(template, slide_rids))
+            out.writestr(pres_rels, rels_xml(template.presentation_rels + slide_rels))
+            overrides.update(writer.overrides)
+            out.writestr("[Content_Types].xml", template.types.xml(overrides))
+        log("Done!")
+        return True
+
+    except Exception as e:
+        import traceback
+        print(f"ERROR: {str(e)}")
+        traceback.print_exc()
+        return False
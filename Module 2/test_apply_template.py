@@ -0,0 +1,163 @@
+import io
+import os
+import zipfile
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.util import Inches
+
+import apply_template
+from apply_template import (PreparedTemplate, apply_template_batch, batch_jobs, copy_slides_to_template,
+                            find_decks, prepare_template)
+
+
+def make_deck(path, titles):
+    prs = Presentation()
+    for title in titles:
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = title
+        slide.placeholders[1].text = f"{title} body"
+    prs.save(path)
+    return path
+
+
+def test_prepared_template_has_no_slides(tmp_path):
+    template = PreparedTemplate(make_deck(tmp_path / "template.pptx", ["T1", "T2"]))
+    prs = template.new_presentation()
+
+    assert len(prs.slides) == 0
+    assert len(prs.slide_layouts) == 11
+
+
+def test_template_file_is_parsed_once_for_many_decks(tmp_path, monkeypatch):
+    template_path = str(make_deck(tmp_path / "template.pptx", ["Template slide"]))
+    sources = [make_deck(tmp_path / f"src{i}.pptx", [f"Deck {i}", "Second"]) for i in range(3)]
+
+    opened = []
+    real_presentation = apply_template.Presentation
+
+    def counting_presentation(src=None):
+        opened.append(src)
+        return real_presentation(src)
+
+    monkeypatch.setattr(apply_template, "Presentation", counting_presentation)
+    for i, src in enumerate(sources):
+        assert copy_slides_to_template(str(src), template_path, str(tmp_path / f"out{i}.pptx"))
+
+    assert opened.count(template_path) == 1
+    assert prepare_template(template_path) is prepare_template(template_path)
+
+    out = Presentation(str(tmp_path / "out2.pptx"))
+    assert [s.shapes.title.text for s in out.slides] == ["Deck 2", "Second"]
+
+
+def test_batch_themes_directory_across_processes(tmp_path):
+    template_path = str(make_deck(tmp_path / "template.pptx", ["Template slide"]))
+    (tmp_path / "in").mkdir()
+    for i in range(4):
+        make_deck(tmp_path / "in" / f"deck{i}.pptx", [f"Deck {i}"])
+    (tmp_path / "in" / "~$deck0.pptx").write_bytes(b"lock file")
+    (tmp_path / "in" / "broken.pptx").write_bytes(b"not a deck")
+
+    decks = find_decks([str(tmp_path / "in")])
+    assert len(decks) == 5
+
+    results = apply_template_batch(decks, template_path, str(tmp_path / "out"), workers=2)
+    status = {os.path.basename(src): ok for src, _, ok, _ in results}
+    assert status == {"broken.pptx": False, "deck0.pptx": True, "deck1.pptx": True,
+                      "deck2.pptx": True, "deck3.pptx": True}
+    assert Presentation(str(tmp_path / "out" / "deck3.pptx")).slides[0].shapes.title.text == "Deck 3"
+
+
+def test_batch_rejects_clashing_outputs(tmp_path):
+    for folder in ("q1", "q2"):
+        (tmp_path / folder).mkdir()
+        make_deck(tmp_path / folder / "review.pptx", [folder])
+    decks = find_decks([str(tmp_path / "**" / "*.pptx")])
+    assert len(decks) == 2
+
+    with pytest.raises(ValueError, match="would both be written to"):
+        apply_template_batch(decks, str(tmp_path / "q1" / "review.pptx"), str(tmp_path / "out"))
+    assert not (tmp_path / "out").exists()
+    with pytest.raises(ValueError, match="would overwrite the input"):
+        batch_jobs(decks[:1], str(tmp_path / "q1"))
+    assert batch_jobs(decks[:1], str(tmp_path / "out")) == [(decks[0], str(tmp_path / "out" / "review.pptx"))]
+
+
+def test_layouts_follow_slide_content(tmp_path):
+    prs = Presentation()
+    cover = prs.slides.add_slide(prs.slide_layouts[0])
+    cover.shapes.title.text = "Cover"
+    cover.placeholders[1].text = "Subtitle"
+    content = prs.slides.add_slide(prs.slide_layouts[1])
+    content.shapes.title.text = "Content"
+    content.placeholders[1].text = "Bullet"
+    prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = "Heading only"
+    loose = prs.slides.add_slide(prs.slide_layouts[5])
+    loose.shapes.title.text = "Loose text"
+    loose.shapes.add_textbox(0, 0, 100, 100).text_frame.text = "From a text box"
+    prs.save(tmp_path / "src.pptx")
+
+    template = PreparedTemplate(make_deck(tmp_path / "template.pptx", ["T"]))
+    assert copy_slides_to_template(str(tmp_path / "src.pptx"), template, str(tmp_path / "out.pptx"))
+
+    out = Presentation(str(tmp_path / "out.pptx"))
+    names = [s.slide_layout.name for s in out.slides]
+    assert names == ["Title Slide", "Title and Content", "Title Only", "Title and Content"]
+    assert out.slides[0].placeholders[1].text == "Subtitle"
+    assert out.slides[3].placeholders[1].text == "From a text box"
+    # Signatures repeat across slides, so the lookup is memoised
+    assert len(template.layout_index._layout_for) == 3
+
+
+def test_text_without_a_free_placeholder_is_kept(tmp_path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[5])
+    slide.shapes.title.text = "Heading"
+    slide.shapes.add_textbox(Inches(1), Inches(2), Inches(4), Inches(1)).text_frame.text = "Loose one"
+    slide.shapes.add_textbox(Inches(1), Inches(3), Inches(4), Inches(1)).text_frame.text = "Loose two"
+    prs.save(tmp_path / "src.pptx")
+    template = Presentation()
+    for layout in template.slide_layouts:
+        for ph in list(layout.placeholders):
+            ph._element.getparent().remove(ph._element)
+    template.save(tmp_path / "template.pptx")
+
+    assert copy_slides_to_template(str(tmp_path / "src.pptx"), str(tmp_path / "template.pptx"),
+                                   str(tmp_path / "out.pptx"))
+
+    texts = [shape.text_frame.text for shape in Presentation(str(tmp_path / "out.pptx")).slides[0].shapes
+             if shape.has_text_frame]
+    assert texts == ["Heading\nLoose one\nLoose two"]
+
+
+def test_pictures_tables_and_notes_are_copied_with_shared_media(tmp_path):
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 32), "red").save(buffer, "PNG")
+    logo = buffer.getvalue()
+
+    prs = Presentation()
+    for i in range(5):
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = f"Slide {i}"
+        slide.shapes.add_picture(io.BytesIO(logo), Inches(1), Inches(2))
+        table = slide.shapes.add_table(2, 2, Inches(1), Inches(4), Inches(4), Inches(1)).table
+        table.cell(0, 0).text = f"cell {i}"
+        slide.notes_slide.notes_text_frame.text = f"note {i}"
+    prs.save(tmp_path / "src.pptx")
+
+    template = PreparedTemplate(make_deck(tmp_path / "template.pptx", ["T"]))
+    assert copy_slides_to_template(str(tmp_path / "src.pptx"), template, str(tmp_path / "out.pptx"))
+
+    out = Presentation(str(tmp_path / "out.pptx"))
+    last = out.slides[4]
+    pictures = [s for s in last.shapes if s.shape_type == MSO_SHAPE_TYPE.PICTURE]
+    tables = [s for s in last.shapes if s.has_table]
+    assert pictures[0].image.blob == logo and pictures[0].left == Inches(1)
+    assert tables[0].table.cell(0, 0).text == "cell 4"
+    assert last.notes_slide.notes_text_frame.text == "note 4"
+
+    media = [n for n in zipfile.ZipFile(tmp_path / "out.pptx").namelist() if n.startswith("ppt/media/")]
+    assert media == ["ppt/media/image1.png"]
@@ -0,0 +1,94 @@
+import io
+import zipfile
+
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+from apply_template import apply_template_batch
+from stream_theme import StreamTemplate, stream_slides_to_template
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 32), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_template(path):
+    prs = Presentation()
+    prs.slides.add_slide(prs.slide_layouts[1]).shapes.title.text = "Template slide"
+    prs.notes_master     # created on first access
+    prs.save(path)
+    return str(path)
+
+
+def make_source(path, count):
+    logo = png_bytes()
+    prs = Presentation()
+    cover = prs.slides.add_slide(prs.slide_layouts[0])
+    cover.shapes.title.text = "Cover"
+    cover.placeholders[1].text = "Subtitle"
+    for i in range(count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        slide.placeholders[1].text = f"Body {i}"
+        slide.shapes.add_picture(io.BytesIO(logo), Inches(1), Inches(2))
+        slide.notes_slide.notes_text_frame.text = f"note {i}"
+    prs.save(path)
+    return str(path)
+
+
+def test_stream_engine_rebuilds_deck_on_template_layouts(tmp_path):
+    template = StreamTemplate(make_template(tmp_path / "template.pptx"))
+    source = make_source(tmp_path / "src.pptx", 20)
+
+    assert stream_slides_to_template(source, template, str(tmp_path / "out.pptx"), verbose=False)
+
+    out = Presentation(str(tmp_path / "out.pptx"))
+    assert len(out.slides) == 21
+    assert out.slides[0].slide_layout.name == "Title Slide"
+    assert [ph.text for ph in out.slides[0].placeholders] == ["Cover", "Subtitle"]
+    last = out.slides[20]
+    assert last.slide_layout.name == "Title and Content"
+    assert [ph.text for ph in last.placeholders] == ["Slide 19", "Body 19"]
+    assert last.shapes[-1].image.blob == png_bytes()
+    assert last.notes_slide.notes_text_frame.text == "note 19"
+
+    names = zipfile.ZipFile(tmp_path / "out.pptx").namelist()
+    assert [n for n in names if n.startswith("ppt/media/")] == ["ppt/media/image1.png"]
+    assert zipfile.ZipFile(tmp_path / "out.pptx").getinfo("ppt/media/image1.png").compress_type == zipfile.ZIP_STORED
+    assert "Template slide" not in [s.shapes.title.text for s in out.slides]
+
+
+def test_batch_can_use_stream_engine(tmp_path):
+    template = make_template(tmp_path / "template.pptx")
+    (tmp_path / "in").mkdir()
+    decks = [make_source(tmp_path / "in" / f"deck{i}.pptx", 2) for i in range(3)]
+
+    results = apply_template_batch(decks, template, str(tmp_path / "out"), workers=2, engine="stream")
+
+    assert all(ok for _, _, ok, _ in results)
+    assert Presentation(str(tmp_path / "out" / "deck2.pptx")).slides[2].shapes.title.text == "Slide 1"
+
+
+def test_unmatched_placeholders_keep_their_position(tmp_path):
+    template = Presentation()
+    for layout in template.slide_layouts:
+        for ph in list(layout.placeholders):
+            ph._element.getparent().remove(ph._element)
+    template.save(tmp_path / "template.pptx")
+    src = Presentation()
+    slide = src.slides.add_slide(src.slide_layouts[1])
+    slide.shapes.title.text = "Heading"
+    slide.placeholders[1].text = "Body"
+    expected = [(ph.left, ph.top, ph.width, ph.height) for ph in slide.placeholders]
+    src.save(tmp_path / "src.pptx")
+
+    assert stream_slides_to_template(str(tmp_path / "src.pptx"), str(tmp_path / "template.pptx"),
+                                     str(tmp_path / "out.pptx"), verbose=False)
+
+    shapes = list(Presentation(str(tmp_path / "out.pptx")).slides[0].shapes)
+    assert [shape.is_placeholder for shape in shapes] == [False, False]
+    assert [shape.text_frame.text for shape in shapes] == ["Heading", "Body"]
+    assert [(s.left, s.top, s.width, s.height) for s in shapes] == expected
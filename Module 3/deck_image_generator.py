@@ -1,50 +1,97 @@
 ###############################################################################  
 # ppt_image_generator.py  –  Generate images for PowerPoint slides  
 ###############################################################################  
-import os, base64, mimetypes, json, textwrap, re, io, argparse, requests
+import os, sys, base64, mimetypes, json, textwrap, re, io, argparse, threading
 from pathlib import Path
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
   
 from dotenv import load_dotenv  
-from langchain_openai import AzureChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from pptx import Presentation
-from pptx.util import Inches, Pt
-import matplotlib.pyplot as plt
-import numpy as np
-from PIL import Image
+# langchain, huggingface_hub, python-pptx and Pillow are imported where  
+# they are first used, so --help and argument errors return immediately  
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))   # repo root, for common/
+from common.llm_cache import add_llm_cache_arguments, cached_llm_from_args
+from common.instrumentation import InstrumentedLLM, add_report_arguments, span, write_report_from_args
+from throttle import RequestScheduler, RetryPolicy
+from prompt_planner import iter_prompt_plans, MAX_SLIDES_PER_CHUNK
+from image_cache import ImageCache, image_cache_key, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from image_backends import BACKENDS, HuggingFaceBackend, create_backend
+from run_journal import DONE, FAILED, PLACEHOLDER, RunJournal
   
 ###############################################################################  
 # 1.  Azure OpenAI client  
 ###############################################################################  
 load_dotenv()  
 
-# Initialize Azure OpenAI client
-llm = AzureChatOpenAI(
-            azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
-            azure_deployment="gpt-4o",
-            api_version="2024-06-01",
-            api_key=os.getenv('AZURE_OPENAI_API_KEY'),
-            max_tokens=None,
-            temperature=0.7,
-)
+AZURE_DEPLOYMENT = "gpt-4o"
+TEMPERATURE = 0.7
 
-# Use Hugging Face for image generation
-import huggingface_hub
-from huggingface_hub import InferenceClient
+# Azure OpenAI client, built on first use by get_llm()
+llm = None
+_client_lock = threading.Lock()
+
+def create_llm():
+    """Initialize Azure OpenAI client"""
+    from langchain_openai import AzureChatOpenAI
+    return AzureChatOpenAI(
+                azure_endpoint=os.getenv('AZURE_OPENAI_ENDPOINT'),
+                azure_deployment=AZURE_DEPLOYMENT,
+                api_version="2024-06-01",
+                api_key=os.getenv('AZURE_OPENAI_API_KEY'),
+                max_tokens=None,
+                temperature=TEMPERATURE,
+    )
 
-# Initialize Hugging Face client for image generation
+def get_llm():
+    """Return the shared Azure OpenAI client, creating it on first use"""
+    global llm
+    if llm is None:
+        with _client_lock:
+            if llm is None:
+                llm = create_llm()
+    return llm
+
+# Use Hugging Face for image generation
 HF_TOKEN = os.getenv("HF_TOKEN")  # Your Hugging Face API token
 # Default to a stable diffusion model that's good for general purpose images
 HF_MODEL_ID = os.getenv("HF_MODEL_ID", "stabilityai/stable-diffusion-xl-base-1.0")
+HF_NEGATIVE_PROMPT = "text, watermark, signature, blurry, distorted, low quality, ugly"
+IMAGE_WIDTH = 1024
+IMAGE_HEIGHT = 1024
+IMAGE_SEED = None               # set with --seed for reproducible (and reusable) images
 
+# Cache of generated images, set up in main() unless --no_cache is given
+image_cache = None
 
+# Image backend, built on first use by get_image_backend(); None means
+# no backend is configured and placeholders are generated instead
+image_backend = None
+_image_backend_ready = False
+IMAGE_CACHE_ID = None           # cache identity kept for --replay, where no backend is used
 
-hf_client = InferenceClient(
-            provider="hf-inference",
-            api_key=os.environ["HF_TOKEN"],
-)
+def set_image_backend(backend):
+    """Use `backend` (an ImageBackend) for image generation (None forces placeholders)"""
+    global image_backend, _image_backend_ready
+    image_backend, _image_backend_ready = backend, True
+
+def get_image_backend():
+    """Return the image backend, defaulting to Hugging Face when HF_TOKEN is set"""
+    global image_backend, _image_backend_ready
+    if not _image_backend_ready:
+        with _client_lock:
+            if not _image_backend_ready:
+                token = os.getenv("HF_TOKEN")
+                if image_backend is None and token:
+                    image_backend = HuggingFaceBackend(HF_MODEL_ID, token)
+                _image_backend_ready = True
+    return image_backend
+
+def image_cache_id():
+    """Model identity used in image cache keys"""
+    backend = get_image_backend()
+    return backend.cache_id if backend is not None else IMAGE_CACHE_ID or HF_MODEL_ID
         
 
   
@@ -70,149 +117,265 @@ def extract_slide_content(slide):
     
     return content
 
-def generate_image_prompt(slide_content):
-    """Generate a prompt for image creation based on slide content"""
-    title = slide_content["title"]
-    text = " ".join(slide_content["text"])
-    
-    system_message = """You are an expert at creating detailed image prompts for DALL-E.
-    Based on the PowerPoint slide content provided, create three distinct image prompts:
-    1. A high-quality infographic that visualizes the key concepts
-    2. A professional diagram or chart related to the topic
-    3. A relevant metaphorical or conceptual illustration
-    
-    For each prompt, focus on creating professional, business-appropriate visuals.
-    Keep each image prompt under 100 words but make it detailed and specific.
-    Include style guidance like "professional", "modern", "corporate style", etc.
-    DO NOT mention text that should appear in the image as DALL-E cannot reliably render text.
+def generate_image(prompt, output_path, scheduler=None):
     """
-    
-    user_message = f"Create three image prompts for a slide with title: '{title}' and content: '{text}'"
-    
-    messages_mod = [
-        SystemMessage(content=system_message),
-        HumanMessage(content=user_message)
-    ]
-
-    # Get image prompt suggestions from the model
-    response = llm.invoke(messages_mod)
-    image_prompts = response.content.strip().split("\n\n")
-    
-    # Clean up and extract the actual prompts
-    clean_prompts = []
-    current_prompt = ""
-    
-    for line in response.content.strip().split("\n"):
-        if line.startswith(("1.", "2.", "3.")):
-            if current_prompt:
-                clean_prompts.append(current_prompt.strip())
-            current_prompt = line[2:].strip()
-        elif line and current_prompt:
-            current_prompt += " " + line.strip()
-    
-    if current_prompt:
-        clean_prompts.append(current_prompt.strip())
-    
-    # Ensure we have exactly 3 prompts
-    while len(clean_prompts) < 3:
-        clean_prompts.append(f"Professional business infographic related to {title}")
-    
-    return clean_prompts[:3]
+    Generate an image with the configured backend and save it to the output path.
 
-def generate_image_with_huggingface(prompt, output_path):
-    """Generate an image using Hugging Face models and save it to the output path"""
-    try:
-        if hf_client is None:
-            print("Hugging Face client not initialized. Creating placeholder image.")
-            create_placeholder_image(prompt, output_path)
-            return False
-        
-        print(f"Generating image with Hugging Face model {HF_MODEL_ID}...")
-        
-        # Generate the image using Hugging Face Inference API
-        image = hf_client.text_to_image(
-            prompt=prompt,
-            model=HF_MODEL_ID,
-            negative_prompt="text, watermark, signature, blurry, distorted, low quality, ugly",
-            width=1024,
-            height=1024,
-        )
-        
+    With a RequestScheduler, the request is rate limited and transient
+    failures (429/503, timeouts) are retried before falling back to a
+    placeholder.
+    """
+    with span("generate_image") as current:
+        # Never write through a hard link into the image cache
+        Path(output_path).unlink(missing_ok=True)
+        current.add("request_bytes", len(prompt.encode("utf-8")))
         
-        # Save the image
-        image.save(output_path)
-        print(f"Image saved to {output_path}")
-        return True
+        cache_key = image_cache_key(image_cache_id(), prompt, HF_NEGATIVE_PROMPT,
+                                    IMAGE_WIDTH, IMAGE_HEIGHT, IMAGE_SEED)
+        if image_cache is not None and image_cache.get(cache_key, output_path):
+            print(f"Image for {output_path} served from cache")
+            current.add("cache_hits")
+            return True
         
-    except Exception as e:
-        print(f"Error generating image with Hugging Face: {e}")
-        # Create a placeholder image
-        create_placeholder_image(prompt, output_path)
-        return False
+        attempts = 0
+        try:
+            backend = get_image_backend()
+            if backend is None:
+                print("No image backend configured. Creating placeholder image.")
+                create_placeholder_image(prompt, output_path)
+                current.add("placeholders")
+                return False
+            
+            print(f"Generating image with {backend.name} backend ({backend.cache_id})...")
+            def request():
+                nonlocal attempts
+                attempts += 1
+                return backend.generate(prompt, negative_prompt=HF_NEGATIVE_PROMPT,
+                                        width=IMAGE_WIDTH, height=IMAGE_HEIGHT, seed=IMAGE_SEED)
+            data = scheduler.call(request) if scheduler is not None else request()
+            current.add("response_bytes", len(data))
+            
+            # Save the image
+            Path(output_path).write_bytes(data)
+            print(f"Image saved to {output_path}")
+            if image_cache is not None:
+                image_cache.put(cache_key, output_path)
+            return True
+            
+        except Exception as e:
+            print(f"Error generating image: {e}")
+            # Create a placeholder image
+            create_placeholder_image(prompt, output_path)
+            current.add("placeholders")
+            return False
+        finally:
+            current.add("retries", max(0, attempts - 1))
+
+# Name from before the image backend was pluggable; kept for existing callers
+generate_image_with_huggingface = generate_image
 
 def create_placeholder_image(prompt, output_path):
     """Create a placeholder image with text when DALL-E is unavailable"""
-    # Create a figure with a white background
-    plt.figure(figsize=(10, 10), facecolor='white')
-    
-    # Remove axes
-    plt.axis('off')
-    
-    # Add text to the image
-    plt.text(0.5, 0.5, f"Image placeholder\n\n{prompt[:200]}...", 
-             ha='center', va='center', wrap=True, fontsize=12)
-    
-    # Save the figure
-    plt.savefig(output_path, bbox_inches='tight', pad_inches=0.5)
-    plt.close()
+    from placeholder import save_placeholder
+    save_placeholder(prompt, output_path, size=(IMAGE_WIDTH, IMAGE_HEIGHT))
     print(f"Placeholder image saved to {output_path}")
     return True
 
-def process_presentation(input_pptx, output_folder):
-    """Process each slide in the presentation and generate images"""
+def process_presentation(input_pptx, output_folder, concurrency=1, rate=1.0,
+                         slides_per_request=MAX_SLIDES_PER_CHUNK, max_attempts=5, resume=False):
+    """
+    Process each slide in the presentation and generate images.
+
+    Progress is journaled in the output folder. With `resume=True`, slides
+    whose prompts were already planned are not sent to the model again and
+    only images that are missing, failed or placeholders are regenerated.
+    See generate_images for the other options.
+    """
     # Create output folder if it doesn't exist
     output_path = Path(output_folder)
     output_path.mkdir(exist_ok=True, parents=True)
+    journal = RunJournal(output_path, input_pptx, resume=resume)
     
-    # Load the presentation
-    prs = Presentation(input_pptx)
+    # Read slide text straight from the slide XML; chunks of slides are sent
+    # for prompt planning while later slides are still being read
+    from slide_text import iter_slide_contents
+    return generate_images(iter_slide_contents(input_pptx), output_path, journal,
+                           concurrency=concurrency, rate=rate,
+                           slides_per_request=slides_per_request, max_attempts=max_attempts)
+
+def generate_images(contents, output_folder, journal, concurrency=1, rate=1.0,
+                    slides_per_request=MAX_SLIDES_PER_CHUNK, max_attempts=5):
+    """
+    Generate images for slides given as {"title", "text"} dicts.
+
+    `contents` may be any iterable, e.g. a generator fed while the deck is
+    still being built. Image prompts are planned in batched JSON requests
+    of up to `slides_per_request` slides, run `concurrency` at a time. Images for a
+    slide are queued on a pool of `concurrency` threads as soon as its chunk
+    of prompts is back, spaced by a token bucket allowing `rate` requests
+    per second (0 disables limiting). Throttled image requests are retried
+    up to `max_attempts` times with backoff, and the number in flight
+    adapts (AIMD) between 1 and `concurrency`.
+
+    Progress goes to `journal` (a RunJournal over the output folder, which
+    is closed on return); slides and images it already has are skipped.
+    """
+    output_path = Path(output_folder)
+    output_path.mkdir(exist_ok=True, parents=True)
+    slide_contents = []
+    pending = []                # slides still to be planned, in planning order
+    def read_slides():
+        for i, content in enumerate(contents):
+            slide_contents.append(content)
+            if journal.prompts(i) is None:
+                pending.append(i)
+                yield content
+    
+    concurrency = max(1, int(concurrency))
+    scheduler = RequestScheduler(concurrency, rate, RetryPolicy(max_attempts=max_attempts))
+    
+    def run_image(i, j, prompt, image_path):
+        try:
+            ok = generate_image(prompt, image_path, scheduler)
+        except Exception:
+            journal.record_image(i, j, FAILED)
+            raise
+        journal.record_image(i, j, DONE if ok else PLACEHOLDER)
     
-    # Process each slide
-    for i, slide in enumerate(prs.slides):
-        print(f"\nProcessing slide {i+1} of {len(prs.slides)}")
+    skipped = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as image_pool:
+        image_futures = []
+        def queue_images(i, image_prompts):
+            nonlocal skipped
+            # Create folder for this slide
+            slide_folder = output_path / f"slide_{i+1}"
+            slide_folder.mkdir(exist_ok=True)
+            
+            # Queue an image for each prompt not already generated by an earlier run
+            for j, prompt in enumerate(image_prompts):
+                image_path = slide_folder / f"image_{j+1}.png"
+                if journal.image_status(i, j) == DONE and image_path.exists():
+                    skipped += 1
+                    continue
+                print(f"Queueing image {j+1} for slide {i+1} with prompt: {prompt[:50]}...")
+                image_futures.append(image_pool.submit(run_image, i, j, prompt, image_path))
         
-        # Create folder for this slide
-        slide_folder = output_path / f"slide_{i+1}"
-        slide_folder.mkdir(exist_ok=True)
+        # Generate image prompts for every slide, a chunk of slides per request
+        planner = InstrumentedLLM(get_llm(), "plan_image_prompts")
+        for k, image_prompts in iter_prompt_plans(planner, read_slides(),
+                                                  concurrency=concurrency,
+                                                  max_slides=slides_per_request):
+            i = pending[k]
+            print(f"\nPrompts ready for slide {i+1} of {len(slide_contents)}: {slide_contents[i]['title']}")
+            journal.record_prompts(i, slide_contents[i]["title"], image_prompts)
+            queue_images(i, image_prompts)
         
-        # Extract content from the slide
-        slide_content = extract_slide_content(slide)
-        print(f"Slide title: {slide_content['title']}")
+        # Slides planned by an earlier run
+        for i in sorted(set(range(len(slide_contents))) - set(pending)):
+            queue_images(i, journal.prompts(i))
         
-        # Generate image prompts for this slide
-        image_prompts = generate_image_prompt(slide_content)
-          # Generate images for each prompt
-        for j, prompt in enumerate(image_prompts):
-            image_path = slide_folder / f"image_{j+1}.png"
-            print(f"Generating image {j+1} with prompt: {prompt[:50]}...")
-            
-            # Generate the image
-            generate_image_with_huggingface(prompt, image_path)
-            
-            # Add a small delay to avoid rate limits
-            time.sleep(1)
+        try:
+            for future in as_completed(image_futures):
+                future.result()
+        finally:
+            journal.close()
             
+    if journal.resumed:
+        print(f"\nResumed: {len(slide_contents) - len(pending)} slides already planned, "
+              f"{skipped} images already generated")
+    if scheduler.retries:
+        print(f"\n{scheduler.retries} image requests retried ({scheduler.throttled} throttled); "
+              f"concurrency settled at {int(scheduler.limiter.limit)}")
     print(f"\nAll slides processed. Images saved to {output_path}")
     return output_path
 
+def add_image_arguments(parser):
+    """Add the image backend, model and cache options shared by every image-generating CLI"""
+    parser.add_argument('--hf_token', help='Hugging Face API token (can also be set as HUGGINGFACE_TOKEN environment variable)')
+    parser.add_argument('--model', default="black-forest-labs/FLUX.1-dev", 
+                       help='Hugging Face model ID to use for image generation (default: stabilityai/stable-diffusion-xl-base-1.0)')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=os.getenv("IMAGE_BACKEND", "hf"),
+                       help='Image backend: hf (Hugging Face Inference API, default), http (a JSON '
+                            'endpoint such as a self-hosted server) or stub (instant local images)')
+    parser.add_argument('--backend_url', default=os.getenv("IMAGE_BACKEND_URL"),
+                       help='Endpoint for --backend http (or IMAGE_BACKEND_URL)')
+    parser.add_argument('--backend_token', default=os.getenv("IMAGE_BACKEND_TOKEN"),
+                       help='Bearer token for --backend http (or IMAGE_BACKEND_TOKEN)')
+    parser.add_argument('--stub_latency', type=float, default=0.0,
+                       help='Seconds the stub backend waits per image, to mimic a remote service')
+    parser.add_argument('--rate', type=float, default=1.0,
+                       help='Maximum image requests per second, 0 for no limit (default: 1.0)')
+    parser.add_argument('--max_attempts', type=int, default=5,
+                       help='Attempts per image request when throttled or failing transiently (default: 5)')
+    parser.add_argument('--seed', type=int, help='Seed passed to the image model for reproducible images')
+    parser.add_argument('--cache_dir', default=os.getenv("IMAGE_CACHE_DIR", str(DEFAULT_CACHE_DIR)),
+                       help='Folder for the generated-image cache (default: ~/.cache/deck_automation/images)')
+    parser.add_argument('--cache_size_mb', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                       help='Maximum size of the image cache in MB (default: 2048)')
+    parser.add_argument('--no_cache', action='store_true', help='Always regenerate images')
+    parser.add_argument('--slides_per_request', type=int, default=MAX_SLIDES_PER_CHUNK,
+                       help=f'Slides per batched image-prompt request (default: {MAX_SLIDES_PER_CHUNK})')
+
+def configure_images(args):
+    """
+    Set up the image backend and image cache from add_image_arguments
+    options (plus --concurrency and --replay). Returns False, after printing
+    the reason, if the options are unusable.
+    """
+    global HF_MODEL_ID, IMAGE_SEED, IMAGE_CACHE_ID, image_cache
+    # Update model ID if specified
+    if args.model:
+        HF_MODEL_ID = args.model
+    IMAGE_SEED = args.seed
+    
+    # Choose the image backend
+    if args.backend == "http":
+        if not args.backend_url:
+            print("Error: --backend http needs --backend_url (or the IMAGE_BACKEND_URL environment variable)")
+            return False
+        set_image_backend(create_backend("http", url=args.backend_url, model=args.model,
+                                         token=args.backend_token, pool_size=args.concurrency))
+    elif args.backend == "stub":
+        set_image_backend(create_backend("stub", latency=args.stub_latency))
+    elif args.hf_token or HF_TOKEN:
+        if args.hf_token:
+            os.environ["HF_TOKEN"] = args.hf_token
+        set_image_backend(create_backend("hf", model=HF_MODEL_ID, token=args.hf_token or HF_TOKEN))
+    else:
+        print("Warning: No Hugging Face API token provided. Will generate placeholder images.")
+        print("To use Hugging Face models, set the HUGGINGFACE_TOKEN environment variable")
+        print("or use the --hf_token argument.")
+        set_image_backend(None)
+    IMAGE_CACHE_ID = image_cache_id()
+    
+    if args.replay and args.backend != "stub":
+        # Offline run: images come from the image cache (or the local stub) or become placeholders
+        set_image_backend(None)
+    
+    # Reuse images generated by earlier runs
+    if not args.no_cache:
+        image_cache = ImageCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 ** 2)
+    return True
+
+def configure_llm(args):
+    """Put the shared client behind the response cache chosen on the command line"""
+    global llm
+    llm = cached_llm_from_args(llm or create_llm, args,
+                               deployment=AZURE_DEPLOYMENT, temperature=TEMPERATURE)
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Generate images for PowerPoint slides')
     parser.add_argument('--input', '-i', required=True, help='Input PowerPoint file')
     parser.add_argument('--output', '-o', default='output_images', help='Output folder for images')
-    parser.add_argument('--hf_token', help='Hugging Face API token (can also be set as HUGGINGFACE_TOKEN environment variable)')
-    parser.add_argument('--model', default="black-forest-labs/FLUX.1-dev", 
-                       help='Hugging Face model ID to use for image generation (default: stabilityai/stable-diffusion-xl-base-1.0)')
+    parser.add_argument('--concurrency', '-c', type=int, default=4,
+                       help='Number of prompt/image requests to run in parallel (default: 4)')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continue an interrupted run in the same output folder: keep planned prompts '
+                            'and finished images, redo only failed or placeholder images')
+    add_image_arguments(parser)
+    add_llm_cache_arguments(parser)
+    add_report_arguments(parser, "run_metrics.json in the output folder")
     args = parser.parse_args()
     
     # Validate input file
@@ -221,24 +384,20 @@ def main():
         print(f"Error: Input file {args.input} does not exist")
         return
     
-    # Check for Hugging Face token
-    global hf_client, HF_MODEL_ID
-    if args.hf_token:
-        os.environ["HF_TOKEN"] = args.hf_token
-        hf_client = InferenceClient(token=args.hf_token)
-    elif not HF_TOKEN:
-        print("Warning: No Hugging Face API token provided. Will generate placeholder images.")
-        print("To use Hugging Face models, set the HUGGINGFACE_TOKEN environment variable")
-        print("or use the --hf_token argument.")
+    if not configure_images(args):
+        return
     
-    # Update model ID if specified
-    if args.model:
-        HF_MODEL_ID = args.model
+    # Serve repeated prompt requests from the local response cache
+    configure_llm(args)
     
     # Process the presentation
-    output_folder = process_presentation(input_pptx, args.output)
+    output_folder = process_presentation(input_pptx, args.output,
+                                         concurrency=args.concurrency, rate=args.rate,
+                                         slides_per_request=args.slides_per_request,
+                                         max_attempts=args.max_attempts, resume=args.resume)
     
     print(f"Images for all slides have been generated in {output_folder}")
+    write_report_from_args(args, output_folder / "run_metrics.json")
 
 if __name__ == "__main__":
     main()
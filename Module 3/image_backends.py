@@ -0,0 +1,198 @@
+"""
+Image generation backends for deck_image_generator.py.
+
+A backend turns a prompt (plus negative prompt, size and optional seed)
+into PNG bytes, which deck_image_generator saves as `image_N.png`. `cache_id` identifies the model behind it and
+goes into the image cache key, so images from different backends never
+mix. Heavy clients (huggingface_hub, requests, Pillow) are imported and
+built on first use.
+"""
+import base64
+import hashlib
+import io
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+class ImageBackend(ABC):
+    """Interface for image backends: subclasses implement generate()"""
+
+    name = "base"
+
+    def __init__(self, model=None):
+        self.model = model
+
+    @property
+    def cache_id(self):
+        return self.model or self.name
+
+    @abstractmethod
+    def generate(self, prompt, negative_prompt=None, width=1024, height=1024, seed=None):
+        """Return one generated image as PNG bytes"""
+
+    def close(self):
+        pass
+
+
+class HuggingFaceBackend(ImageBackend):
+    """Hugging Face Inference API through huggingface_hub's InferenceClient"""
+
+    name = "hf"
+
+    def __init__(self, model, token, provider="hf-inference"):
+        super().__init__(model)
+        self.token = token
+        self.provider = provider
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from huggingface_hub import InferenceClient
+                    self._client = InferenceClient(provider=self.provider, api_key=self.token)
+        return self._client
+
+    def generate(self, prompt, negative_prompt=None, width=1024, height=1024, seed=None):
+        extra = {} if seed is None else {"seed": seed}
+        image = self.client.text_to_image(prompt=prompt, model=self.model,
+                                          negative_prompt=negative_prompt,
+                                          width=width, height=height, **extra)
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def to_png(data):
+    """`data` as PNG bytes, re-encoding other formats (JPEG, WebP, ...)"""
+    if data.startswith(PNG_SIGNATURE):
+        return data
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(data)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def decode_image_response(content_type, content, load_json):
+    """
+    Image bytes from an HTTP response.
+
+    Accepts a raw image body, or JSON carrying base64 data as `image`,
+    `b64_json`, `images[0]` or `data[0].b64_json` (OpenAI style).
+    """
+    if content_type.startswith("image/"):
+        return content
+    body = load_json()
+    candidates = [body.get("image"), body.get("b64_json")]
+    if body.get("images"):
+        candidates.append(body["images"][0])
+    if body.get("data"):
+        candidates.append(body["data"][0].get("b64_json"))
+    for data in candidates:
+        if data:
+            return base64.b64decode(data.split(",", 1)[-1])
+    raise ValueError(f"No image in response (keys: {sorted(body)})")
+
+
+class HTTPBackend(ImageBackend):
+    """
+    A generic HTTP inference endpoint, e.g. a self-hosted server.
+
+    Every request is a JSON POST of prompt, negative_prompt, width, height,
+    seed and model. One requests.Session with a connection pool of
+    `pool_size` keep-alive connections is shared by all threads.
+    """
+
+    name = "http"
+
+    def __init__(self, url, model=None, token=None, timeout=120, pool_size=16):
+        super().__init__(model)
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache_id(self):
+        return f"{self.url}#{self.model or ''}"
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    if self.token:
+                        session.headers["Authorization"] = f"Bearer {self.token}"
+                    self._session = session
+        return self._session
+
+    def generate(self, prompt, negative_prompt=None, width=1024, height=1024, seed=None):
+        payload = {"prompt": prompt, "negative_prompt": negative_prompt, "width": width,
+                   "height": height, "seed": seed, "model": self.model}
+        response = self.session.post(self.url, timeout=self.timeout,
+                                     json={k: v for k, v in payload.items() if v is not None})
+        response.raise_for_status()
+        return to_png(decode_image_response(response.headers.get("Content-Type", ""),
+                                            response.content, response.json))
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+
+
+class StubBackend(ImageBackend):
+    """
+    Deterministic local images for offline runs, tests and benchmarks.
+
+    The colour is derived from the prompt and seed, so the same request
+    always gives the same image. `latency` seconds are slept per request to
+    mimic a remote service.
+    """
+
+    name = "stub"
+
+    def __init__(self, model=None, latency=0.0, sleep=time.sleep):
+        super().__init__(model)
+        self.latency = latency
+        self._sleep = sleep
+
+    @property
+    def cache_id(self):
+        return f"stub:{self.model}" if self.model else "stub"
+
+    def generate(self, prompt, negative_prompt=None, width=1024, height=1024, seed=None):
+        from PIL import Image
+        if self.latency:
+            self._sleep(self.latency)
+        digest = hashlib.sha256(f"{prompt}|{seed}".encode("utf-8")).digest()
+        buffer = io.BytesIO()
+        Image.new("RGB", (width, height), tuple(digest[:3])).save(buffer, "PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+BACKENDS = {
+    "hf": HuggingFaceBackend,
+    "http": HTTPBackend,
+    "stub": StubBackend,
+}
+
+
+def create_backend(kind, **options):
+    """Build the backend registered as `kind` with the given options"""
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown image backend {kind!r}; choose from {', '.join(sorted(BACKENDS))}")
+    return BACKENDS[kind](**options)
@@ -0,0 +1,91 @@
+"""
+Content-addressed on-disk cache for generated images.
+
+Images are stored as <root>/<key[:2]>/<key>.png where the key is a hash of
+everything that determines the backend's output. A file's mtime is bumped
+on every hit, and the least recently used files are evicted once the cache
+grows past its size cap.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "deck_automation" / "images"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def image_cache_key(model, prompt, negative_prompt, width, height, seed=None):
+    """Stable hash of the parameters that define a generated image"""
+    payload = json.dumps([model, prompt, negative_prompt, width, height, seed],
+                         ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def place_file(src, dest):
+    """Hard-link `src` to `dest`, falling back to a copy across filesystems"""
+    dest = Path(dest)
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class ImageCache:
+    """Size-capped LRU image store shared by all threads of a run"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root).expanduser()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    def _entries(self):
+        return self.root.glob("*/*.png")
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.png"
+
+    def get(self, key, dest):
+        """Place the cached image for `key` at `dest`; return False on a miss"""
+        path = self._path(key)
+        try:
+            os.utime(path)
+            place_file(path, dest)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key, src):
+        """Store the image at `src` under `key` and evict down to the size cap"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        shutil.copyfile(src, tmp)
+        with self._lock:
+            if path.exists():
+                self._size -= path.stat().st_size
+            os.replace(tmp, path)
+            self._size += path.stat().st_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = []
+        for p in self._entries():
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, p in entries:
+            if self._size <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            self._size -= size
@@ -0,0 +1,107 @@
+"""
+Fast placeholder images, drawn with Pillow.
+
+Used whenever a real image cannot be generated. Fonts are loaded and the
+base canvas drawn once per size; each placeholder is a copy of that canvas
+with the prompt wrapped onto it. Rendered PNGs are kept in a small
+in-memory cache keyed by prompt and size, so the same prompt failing again
+(for example during an outage, or across reruns in one process) costs a
+file write.
+"""
+import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+PLACEHOLDER_SIZE = (1024, 1024)
+MAX_PROMPT_CHARS = 200
+CACHE_ENTRIES = 256
+FONT_CANDIDATES = ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf")
+
+BACKGROUND = "white"
+BORDER = (200, 200, 200)
+HEADING_COLOUR = (60, 60, 60)
+TEXT_COLOUR = (90, 90, 90)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """A scalable font at `size` px, falling back to Pillow's built-in font"""
+    from PIL import ImageFont
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)     # FreeType-based since Pillow 10.1, so anchors work
+
+
+@lru_cache(maxsize=None)
+def base_canvas(size):
+    """The empty placeholder of a given size: background, frame and heading"""
+    from PIL import Image, ImageDraw
+    width, height = size
+    canvas = Image.new("RGB", size, BACKGROUND)
+    draw = ImageDraw.Draw(canvas)
+    margin = width // 20
+    draw.rectangle([margin // 2, margin // 2, width - margin // 2, height - margin // 2],
+                   outline=BORDER, width=max(1, width // 256))
+    heading = load_font(max(1, width // 20))
+    draw.text((width // 2, height // 4), "Image placeholder", font=heading,
+              fill=HEADING_COLOUR, anchor="mm")
+    return canvas
+
+
+def wrap_text(text, font, max_width):
+    """Greedy word wrap to lines no wider than `max_width` pixels"""
+    lines, line = [], ""
+    for word in text.split():
+        candidate = f"{line} {word}" if line else word
+        if line and font.getlength(candidate) > max_width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def render_placeholder(prompt, size=PLACEHOLDER_SIZE):
+    """Return PNG bytes of a placeholder showing (the start of) `prompt`"""
+    from PIL import ImageDraw
+    key = (prompt, size)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    width, height = size
+    canvas = base_canvas(size).copy()
+    draw = ImageDraw.Draw(canvas)
+    font_size = max(1, width // 40)
+    font = load_font(font_size)
+    line_height = int(font_size * 1.4)
+    lines = wrap_text(f"{prompt[:MAX_PROMPT_CHARS]}...", font, width * 0.8)
+    y = height // 3
+    for line in lines:
+        draw.text((width // 2, y), line, font=font, fill=TEXT_COLOUR, anchor="ma")
+        y += line_height
+
+    buffer = io.BytesIO()
+    canvas.save(buffer, "PNG", optimize=False, compress_level=1)
+    data = buffer.getvalue()
+    with _cache_lock:
+        _cache[key] = data
+        while len(_cache) > CACHE_ENTRIES:
+            _cache.popitem(last=False)
+    return data
+
+
+def save_placeholder(prompt, output_path, size=PLACEHOLDER_SIZE):
+    """Write a placeholder PNG for `prompt` to `output_path`"""
+    with open(output_path, "wb") as f:
+        f.write(render_placeholder(prompt, size))
@@ -0,0 +1,176 @@
+"""
+Batched image-prompt planning: one structured-JSON LLM request per chunk of
+slides instead of one free-text request per slide.
+"""
+import json
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PROMPTS_PER_SLIDE = 3
+MAX_CHUNK_CHARS = 12000       # slide text per request, keeps us well inside the context window
+MAX_SLIDES_PER_CHUNK = 15     # bounds the size of the JSON reply
+
+PLANNER_SYSTEM_MESSAGE = """You are an expert at creating detailed image prompts for text-to-image models.
+For EVERY PowerPoint slide provided, create three distinct image prompts:
+1. A high-quality infographic that visualizes the key concepts
+2. A professional diagram or chart related to the topic
+3. A relevant metaphorical or conceptual illustration
+
+For each prompt, focus on creating professional, business-appropriate visuals.
+Keep each image prompt under 100 words but make it detailed and specific.
+Include style guidance like "professional", "modern", "corporate style", etc.
+DO NOT mention text that should appear in the image as the model cannot reliably render text.
+
+Return ONLY valid JSON (no markdown, no code fences) with this schema:
+  {"slides": [{"slide": <slide number>, "prompts": ["prompt 1", "prompt 2", "prompt 3"]}]}
+"""
+
+
+def fallback_prompt(title):
+    """Prompt used when the model returns nothing usable for a slide"""
+    return f"Professional business infographic related to {title}"
+
+
+def _slide_block(number, slide_content):
+    text = " ".join(slide_content["text"])
+    return f"Slide {number}\nTitle: {slide_content['title']}\nContent: {text}"
+
+
+def iter_chunks(slide_contents, max_chars=MAX_CHUNK_CHARS, max_slides=MAX_SLIDES_PER_CHUNK):
+    """
+    Split slides into request-sized chunks, yielding each chunk once it is full.
+
+    `slide_contents` may be any iterable, so chunks can be planned while
+    later slides are still being read. Each chunk is a list of
+    (index, slide_content) pairs. A single slide larger than `max_chars`
+    still gets a chunk of its own.
+    """
+    current, size = [], 0
+    for i, content in enumerate(slide_contents):
+        block_len = len(_slide_block(i + 1, content))
+        if current and (size + block_len > max_chars or len(current) >= max_slides):
+            yield current
+            current, size = [], 0
+        current.append((i, content))
+        size += block_len
+    if current:
+        yield current
+
+
+def chunk_slides(slide_contents, max_chars=MAX_CHUNK_CHARS, max_slides=MAX_SLIDES_PER_CHUNK):
+    """Return the chunks of iter_chunks as a list"""
+    return list(iter_chunks(slide_contents, max_chars=max_chars, max_slides=max_slides))
+
+
+def build_planner_messages(chunk):
+    """Messages for one batched prompt-planning request"""
+    from langchain_core.messages import HumanMessage, SystemMessage
+    blocks = "\n\n".join(_slide_block(i + 1, content) for i, content in chunk)
+    user_message = f"Create three image prompts for each of these {len(chunk)} slides:\n\n{blocks}"
+    return [
+        SystemMessage(content=PLANNER_SYSTEM_MESSAGE),
+        HumanMessage(content=user_message),
+    ]
+
+
+def parse_prompt_plan(raw, chunk):
+    """
+    Validate the model's JSON reply for `chunk`.
+
+    Returns {index: [prompt, prompt, prompt]} for every slide in the chunk.
+    Slides that are missing or malformed in the reply, or prompts that are
+    empty, fall back to the title-based prompt.
+    """
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = re.sub(r"^```[a-zA-Z]*", "", raw).rstrip("`").strip()
+    try:
+        entries = json.loads(raw).get("slides", [])
+    except (ValueError, AttributeError):
+        entries = []
+
+    returned = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            number = int(entry.get("slide"))
+        except (TypeError, ValueError):
+            continue
+        prompts = entry.get("prompts")
+        if isinstance(prompts, list):
+            returned[number] = [p.strip() for p in prompts if isinstance(p, str) and p.strip()]
+
+    plan = {}
+    for i, content in chunk:
+        prompts = returned.get(i + 1, [])[:PROMPTS_PER_SLIDE]
+        while len(prompts) < PROMPTS_PER_SLIDE:
+            prompts.append(fallback_prompt(content["title"]))
+        plan[i] = prompts
+    return plan
+
+
+def plan_chunk(llm, chunk):
+    """Run one batched request; a failed request falls back for the whole chunk"""
+    try:
+        response = llm.invoke(build_planner_messages(chunk))
+        raw = response.content
+    except Exception as e:
+        print(f"Error planning prompts for slides {chunk[0][0]+1}-{chunk[-1][0]+1}: {e}")
+        raw = ""
+    return parse_prompt_plan(raw, chunk)
+
+
+def iter_prompt_plans(llm, slide_contents, concurrency=1,
+                      max_chars=MAX_CHUNK_CHARS, max_slides=MAX_SLIDES_PER_CHUNK):
+    """
+    Yield (index, prompts) for every slide as soon as its chunk is planned.
+
+    Chunks are requested in parallel on up to `concurrency` threads, so total
+    latency grows with the number of chunks, not the number of slides.
+    `slide_contents` is read on a feeder thread that submits each chunk as
+    soon as it is full, so plans for early slides are yielded while later
+    slides are still arriving. An error raised by `slide_contents` is
+    re-raised here once the chunks already submitted have been yielded.
+    """
+    finished = queue.Queue()        # done futures, then the number submitted (or the input error)
+    stop = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        def feed():
+            submitted, error = 0, None
+            try:
+                for chunk in iter_chunks(slide_contents, max_chars=max_chars, max_slides=max_slides):
+                    if stop.is_set():
+                        break
+                    pool.submit(plan_chunk, llm, chunk).add_done_callback(finished.put)
+                    submitted += 1
+            except Exception as ex:
+                error = ex
+            finished.put((submitted, error))
+
+        feeder = threading.Thread(target=feed, name="prompt-planner-feed", daemon=True)
+        feeder.start()
+        try:
+            total, error, done = None, None, 0
+            while total is None or done < total:
+                item = finished.get()
+                if isinstance(item, tuple):
+                    total, error = item
+                    continue
+                done += 1
+                for i, prompts in sorted(item.result().items()):
+                    yield i, prompts
+            if error is not None:
+                raise error
+        finally:
+            stop.set()
+            feeder.join()
+
+
+def plan_image_prompts(llm, slide_contents, **kwargs):
+    """Return a list with the three prompts for every slide, in slide order"""
+    plan = dict(iter_prompt_plans(llm, slide_contents, **kwargs))
+    return [plan[i] for i in range(len(slide_contents))]
@@ -0,0 +1,132 @@
+"""
+Checkpoint journal for resumable image generation runs.
+
+The journal lives in the output folder as JSON lines: a header naming the
+input deck (by content hash), then one record per slide when its prompts
+are planned and one per image when it is written. Every record is a single
+appended line, flushed at once, so an interrupted run leaves at worst a
+truncated last line, which is ignored on load. On start the journal is
+compacted into a fresh file and swapped in with os.replace.
+"""
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+JOURNAL_NAME = "run_journal.jsonl"
+JOURNAL_VERSION = 1
+
+# Image statuses; only DONE images are skipped on --resume
+DONE = "done"
+PLACEHOLDER = "placeholder"
+FAILED = "failed"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_journal(path):
+    """Return {"input_sha", "slides"} from a journal file, or None"""
+    state = None
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue                # a line cut short by an interrupted run
+        if "run" in record:
+            if record.get("version") != JOURNAL_VERSION:
+                return None
+            state = {"input_sha": record["input_sha"], "slides": {}}
+        elif state is None:
+            continue
+        elif "prompts" in record:
+            state["slides"][record["slide"]] = {"title": record.get("title", ""),
+                                                "prompts": record["prompts"], "images": {}}
+        elif record.get("slide") in state["slides"]:
+            state["slides"][record["slide"]]["images"][record["image"]] = record["status"]
+    return state
+
+
+class RunJournal:
+    """
+    Journal of one image generation run over one input deck.
+
+    With `resume=True` the state of an earlier run over the same input is
+    loaded; otherwise (or if the input changed) the journal starts empty.
+    Inputs that are not a file (e.g. a deck still being generated) pass
+    their own `input_sha` instead of `input_path`. Slide and image numbers
+    are 0-based indices. Thread-safe.
+    """
+
+    def __init__(self, folder, input_path=None, resume=False, input_sha=None):
+        self.path = Path(folder) / JOURNAL_NAME
+        self.input_sha = input_sha or file_sha256(input_path)
+        self.slides = {}
+        self.resumed = False
+        if resume:
+            state = load_journal(self.path)
+            if state is not None and state["input_sha"] == self.input_sha:
+                self.slides, self.resumed = state["slides"], True
+            elif state is not None:
+                print("Input presentation changed since the journaled run; starting over")
+        self._lock = threading.Lock()
+        self._compact()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _records(self):
+        yield {"run": True, "version": JOURNAL_VERSION, "input_sha": self.input_sha}
+        for i, slide in sorted(self.slides.items()):
+            yield {"slide": i, "title": slide["title"], "prompts": slide["prompts"]}
+            for j, status in sorted(slide["images"].items()):
+                yield {"slide": i, "image": j, "status": status}
+
+    def _compact(self):
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for record in self._records():
+                f.write(json.dumps(record) + "\n")
+        os.replace(tmp, self.path)
+
+    def _append(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def prompts(self, i):
+        """Prompts journaled for slide `i`, or None if it was never planned"""
+        slide = self.slides.get(i)
+        return slide["prompts"] if slide else None
+
+    def image_status(self, i, j):
+        slide = self.slides.get(i)
+        return slide["images"].get(j) if slide else None
+
+    def record_prompts(self, i, title, prompts):
+        with self._lock:
+            self.slides[i] = {"title": title, "prompts": list(prompts), "images": {}}
+            self._append({"slide": i, "title": title, "prompts": list(prompts)})
+
+    def record_image(self, i, j, status):
+        with self._lock:
+            self.slides[i]["images"][j] = status
+            self._append({"slide": i, "image": j, "status": status})
+
+    def counts(self):
+        """{status: number of images} over the whole journal"""
+        counts = {}
+        for slide in self.slides.values():
+            for status in slide["images"].values():
+                counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,78 @@
+"""
+Streaming slide-text extraction straight from the pptx zip.
+
+Only presentation.xml (for the slide order) and the ppt/slides/slideN.xml
+parts are read, each with iterparse, and slides are yielded one at a time.
+The result matches extract_slide_content in deck_image_generator.py: the
+title is the text of the first top-level placeholder with idx 0, and
+`text` holds the text of every other top-level shape, one string per
+shape with paragraphs joined by newlines.
+"""
+import posixpath
+import zipfile
+
+from lxml import etree
+
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+A_NS = "http://schemas.openxmlformats.org/drawingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_SP = f"{{{P_NS}}}sp"
+_SP_TREE = f"{{{P_NS}}}spTree"
+_PH = f"{{{P_NS}}}nvSpPr/{{{P_NS}}}nvPr/{{{P_NS}}}ph"
+_PARAGRAPHS = f"{{{P_NS}}}txBody/{{{A_NS}}}p"
+_RUN, _BREAK, _FIELD = f"{{{A_NS}}}r", f"{{{A_NS}}}br", f"{{{A_NS}}}fld"
+
+
+def _rels(zf, part):
+    folder, name = posixpath.split(part)
+    root = etree.fromstring(zf.read(posixpath.join(folder, "_rels", f"{name}.rels")))
+    return {rel.get("Id"): posixpath.normpath(posixpath.join(folder, rel.get("Target")))
+            for rel in root.iter(f"{{{REL_NS}}}Relationship")}
+
+
+def slide_parts(zf):
+    """Slide part names of an open pptx zip, in presentation order"""
+    rels = _rels(zf, "ppt/presentation.xml")
+    root = etree.fromstring(zf.read("ppt/presentation.xml"))
+    return [rels[el.get(f"{{{R_NS}}}id")] for el in root.iter(f"{{{P_NS}}}sldId")]
+
+
+def _shape_text(sp):
+    """Text of a shape as python-pptx's shape.text returns it"""
+    paragraphs = []
+    for p in sp.iterfind(_PARAGRAPHS):
+        parts = []
+        for el in p:
+            if el.tag in (_RUN, _FIELD):
+                parts.append(el.findtext(f"{{{A_NS}}}t") or "")
+            elif el.tag == _BREAK:
+                parts.append("\v")
+        paragraphs.append("".join(parts))
+    return "\n".join(paragraphs)
+
+
+def read_slide(stream):
+    """Return {"title", "text"} for one slide XML stream"""
+    title, texts = None, []
+    for _, sp in etree.iterparse(stream, events=("end",), tag=_SP):
+        if sp.getparent().tag != _SP_TREE:
+            continue            # shapes inside groups are not top-level shapes
+        text = _shape_text(sp)
+        ph = sp.find(_PH)
+        if title is None and ph is not None and ph.get("idx", "0") == "0":
+            title = text
+        if text.strip():
+            texts.append(text)
+        sp.clear()
+    title = title or ""
+    return {"title": title, "text": [text for text in texts if text != title]}
+
+
+def iter_slide_contents(pptx_path):
+    """Yield {"title", "text"} for every slide of a deck, lazily and in order"""
+    with zipfile.ZipFile(pptx_path) as zf:
+        for part in slide_parts(zf):
+            with zf.open(part) as stream:
+                yield read_slide(stream)
@@ -0,0 +1,100 @@
+import base64
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from image_backends import HTTPBackend, ImageBackend, StubBackend, create_backend
+
+
+def png(colour="blue", fmt="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), colour).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.payloads.append((payload, self.headers.get("Authorization")))
+        if self.path == "/json":
+            body = json.dumps({"data": [{"b64_json": base64.b64encode(png("red")).decode()}]}).encode()
+            content_type = "application/json"
+        elif self.path == "/jpeg":
+            body, content_type = png("green", "JPEG"), "image/jpeg"
+        else:
+            body, content_type = png(), "image/png"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def inference_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), InferenceHandler)
+    server.connections, server.payloads = 0, []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", server
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_backend_reuses_one_connection(inference_server):
+    url, server = inference_server
+    backend = HTTPBackend(f"{url}/generate", model="sdxl", token="secret")
+
+    images = [backend.generate(f"prompt {i}", width=512, height=512, seed=7) for i in range(5)]
+    backend.close()
+
+    assert images == [png()] * 5
+    assert server.connections == 1
+    payload, auth = server.payloads[0]
+    assert payload == {"prompt": "prompt 0", "width": 512, "height": 512, "seed": 7, "model": "sdxl"}
+    assert auth == "Bearer secret"
+
+
+def test_http_backend_decodes_base64_json(inference_server):
+    url, _ = inference_server
+    assert HTTPBackend(f"{url}/json").generate("prompt") == png("red")
+
+
+def test_http_backend_reencodes_jpeg_as_png(inference_server):
+    url, _ = inference_server
+    data = HTTPBackend(f"{url}/jpeg").generate("prompt")
+
+    image = Image.open(io.BytesIO(data))
+    assert image.format == "PNG" and image.size == (8, 8)
+
+
+def test_stub_backend_is_deterministic():
+    stub = create_backend("stub")
+    first = stub.generate("a chart", width=64, height=32, seed=1)
+
+    assert first == stub.generate("a chart", width=64, height=32, seed=1)
+    assert first != stub.generate("a chart", width=64, height=32, seed=2)
+    assert Image.open(io.BytesIO(first)).size == (64, 32)
+    assert StubBackend().cache_id == "stub"
+    with pytest.raises(ValueError):
+        create_backend("dalle")
+
+
+def test_backend_without_generate_cannot_be_created():
+    class Incomplete(ImageBackend):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
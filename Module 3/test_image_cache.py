@@ -0,0 +1,45 @@
+import os
+
+from image_cache import ImageCache, image_cache_key
+
+
+def write_image(path, size):
+    path.write_bytes(b"\x89PNG" + b"x" * (size - 4))
+    return path
+
+
+def test_cache_key_depends_on_every_parameter():
+    base = image_cache_key("model", "a cat", "blurry", 1024, 1024, None)
+    assert base == image_cache_key("model", "a cat", "blurry", 1024, 1024, None)
+    assert base != image_cache_key("model", "a cat", "blurry", 1024, 1024, 7)
+    assert base != image_cache_key("model", "a cat", "blurry", 512, 1024, None)
+    assert base != image_cache_key("other", "a cat", "blurry", 1024, 1024, None)
+
+
+def test_hit_places_image_in_slide_folder(tmp_path):
+    cache = ImageCache(tmp_path / "cache")
+    src = write_image(tmp_path / "generated.png", 100)
+    cache.put("ab" * 32, src)
+
+    dest = tmp_path / "slide_1" / "image_1.png"
+    dest.parent.mkdir()
+    assert cache.get("ab" * 32, dest)
+    assert dest.read_bytes() == src.read_bytes()
+    assert not cache.get("cd" * 32, tmp_path / "miss.png")
+
+
+def test_least_recently_used_images_are_evicted(tmp_path):
+    cache = ImageCache(tmp_path / "cache", max_bytes=250)
+    keys = ["aa" * 32, "bb" * 32, "cc" * 32]
+    for n, key in enumerate(keys[:2]):
+        cache.put(key, write_image(tmp_path / f"{n}.png", 100))
+        path = cache._path(key)
+        os.utime(path, (n, n))
+
+    # Touch the oldest entry so the second one becomes least recently used
+    assert cache.get(keys[0], tmp_path / "hit.png")
+    cache.put(keys[2], write_image(tmp_path / "2.png", 100))
+
+    assert cache._path(keys[0]).exists()
+    assert not cache._path(keys[1]).exists()
+    assert cache._path(keys[2]).exists()
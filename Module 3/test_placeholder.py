@@ -0,0 +1,22 @@
+import io
+
+from PIL import Image
+
+import placeholder
+
+
+def test_placeholder_is_a_png_of_the_requested_size(tmp_path):
+    out = tmp_path / "image_1.png"
+    placeholder.save_placeholder("A modern infographic about hospital triage " * 10, out, size=(512, 384))
+
+    image = Image.open(out)
+    assert image.format == "PNG" and image.size == (512, 384)
+    # Prompt text is drawn on top of the shared base canvas
+    assert image.convert("RGB").tobytes() != placeholder.base_canvas((512, 384)).tobytes()
+
+
+def test_placeholders_are_cached_by_prompt():
+    first = placeholder.render_placeholder("Cached prompt", size=(256, 256))
+    assert placeholder.render_placeholder("Cached prompt", size=(256, 256)) is first
+    assert placeholder.render_placeholder("Other prompt", size=(256, 256)) != first
+    assert Image.open(io.BytesIO(first)).size == (256, 256)
@@ -0,0 +1,87 @@
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from prompt_planner import chunk_slides, iter_prompt_plans, parse_prompt_plan, plan_image_prompts
+
+
+class FakeLLM:
+    """Answers every planning request with prompts for all but `skip` slides"""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        numbers = [int(line.split()[1]) for line in messages[1].content.splitlines()
+                   if line.startswith("Slide ")]
+        slides = [{"slide": n, "prompts": [f"p{n}-{k}" for k in range(3)]}
+                  for n in numbers if n not in self.skip]
+        return SimpleNamespace(content=json.dumps({"slides": slides}))
+
+
+def make_slides(n):
+    return [{"title": f"Title {i}", "text": [f"body {i}"]} for i in range(n)]
+
+
+def test_chunk_slides_respects_slide_and_char_limits():
+    slides = make_slides(10)
+    assert [len(c) for c in chunk_slides(slides, max_slides=4)] == [4, 4, 2]
+
+    # A tiny character budget still gives every slide its own chunk
+    assert [len(c) for c in chunk_slides(slides, max_chars=1)] == [1] * 10
+
+
+def test_plan_image_prompts_uses_one_call_per_chunk():
+    llm = FakeLLM()
+    plan = plan_image_prompts(llm, make_slides(30), concurrency=3, max_slides=10)
+
+    assert llm.calls == 3
+    assert plan[0] == ["p1-0", "p1-1", "p1-2"]
+    assert plan[29] == ["p30-0", "p30-1", "p30-2"]
+
+
+def test_missing_slides_fall_back_to_title_prompt():
+    plan = plan_image_prompts(FakeLLM(skip={2}), make_slides(3))
+
+    assert plan[1] == ["Professional business infographic related to Title 1"] * 3
+    assert plan[2][0] == "p3-0"
+
+
+def test_parse_prompt_plan_handles_fences_and_garbage():
+    chunk = list(enumerate(make_slides(2)))
+    raw = '```json\n{"slides": [{"slide": 1, "prompts": ["a", "", 3]}]}\n```'
+    plan = parse_prompt_plan(raw, chunk)
+
+    assert plan[0] == ["a",
+                       "Professional business infographic related to Title 0",
+                       "Professional business infographic related to Title 0"]
+    assert len(parse_prompt_plan("not json", chunk)[1]) == 3
+
+
+def test_plans_are_yielded_while_slides_are_still_arriving():
+    read = []
+    def slides():
+        for i, content in enumerate(make_slides(40)):
+            read.append(i)
+            yield content
+            time.sleep(0.01)
+
+    plans = iter_prompt_plans(FakeLLM(), slides(), concurrency=2, max_slides=5)
+    first, _ = next(plans)
+    assert first == 0 and len(read) < 40
+    assert sorted(i for i, _ in plans) == list(range(1, 40))
+
+
+def test_input_errors_are_raised_after_submitted_chunks():
+    def slides():
+        yield from make_slides(3)
+        raise OSError("deck unreadable")
+
+    plans = iter_prompt_plans(FakeLLM(), slides(), max_slides=2)
+    assert [next(plans)[0], next(plans)[0]] == [0, 1]
+    with pytest.raises(OSError, match="deck unreadable"):
+        next(plans)
@@ -0,0 +1,93 @@
+import json
+from types import SimpleNamespace
+
+from pptx import Presentation
+
+import deck_image_generator as dig
+from image_backends import StubBackend
+from run_journal import DONE, JOURNAL_NAME, PLACEHOLDER, RunJournal, load_journal
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        numbers = [int(line.split()[1]) for line in messages[1].content.splitlines()
+                   if line.startswith("Slide ")]
+        return SimpleNamespace(content=json.dumps(
+            {"slides": [{"slide": n, "prompts": [f"p{n}-{k}" for k in range(3)]} for n in numbers]}))
+
+
+class FlakyBackend(StubBackend):
+    """Fails every request whose prompt is in `fail`"""
+
+    def __init__(self, fail=()):
+        super().__init__()
+        self.fail = set(fail)
+        self.prompts = []
+
+    def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        if prompt in self.fail:
+            raise ValueError("backend down")
+        return super().generate(prompt, width=8, height=8)
+
+
+def make_deck(path, n):
+    prs = Presentation()
+    for i in range(n):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        slide.placeholders[1].text = f"Body {i}"
+    prs.save(path)
+    return path
+
+
+def test_journal_ignores_truncated_lines_and_changed_input(tmp_path):
+    deck = make_deck(tmp_path / "deck.pptx", 1)
+    journal = RunJournal(tmp_path, deck)
+    journal.record_prompts(0, "Slide 0", ["a", "b", "c"])
+    journal.record_image(0, 0, DONE)
+    journal.close()
+    with open(tmp_path / JOURNAL_NAME, "a") as f:
+        f.write('{"slide": 0, "image": 1, "sta')
+
+    resumed = RunJournal(tmp_path, deck, resume=True)
+    assert resumed.resumed and resumed.prompts(0) == ["a", "b", "c"]
+    assert resumed.image_status(0, 0) == DONE and resumed.image_status(0, 1) is None
+    resumed.close()
+    # Compacted on start: the broken line is gone
+    assert load_journal(tmp_path / JOURNAL_NAME)["slides"][0]["images"] == {0: DONE}
+
+    make_deck(deck, 2)
+    assert not RunJournal(tmp_path, deck, resume=True).resumed
+
+
+def test_resume_redoes_only_placeholder_images(tmp_path, monkeypatch):
+    deck = make_deck(tmp_path / "deck.pptx", 4)
+    out = tmp_path / "images"
+    llm = FakeLLM()
+    monkeypatch.setattr(dig, "llm", llm)
+    monkeypatch.setattr(dig, "image_cache", None)
+    monkeypatch.setattr(dig, "IMAGE_WIDTH", 8)
+    monkeypatch.setattr(dig, "IMAGE_HEIGHT", 8)
+    monkeypatch.setattr(dig, "image_backend", None)          # restored after the test
+    monkeypatch.setattr(dig, "_image_backend_ready", False)
+
+    dig.set_image_backend(FlakyBackend(fail={"p2-1", "p4-0"}))
+    dig.process_presentation(str(deck), out, concurrency=2, rate=0, max_attempts=1)
+    journal = load_journal(out / JOURNAL_NAME)
+    assert journal["slides"][1]["images"][1] == PLACEHOLDER
+    assert llm.calls == 1
+
+    backend = FlakyBackend()
+    dig.set_image_backend(backend)
+    dig.process_presentation(str(deck), out, concurrency=2, rate=0, max_attempts=1, resume=True)
+
+    assert sorted(backend.prompts) == ["p2-1", "p4-0"]
+    assert llm.calls == 1
+    statuses = [s for slide in load_journal(out / JOURNAL_NAME)["slides"].values()
+                for s in slide["images"].values()]
+    assert statuses == [DONE] * 12
@@ -0,0 +1,41 @@
+from pptx import Presentation
+from pptx.util import Inches
+
+from deck_image_generator import extract_slide_content
+from slide_text import iter_slide_contents
+
+
+def make_deck(path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[1])
+    slide.shapes.title.text = "AI in healthcare"
+    body = slide.placeholders[1].text_frame
+    body.text = "Diagnostics"
+    body.add_paragraph().text = "Triage"
+    body.paragraphs[1].add_line_break()
+    slide.shapes.add_textbox(0, 0, Inches(2), Inches(1)).text_frame.text = "Loose note"
+    slide.shapes.add_textbox(0, 0, Inches(2), Inches(1)).text_frame.text = "AI in healthcare"
+    group = slide.shapes.add_group_shape()
+    group.shapes.add_textbox(0, 0, Inches(1), Inches(1)).text_frame.text = "In a group"
+    slide.shapes.add_table(1, 1, 0, 0, Inches(1), Inches(1)).table.cell(0, 0).text = "Cell"
+
+    blank = prs.slides.add_slide(prs.slide_layouts[6])
+    blank.shapes.add_textbox(0, 0, Inches(2), Inches(1)).text_frame.text = "No title here"
+
+    prs.slides.add_slide(prs.slide_layouts[5]).shapes.title.text = "Only a title"
+    prs.save(path)
+    return path
+
+
+def test_matches_python_pptx_extraction(tmp_path):
+    path = make_deck(tmp_path / "deck.pptx")
+    expected = [extract_slide_content(slide) for slide in Presentation(str(path)).slides]
+
+    assert list(iter_slide_contents(path)) == expected
+    assert expected[0]["text"] == ["Diagnostics\nTriage\v", "Loose note"]
+
+
+def test_slides_are_yielded_lazily(tmp_path):
+    slides = iter_slide_contents(make_deck(tmp_path / "deck.pptx"))
+    assert next(slides)["title"] == "AI in healthcare"
+    assert next(slides) == {"title": "", "text": ["No title here"]}
@@ -0,0 +1,144 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from throttle import AdaptiveLimiter, RequestScheduler, RetryPolicy, TokenBucket, classify_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_spaces_requests_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    for _ in range(5):
+        bucket.acquire()
+
+    # First token is free, the other four arrive every 0.5 s
+    assert abs(clock.now - 2.0) < 1e-9
+
+
+def test_token_bucket_allows_initial_burst():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1.0, capacity=3, clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.now == 0.0
+
+    bucket.acquire()
+    assert abs(clock.now - 1.0) < 1e-9
+
+
+def test_token_bucket_zero_rate_is_unlimited():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0, clock=clock, sleep=clock.sleep)
+
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.now == 0.0
+
+
+def test_retry_policy_uses_retry_after_or_jittered_backoff():
+    policy = RetryPolicy(base=0.5, cap=4.0, rand=lambda: 1.0)
+    assert [policy.delay(n) for n in range(5)] == [0.5, 1.0, 2.0, 4.0, 4.0]
+    assert policy.delay(3, retry_after=1.5) == 1.5
+    assert RetryPolicy(rand=lambda: 0.25).delay(2) == 0.5
+
+
+def test_adaptive_limiter_halves_once_per_window_and_grows_back():
+    limiter = AdaptiveLimiter(8)
+    tokens = [limiter.acquire() for _ in range(8)]
+    for token in tokens:
+        limiter.release(token, throttled=True)
+    assert limiter.limit == 4
+
+    for _ in range(20):
+        limiter.release(limiter.acquire())
+    assert 6 < limiter.limit <= 8
+
+
+def test_classify_error_reads_status_and_retry_after():
+    throttled = urllib.error.HTTPError("http://x", 429, "Too Many", {"Retry-After": "2"}, None)
+    assert classify_error(throttled) == (True, True, 2.0)
+    assert classify_error(urllib.error.HTTPError("http://x", 400, "Bad", {}, None))[0] is False
+    assert classify_error(TimeoutError()) == (True, False, None)
+    assert classify_error(ValueError()) == (False, False, None)
+
+
+class QuotaServer(ThreadingHTTPServer):
+    """Serves 20 ms requests, answering 429 above `quota` concurrent requests"""
+
+    def __init__(self, quota):
+        super().__init__(("127.0.0.1", 0), QuotaHandler)
+        self.quota = quota
+        self.active = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+
+class QuotaHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            admitted = server.active < server.quota
+            server.active += admitted
+            server.rejected += not admitted
+        if not admitted:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.05")
+            self.end_headers()
+            return
+        time.sleep(0.02)
+        with server.lock:
+            server.active -= 1
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def quota_server():
+    server = QuotaServer(quota=4)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_scheduler_backs_off_to_the_server_quota(quota_server):
+    url = f"http://127.0.0.1:{quota_server.server_address[1]}/"
+    scheduler = RequestScheduler(concurrency=16, policy=RetryPolicy(max_attempts=20, base=0.01))
+
+    def fetch(_):
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.read()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda n: scheduler.call(fetch, n), range(80)))
+    elapsed = time.perf_counter() - start
+
+    assert results == [b"ok"] * 80
+    assert quota_server.rejected > 0 and scheduler.throttled > 0
+    assert scheduler.limiter.limit < 16
+    # At the quota, 80 requests of 20 ms take 0.4 s; allow for backoff and overhead
+    assert elapsed < 2.0
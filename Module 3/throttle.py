@@ -0,0 +1,204 @@
+"""
+Request throttling helpers for the image generation pipeline.
+"""
+import random
+import sys
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    `acquire()` blocks until a token is available, so callers spread out
+    evenly at the configured rate while still being allowed short bursts.
+    A `rate` of 0 (or less) disables limiting entirely.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` tokens are available, then consume them."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+# HTTP statuses worth retrying; 429 and 503 also mean "slow down"
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+def _status_and_headers(exc):
+    """HTTP status and headers carried by an exception, if any"""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "code", None) \
+        or getattr(exc, "status", None)
+    headers = getattr(response, "headers", None) or getattr(exc, "headers", None) or {}
+    return (status if isinstance(status, int) else None), headers
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (time.time() if now is None else now))
+
+
+def classify_error(exc):
+    """
+    Decide what to do about a failed request.
+
+    Returns (retryable, throttled, retry_after): throttled means the server
+    asked us to slow down (429/503), retry_after is the Retry-After delay in
+    seconds when the server sent one.
+    """
+    status, headers = _status_and_headers(exc)
+    if status is not None:
+        retry_after = parse_retry_after(headers.get("Retry-After") if hasattr(headers, "get") else None)
+        return status in RETRY_STATUSES, status in THROTTLE_STATUSES, retry_after
+    requests = sys.modules.get("requests")
+    transient = (ConnectionError, TimeoutError)
+    if requests is not None:
+        transient += (requests.ConnectionError, requests.Timeout)
+    return isinstance(exc, transient), False, None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter.
+
+    Attempt n (from 0) waits a random time in [0, min(cap, base * 2**n)],
+    or exactly the server's Retry-After when one was sent.
+    """
+
+    def __init__(self, max_attempts=5, base=0.5, cap=30.0, rand=random.random):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base = base
+        self.cap = cap
+        self._rand = rand
+
+    def delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.cap)
+        return self._rand() * min(self.cap, self.base * 2 ** attempt)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on the number of requests in flight.
+
+    Each success raises the limit by `increase / limit` (about +increase per
+    round trip of the whole window), each throttled response multiplies it
+    by `decrease`. Only one decrease happens per window: responses to
+    requests that started before the last decrease are ignored, so a burst
+    of 429s halves the limit once instead of collapsing it. A Retry-After
+    holds every new request until it has passed.
+    """
+
+    def __init__(self, initial, maximum=None, minimum=1, increase=1.0, decrease=0.5,
+                 clock=time.monotonic):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self._clock = clock
+        self._epoch = 0
+        self._hold_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Block until a slot is free; return a token to pass to release()"""
+        with self._cond:
+            while True:
+                wait = self._hold_until - self._clock()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return self._epoch
+                self._cond.wait(wait if wait > 0 else None)
+
+    def release(self, token, throttled=False, retry_after=None):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                if token == self._epoch:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    self._epoch += 1
+                if retry_after:
+                    self._hold_until = max(self._hold_until, self._clock() + retry_after)
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+            self._cond.notify_all()
+
+
+class RequestScheduler:
+    """
+    Runs requests under a rate limit, an adaptive concurrency limit and retries.
+
+    `call(fn)` takes a token from the TokenBucket and a slot from the
+    AdaptiveLimiter for every attempt, retries transient failures per the
+    RetryPolicy (sleeping outside the slot), and re-raises the last error
+    when it gives up or the error is not retryable.
+    """
+
+    def __init__(self, concurrency, rate=0, policy=None, sleep=time.sleep, clock=time.monotonic):
+        self.bucket = TokenBucket(rate, capacity=concurrency, clock=clock, sleep=sleep)
+        self.limiter = AdaptiveLimiter(concurrency, clock=clock)
+        self.policy = policy or RetryPolicy()
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.throttled = 0
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.policy.max_attempts):
+            self.bucket.acquire()
+            token = self.limiter.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                retryable, throttled, retry_after = classify_error(e)
+                self.limiter.release(token, throttled=throttled, retry_after=retry_after)
+                if not retryable or attempt == self.policy.max_attempts - 1:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                    self.throttled += throttled
+                delay = self.policy.delay(attempt, retry_after)
+                print(f"Request failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                self._sleep(delay)
+            else:
+                self.limiter.release(token)
+                return result
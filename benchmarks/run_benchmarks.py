@@ -0,0 +1,263 @@
+###############################################################################
+# run_benchmarks.py  –  Offline benchmarks for every module's main function
+###############################################################################
+"""
+Times deck generation, theming, image generation and the end-to-end
+pipeline on synthetic inputs of several sizes, with no network access:
+the chat model is a StubLLM and images come from the stub backend, both
+with configurable latency.
+
+Inputs are built once per size in the work folder. Every benchmark then
+runs in a fresh subprocess, so its peak memory (ru_maxrss) is its own and
+no cache warmed by one benchmark helps another. Results are compared with
+a saved baseline; a benchmark more than --tolerance slower (or bigger)
+than its baseline is reported as a regression and the exit status is 1.
+
+    python benchmarks/run_benchmarks.py --sizes 10 100 --save_baseline
+    python benchmarks/run_benchmarks.py --sizes 10 100
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+for module in ("Module 3", "Module 2", "Module 1"):
+    sys.path.insert(0, str(REPO / module))
+sys.path.insert(0, str(REPO))
+
+DEFAULT_SIZES = (10, 100, 1000)
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+IMAGE_PIXELS = 256            # generated image size; the stub's cost is its latency
+
+
+def prepare_inputs(workdir, slides):
+    """Build (once) the synthetic inputs for one size; returns their folder"""
+    from synthetic import make_deck, make_source_folder, make_template
+    folder = Path(workdir) / f"slides_{slides}"
+    done = folder / ".ready"
+    if not done.exists():
+        source = make_source_folder(folder / "source", slides)
+        make_deck(folder / "deck.pptx", slides, picture=next(source.glob("*.jpg")))
+        make_template(folder / "template.pptx")
+        done.touch()
+    return folder
+
+
+def _stub_llm(options, slides):
+    from synthetic import StubLLM
+    return StubLLM(slides, latency=options["llm_latency"])
+
+
+def _configure_images(options):
+    import deck_image_generator as dig
+    from image_backends import StubBackend
+    dig.image_cache = None
+    dig.IMAGE_WIDTH = dig.IMAGE_HEIGHT = IMAGE_PIXELS
+    dig.set_image_backend(StubBackend(latency=options["image_latency"]))
+    return dig
+
+
+def _generation_args(extra=()):
+    import deck_generator as dg
+    parser = argparse.ArgumentParser()
+    dg.add_generation_arguments(parser)
+    return parser.parse_args(["--no_llm_cache", *extra])
+
+
+def bench_generate_deck(inputs, out, slides, options):
+    import deck_generator as dg
+    dg.llm = _stub_llm(options, slides)
+    return dg.generate_deck(inputs / "source", "Quarterly review", str(out / "deck.pptx"),
+                            _generation_args())
+
+
+def bench_apply_template(inputs, out, slides, options):
+    from apply_template import copy_slides_to_template
+    ok = copy_slides_to_template(str(inputs / "deck.pptx"), str(inputs / "template.pptx"),
+                                 str(out / "themed.pptx"), verbose=False)
+    if not ok:
+        raise RuntimeError("copy_slides_to_template failed")
+    return slides
+
+
+def bench_apply_template_stream(inputs, out, slides, options):
+    from apply_template import ENGINES
+    _, stream_slides_to_template = ENGINES["stream"]
+    ok = stream_slides_to_template(str(inputs / "deck.pptx"), str(inputs / "template.pptx"),
+                                   str(out / "themed.pptx"), verbose=False)
+    if not ok:
+        raise RuntimeError("stream_slides_to_template failed")
+    return slides
+
+
+def bench_deck_image_generator(inputs, out, slides, options):
+    dig = _configure_images(options)
+    dig.llm = _stub_llm(options, slides)
+    dig.process_presentation(str(inputs / "deck.pptx"), out / "images",
+                             concurrency=options["concurrency"], rate=0)
+    return slides
+
+
+def bench_pipeline(inputs, out, slides, options):
+    import deck_generator as dg
+    import pipeline
+    dig = _configure_images(options)
+    dg.llm = dig.llm = _stub_llm(options, slides)
+    args = pipeline.build_parser().parse_args(
+        ["--folder", str(inputs / "source"), "--prompt", "Quarterly review", "--no_llm_cache",
+         "--template", str(inputs / "template.pptx"), "--rate", "0",
+         "--concurrency", str(options["concurrency"])])
+    return pipeline.run_pipeline(inputs / "source", "Quarterly review", out / "deck.pptx",
+                                 out / "images", args)
+
+
+BENCHMARKS = {
+    "generate_deck": bench_generate_deck,
+    "apply_template": bench_apply_template,
+    "apply_template_stream": bench_apply_template_stream,
+    "deck_image_generator": bench_deck_image_generator,
+    "pipeline": bench_pipeline,
+}
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024     # bytes on macOS
+
+
+def run_one(name, inputs, slides, options):
+    """Run one benchmark in this process; returns its measurements"""
+    import contextlib
+    import io
+    out = Path(tempfile.mkdtemp(prefix=f"{name}_", dir=inputs))
+    # Cold caches that live inside the output folder, not in the user's home
+    os.environ["THUMBNAIL_CACHE_DIR"] = str(out / "thumbnails")
+    os.environ["EMBED_CACHE_DIR"] = str(out / "embedded")
+    from common.instrumentation import recorder
+    rss_before = peak_rss_mb()
+    recorder.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        produced = BENCHMARKS[name](inputs, out, slides, options)
+    seconds = time.perf_counter() - start
+    stages = {stage: {k: v for k, v in stats.items() if k in ("count", "p50_s", "p95_s")}
+              for stage, stats in recorder.summary().items() if "count" in stats}
+    return {
+        "benchmark": name,
+        "slides": slides,
+        "produced": produced,
+        "seconds": round(seconds, 4),
+        "slides_per_s": round(slides / seconds, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "startup_rss_mb": round(rss_before, 1),
+        "stages": stages,
+    }
+
+
+def run_in_subprocess(name, inputs, slides, options):
+    command = [sys.executable, __file__, "--child", name, "--inputs", str(inputs),
+               "--sizes", str(slides), "--options", json.dumps(options)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(f"{name} ({slides} slides) failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Lines of (key, measurement, baseline, ratio, regressed) for every result with a baseline"""
+    rows = []
+    for r in results:
+        base = baseline.get(f"{r['benchmark']}@{r['slides']}")
+        if not base:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            ratio = r[metric] / base[metric] if base[metric] else 1.0
+            rows.append((f"{r['benchmark']}@{r['slides']}", metric, r[metric], base[metric],
+                         ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def load_baseline(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))["results"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_baseline(path, results, options):
+    baseline = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+        "options": options,
+        "results": {f"{r['benchmark']}@{r['slides']}": {k: r[k] for k in ("seconds", "peak_rss_mb")}
+                    for r in results},
+    }
+    Path(path).write_text(json.dumps(baseline, indent=2), encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks on synthetic decks with stub backends')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help=f'Slide counts to benchmark (default: {" ".join(map(str, DEFAULT_SIZES))})')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS),
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--llm_latency', type=float, default=0.05,
+                        help='Seconds the stub model takes per request (default: 0.05)')
+    parser.add_argument('--image_latency', type=float, default=0.02,
+                        help='Seconds the stub image backend takes per image (default: 0.02)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Image and planning requests in flight (default: 8)')
+    parser.add_argument('--workdir', help='Folder for synthetic inputs and outputs (default: a temp folder)')
+    parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                        help='Baseline file to compare with (default: benchmarks/baseline.json)')
+    parser.add_argument('--save_baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed slowdown/growth before a regression is reported (default: {DEFAULT_TOLERANCE})')
+    parser.add_argument('--results', help='Also write all measurements to this JSON file')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--inputs', help=argparse.SUPPRESS)
+    parser.add_argument('--options', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_one(args.child, Path(args.inputs), args.sizes[0], json.loads(args.options))
+        print(json.dumps(result))
+        return 0
+
+    options = {"llm_latency": args.llm_latency, "image_latency": args.image_latency,
+               "concurrency": args.concurrency}
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="deck_bench_"))
+    names = args.only or list(BENCHMARKS)
+    results = []
+    print(f"{'benchmark':<24}{'slides':>7}{'seconds':>10}{'slides/s':>10}{'peak MB':>9}")
+    for slides in args.sizes:
+        inputs = prepare_inputs(workdir, slides)
+        for name in names:
+            r = run_in_subprocess(name, inputs, slides, options)
+            results.append(r)
+            print(f"{name:<24}{slides:>7}{r['seconds']:>10.2f}{r['slides_per_s']:>10.1f}{r['peak_rss_mb']:>9.0f}")
+
+    if args.results:
+        Path(args.results).write_text(json.dumps({"options": options, "results": results}, indent=2),
+                                      encoding="utf-8")
+    regressions = [row for row in compare(results, load_baseline(args.baseline), args.tolerance) if row[5]]
+    for key, metric, value, base, ratio, _ in regressions:
+        print(f"REGRESSION {key} {metric}: {value} vs baseline {base} ({ratio:.2f}x)")
+    if args.save_baseline:
+        save_baseline(args.baseline, results, options)
+        print(f"Baseline saved to {args.baseline}")
+    elif not regressions and Path(args.baseline).exists():
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions and not args.save_baseline else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
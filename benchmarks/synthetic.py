@@ -0,0 +1,138 @@
+"""
+Synthetic inputs and a stub chat model for the offline benchmarks.
+
+Everything here is deterministic: the same slide count always produces
+the same markdown, images, decks and model replies, so timings from
+different runs (and commits) are comparable.
+"""
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+
+WORDS = ("revenue growth pipeline customer churn latency model deployment "
+         "forecast margin roadmap hiring risk platform migration quality").split()
+SLIDES_PER_MARKDOWN_FILE = 5
+SLIDES_PER_IMAGE = 3
+IMAGE_SIZE = (1600, 1200)
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def make_source_folder(folder, slides, seed=0):
+    """
+    A deck_generator input folder for `slides` slides: one markdown file
+    per SLIDES_PER_MARKDOWN_FILE slides and a photo per SLIDES_PER_IMAGE
+    slides, with every tenth photo a resized copy of the one before.
+    """
+    from PIL import Image
+    rng = random.Random(seed)
+    folder.mkdir(parents=True, exist_ok=True)
+    for f in range(max(1, slides // SLIDES_PER_MARKDOWN_FILE)):
+        sections = []
+        for s in range(SLIDES_PER_MARKDOWN_FILE):
+            bullets = "\n".join(f"- {sentence(rng)}" for _ in range(4))
+            sections.append(f"## Topic {f}.{s}\n\n{sentence(rng, 30)}\n\n{bullets}\n")
+        (folder / f"notes_{f:04d}.md").write_text(f"# Part {f}\n\n" + "\n".join(sections),
+                                                  encoding="utf-8")
+    previous = None
+    for i in range(max(1, slides // SLIDES_PER_IMAGE)):
+        if previous is not None and i % 10 == 9:
+            img = previous.resize((IMAGE_SIZE[0] // 2, IMAGE_SIZE[1] // 2))
+        else:
+            base = Image.radial_gradient("L").resize(IMAGE_SIZE)
+            noise = Image.effect_noise(IMAGE_SIZE, 20 + i % 30)
+            img = Image.merge("RGB", (base, noise, base.rotate(90 + i)))
+        img.save(folder / f"figure_{i:04d}.jpg", quality=90)
+        previous = img
+    return folder
+
+
+def make_deck(path, slides, seed=0, picture=None):
+    """A title-and-bullets deck with speaker notes; `picture` is added to every 5th slide"""
+    from pptx import Presentation
+    from pptx.util import Inches
+    rng = random.Random(seed)
+    prs = Presentation()
+    for i in range(slides):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i + 1}: {rng.choice(WORDS).capitalize()}"
+        body = slide.placeholders[1].text_frame
+        body.text = sentence(rng)
+        for _ in range(3):
+            body.add_paragraph().text = sentence(rng)
+        slide.notes_slide.notes_text_frame.text = sentence(rng, 20)
+        if picture is not None and i % 5 == 0:
+            slide.shapes.add_picture(str(picture), Inches(5.5), Inches(1.5), width=Inches(3))
+    prs.save(path)
+    return path
+
+
+def make_template(path):
+    """A template with renamed layouts, enough to exercise layout matching"""
+    from pptx import Presentation
+    prs = Presentation()
+    for layout in prs.slide_layouts:
+        layout.name = f"Branded {layout.name}"
+    prs.save(path)
+    return path
+
+
+class StubLLM:
+    """
+    Stands in for the Azure chat model in every module.
+
+    Slide requests (deck_generator) get `slides` slides referencing the
+    images they were shown; batched prompt-planning requests get three
+    prompts per listed slide; anything else (map-reduce summaries) gets a
+    short digest of the request. Each call sleeps `latency` seconds.
+    """
+
+    def __init__(self, slides, latency=0.0, sleep=time.sleep):
+        self.slides = slides
+        self.latency = latency
+        self._sleep = sleep
+
+    @staticmethod
+    def _text(messages):
+        parts = []
+        for m in messages:
+            content = m.get("content") if isinstance(m, dict) else m.content
+            for part in content if isinstance(content, list) else [content]:
+                if isinstance(part, dict):
+                    part = part.get("text", "")
+                parts.append(part)
+        return "\n".join(parts)
+
+    def reply(self, messages):
+        text = self._text(messages)
+        if "SlideBuilder" in text:
+            images = re.findall(r"\(filename: ([^;)]+)", text)
+            slides = [{"title": f"Slide {i + 1}",
+                       "points": [f"Point {i + 1}.{k}" for k in range(4)],
+                       "images": [images[i % len(images)]] if images and i % SLIDES_PER_IMAGE == 0 else [],
+                       "notes": f"Notes for slide {i + 1}"}
+                      for i in range(self.slides)]
+            return json.dumps({"slides": slides})
+        numbers = [int(n) for n in re.findall(r"^Slide (\d+)$", text, re.MULTILINE)]
+        if numbers:
+            return json.dumps({"slides": [
+                {"slide": n, "prompts": [f"Corporate illustration {k} for slide {n}" for k in range(3)]}
+                for n in numbers]})
+        headings = re.findall(r"^#+ (.+)$", text, re.MULTILINE)
+        return "\n".join(f"- {h}" for h in headings) or "- summary"
+
+    def invoke(self, messages, **kwargs):
+        if self.latency:
+            self._sleep(self.latency)
+        return SimpleNamespace(content=self.reply(messages))
+
+    def stream(self, messages, **kwargs):
+        if self.latency:
+            self._sleep(self.latency)
+        content = self.reply(messages)
+        for start in range(0, len(content), 200):
+            yield SimpleNamespace(content=content[start:start + 200])
@@ -0,0 +1,32 @@
+import json
+import subprocess
+import sys
+
+import run_benchmarks as rb
+from synthetic import StubLLM
+
+
+def test_stub_llm_answers_each_kind_of_request():
+    llm = StubLLM(slides=4)
+    deck = json.loads(llm.invoke([{"role": "system", "content": "You are SlideBuilder."},
+                                  {"role": "user", "content": [{"type": "text", "text": "(filename: a.jpg)"}]}]).content)
+    assert [s["images"] for s in deck["slides"]] == [["a.jpg"], [], [], ["a.jpg"]]
+    plan = json.loads("".join(c.content for c in llm.stream([{"content": "Slide 2\nTitle: x\n\nSlide 7"}])))
+    assert [s["slide"] for s in plan["slides"]] == [2, 7]
+
+
+def test_benchmarks_run_and_compare_with_baseline(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    command = [sys.executable, rb.__file__, "--sizes", "10", "--llm_latency", "0", "--image_latency", "0",
+               "--workdir", str(tmp_path), "--baseline", str(baseline), "--results", str(tmp_path / "r.json")]
+    subprocess.run(command + ["--save_baseline"], check=True, capture_output=True)
+
+    results = json.loads((tmp_path / "r.json").read_text())["results"]
+    assert {r["benchmark"] for r in results} == set(rb.BENCHMARKS)
+    assert all(r["produced"] == 10 and r["peak_rss_mb"] > 0 for r in results)
+    saved = rb.load_baseline(baseline)
+    assert set(saved) == {f"{name}@10" for name in rb.BENCHMARKS}
+
+    slower = [dict(r, seconds=saved[f"{r['benchmark']}@10"]["seconds"] * 2) for r in results]
+    regressed = [row for row in rb.compare(slower, saved, tolerance=0.25) if row[5]]
+    assert {row[1] for row in regressed} == {"seconds"} and len(regressed) == len(results)
@@ -0,0 +1,266 @@
+"""
+Run instrumentation shared by the deck automation modules.
+
+Stage code wraps its work in `span(name)`. A span records its wall time
+plus any counters added while it is open, either on the span object or
+with `add()` from deeper code running in the same thread (request and
+response bytes, tokens, retries, cache hits). Spans of the same name are
+aggregated by the process-wide `recorder`.
+
+At the end of a run, write_report() saves a JSON report with count, error
+count, total, p50, p95 and max seconds and the summed counters for every
+stage. It can also write a Prometheus textfile for node_exporter's
+textfile collector. Recording is always on; a span costs two perf_counter
+calls and a dict update.
+"""
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+RUN_COUNTERS = "run"          # stage name for counters added outside any span
+METRIC_PREFIX = "deck_automation"
+
+_local = threading.local()
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of a non-empty list"""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class Recorder:
+    """Thread-safe store of span durations and counters, by stage name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._start = time.perf_counter()
+            self.durations = {}
+            self.errors = {}
+            self.counters = {}
+
+    def record(self, name, seconds=None, counters=None, error=False):
+        """Add one span's results; seconds=None only adds counters"""
+        with self._lock:
+            if seconds is not None:
+                self.durations.setdefault(name, []).append(seconds)
+                self.errors[name] = self.errors.get(name, 0) + bool(error)
+            totals = self.counters.setdefault(name, {})
+            for key, n in (counters or {}).items():
+                totals[key] = totals.get(key, 0) + n
+
+    def summary(self):
+        """{stage: {count, errors, total_s, p50_s, p95_s, max_s, counters...}}"""
+        with self._lock:
+            stages = {}
+            for name in sorted(set(self.durations) | set(self.counters)):
+                stage = {}
+                durations = self.durations.get(name)
+                if durations:
+                    stage = {
+                        "count": len(durations),
+                        "errors": self.errors.get(name, 0),
+                        "total_s": round(sum(durations), 6),
+                        "p50_s": round(percentile(durations, 50), 6),
+                        "p95_s": round(percentile(durations, 95), 6),
+                        "max_s": round(max(durations), 6),
+                    }
+                stage.update(self.counters.get(name, {}))
+                stages[name] = stage
+            return stages
+
+
+recorder = Recorder()
+
+
+class Span:
+    """An open span; `add` accumulates counters reported with its duration"""
+
+    __slots__ = ("name", "counters")
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = {}
+
+    def add(self, key, n=1):
+        self.counters[key] = self.counters.get(key, 0) + n
+
+
+@contextmanager
+def span(name):
+    """Time the enclosed block as one occurrence of stage `name`"""
+    current = Span(name)
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(current)
+    error = False
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException:
+        error = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        stack.remove(current)       # generators may close spans out of order
+        recorder.record(name, seconds, current.counters, error)
+
+
+def timed(name):
+    """Decorator: every call of the function is a span named `name`"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add(key, n=1):
+    """Add to a counter of the innermost open span in this thread (or the run)"""
+    stack = getattr(_local, "stack", None)
+    if stack:
+        stack[-1].add(key, n)
+    else:
+        recorder.record(RUN_COUNTERS, counters={key: n})
+
+
+def message_bytes(messages):
+    """Approximate request size of chat messages: text and data-URL bytes"""
+    if isinstance(messages, str):
+        messages = [messages]
+    total = 0
+    for m in messages:
+        content = m.get("content", "") if isinstance(m, dict) else getattr(m, "content", m)
+        for part in content if isinstance(content, list) else [content]:
+            if isinstance(part, dict):
+                part = part.get("text") or part.get("image_url", {}).get("url", "")
+            total += len(str(part).encode("utf-8"))
+    return total
+
+
+def token_usage(response):
+    """(input_tokens, output_tokens) reported by a langchain message, else (0, 0)"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+    usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+
+
+def record_llm_call(current, messages, response, text=None):
+    """Add request/response bytes and token usage of one LLM call to span `current`"""
+    text = response.content if text is None else text
+    current.add("request_bytes", message_bytes(messages))
+    current.add("response_bytes", len(text.encode("utf-8")))
+    input_tokens, output_tokens = token_usage(response)
+    current.add("input_tokens", input_tokens)
+    current.add("output_tokens", output_tokens)
+
+
+class InstrumentedLLM:
+    """Wraps a chat model so every invoke/stream is a span named `name`"""
+
+    def __init__(self, llm, name):
+        self._llm = llm
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(self._llm, attr)
+
+    def invoke(self, messages, **kwargs):
+        with span(self._name) as current:
+            response = self._llm.invoke(messages, **kwargs)
+            record_llm_call(current, messages, response)
+        return response
+
+    def stream(self, messages, **kwargs):
+        with span(self._name) as current:
+            parts, last = [], None
+            for chunk in self._llm.stream(messages, **kwargs):
+                parts.append(chunk.content)
+                last = chunk if getattr(chunk, "usage_metadata", None) else last
+                yield chunk
+            record_llm_call(current, messages, last, text="".join(parts))
+
+
+def _write_atomic(path, text):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _metric_name(key):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", key)
+
+
+def prometheus_text(stages, job):
+    """Prometheus text exposition of a summary() for the textfile collector"""
+    seconds = f"{METRIC_PREFIX}_stage_seconds"
+    lines = [f"# HELP {seconds} Wall time of pipeline stages.", f"# TYPE {seconds} summary"]
+    counters = {}
+    for name, stage in stages.items():
+        labels = f'job="{job}",stage="{name}"'
+        if "count" in stage:
+            lines.append(f'{seconds}{{{labels},quantile="0.5"}} {stage["p50_s"]}')
+            lines.append(f'{seconds}{{{labels},quantile="0.95"}} {stage["p95_s"]}')
+            lines.append(f'{seconds}_sum{{{labels}}} {stage["total_s"]}')
+            lines.append(f'{seconds}_count{{{labels}}} {stage["count"]}')
+        for key, value in stage.items():
+            if key not in ("count", "total_s", "p50_s", "p95_s", "max_s"):
+                counters.setdefault(_metric_name(key), []).append((labels, value))
+    for key, samples in sorted(counters.items()):
+        metric = f"{METRIC_PREFIX}_{key}_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{{{labels}}} {value}" for labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def write_report(path, prometheus_path=None, job=None, **extra):
+    """Write the JSON run report (and optionally a Prometheus textfile); returns the report"""
+    job = job or Path(sys.argv[0]).stem
+    stages = recorder.summary()
+    report = {
+        "job": job,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(recorder.started)),
+        "wall_s": round(time.perf_counter() - recorder._start, 6),
+        **extra,
+        "stages": stages,
+    }
+    if path:
+        _write_atomic(path, json.dumps(report, indent=2))
+    if prometheus_path:
+        _write_atomic(prometheus_path, prometheus_text(stages, job))
+    return report
+
+
+def add_report_arguments(parser, default_help):
+    """Add the run report options shared by every CLI"""
+    parser.add_argument('--metrics',
+                        help=f'Where to write the JSON run report with per-stage timings (default: {default_help})')
+    parser.add_argument('--prometheus_textfile',
+                        help='Also write the stage metrics in Prometheus text format, e.g. for the '
+                             'node_exporter textfile collector')
+
+
+def write_report_from_args(args, default_path, **extra):
+    """Write the run report where the parsed options say and tell the user"""
+    path = args.metrics or default_path
+    write_report(path, args.prometheus_textfile, **extra)
+    print(f"Run report written to {path}")
@@ -0,0 +1,216 @@
+"""
+Persistent response cache for LLM calls, with an offline replay mode.
+
+Responses are stored in a local SQLite file keyed by a hash of the
+normalised message payload plus the deployment and temperature. Entries
+expire after a TTL and the least recently used ones are evicted once the
+store grows past its size cap. In replay mode every call must be served
+from the cache (expired entries included) and a miss raises
+CacheMissError instead of touching the network.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .instrumentation import add as add_counter
+
+DEFAULT_CACHE_PATH = Path.home() / ".cache" / "deck_automation" / "llm_cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+# OpenAI-style roles mapped onto the langchain message types
+_ROLES = {"user": "human", "assistant": "ai"}
+
+
+class CacheMissError(LookupError):
+    """Raised in replay mode when a request has no cached response"""
+
+
+def normalise_messages(messages):
+    """Reduce dict or langchain messages to a plain [{"role", "content"}] list"""
+    if isinstance(messages, str):
+        messages = [{"role": "user", "content": messages}]
+    normalised = []
+    for m in messages:
+        if isinstance(m, dict):
+            role, content = m.get("role", "user"), m.get("content", "")
+        else:
+            role, content = m.type, m.content
+        if isinstance(content, str):
+            content = content.strip()
+        normalised.append({"role": _ROLES.get(role, role), "content": content})
+    return normalised
+
+
+def llm_cache_key(messages, deployment, temperature):
+    """Stable hash of a request"""
+    payload = json.dumps(
+        {"messages": normalise_messages(messages),
+         "deployment": deployment,
+         "temperature": temperature},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response store with TTL and size-based LRU eviction"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, response TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    def _expired(self, created, now):
+        return self.ttl is not None and created < now - self.ttl
+
+    def get(self, key, allow_expired=False):
+        """Return the cached response for `key`, or None"""
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            response, created = row
+            if self._expired(created, now) and not allow_expired:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return response
+
+    def put(self, key, response):
+        """Store `response` under `key`, then evict down to the size cap"""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response, now, now, size),
+            )
+            total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall()
+            for old_key, old_size in rows:
+                if total <= self.max_bytes:
+                    break
+                self._db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= old_size
+
+    def purge_expired(self):
+        """Drop every entry older than the TTL"""
+        if self.ttl is None:
+            return
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+
+
+class CachedLLM:
+    """
+    Drop-in wrapper around a chat model's `invoke` and `stream` that
+    memoises responses.
+
+    Returns AIMessage objects so callers can keep reading `.content`. Any
+    other attribute is forwarded to the wrapped model. `llm` may also be a
+    zero-argument factory, which is only called on the first cache miss, so
+    fully cached and replay runs never build a client; pass `deployment` and
+    `temperature` explicitly in that case.
+    """
+
+    def __init__(self, llm, cache, replay=False, deployment=None, temperature=None):
+        self._llm = llm
+        self._factory = llm if callable(llm) and not hasattr(llm, "invoke") else None
+        self._lock = threading.Lock()
+        self.cache = cache
+        self.replay = replay
+        if self._factory is None:
+            deployment = deployment or getattr(llm, "deployment_name", None)
+            temperature = temperature if temperature is not None else getattr(llm, "temperature", None)
+        self.deployment = deployment
+        self.temperature = temperature
+
+    @property
+    def llm(self):
+        """The wrapped model, built from the factory on first use"""
+        if self._factory is not None:
+            with self._lock:
+                if self._factory is not None:
+                    self._llm, self._factory = self._factory(), None
+        return self._llm
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+    def invoke(self, messages, **kwargs):
+        key = llm_cache_key(messages, self.deployment, self.temperature)
+        cached = self.cache.get(key, allow_expired=self.replay)
+        if cached is not None:
+            from langchain_core.messages import AIMessage
+            add_counter("llm_cache_hits")
+            return AIMessage(content=cached)
+        add_counter("llm_cache_misses")
+        if self.replay:
+            raise CacheMissError(f"No cached LLM response for request {key[:12]} (replay mode)")
+        response = self.llm.invoke(messages, **kwargs)
+        self.cache.put(key, response.content)
+        return response
+
+    def stream(self, messages, **kwargs):
+        """Stream a reply; a hit arrives as one chunk, a miss is cached once complete"""
+        key = llm_cache_key(messages, self.deployment, self.temperature)
+        cached = self.cache.get(key, allow_expired=self.replay)
+        if cached is not None:
+            from langchain_core.messages import AIMessageChunk
+            add_counter("llm_cache_hits")
+            yield AIMessageChunk(content=cached)
+            return
+        add_counter("llm_cache_misses")
+        if self.replay:
+            raise CacheMissError(f"No cached LLM response for request {key[:12]} (replay mode)")
+        parts = []
+        for chunk in self.llm.stream(messages, **kwargs):
+            parts.append(chunk.content)
+            yield chunk
+        self.cache.put(key, "".join(parts))
+
+
+def add_llm_cache_arguments(parser):
+    """Add the LLM cache options shared by every CLI"""
+    parser.add_argument('--llm_cache', default=os.getenv("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH)),
+                        help='SQLite file for cached LLM responses (default: ~/.cache/deck_automation/llm_cache.sqlite)')
+    parser.add_argument('--llm_cache_ttl', type=float, default=DEFAULT_TTL / 3600,
+                        help='Hours before a cached LLM response expires (default: 168)')
+    parser.add_argument('--llm_cache_size_mb', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help='Maximum size of the LLM cache in MB (default: 512)')
+    parser.add_argument('--no_llm_cache', action='store_true', help='Always call the LLM')
+    parser.add_argument('--replay', action='store_true',
+                        help='Serve LLM responses only from the cache, never from the network')
+
+
+def cached_llm_from_args(llm, args, deployment=None, temperature=None):
+    """Wrap `llm` (a model or a factory) according to the parsed cache options"""
+    if args.no_llm_cache and not args.replay:
+        return llm() if callable(llm) and not hasattr(llm, "invoke") else llm
+    cache = LLMCache(args.llm_cache, ttl=args.llm_cache_ttl * 3600,
+                     max_bytes=args.llm_cache_size_mb * 1024 ** 2)
+    if not args.replay:
+        cache.purge_expired()
+    return CachedLLM(llm, cache, replay=args.replay, deployment=deployment, temperature=temperature)
@@ -0,0 +1,73 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from common import instrumentation as inst
+from common.llm_cache import CachedLLM, LLMCache
+
+
+@pytest.fixture(autouse=True)
+def fresh_recorder():
+    inst.recorder.reset()
+    yield
+    inst.recorder.reset()
+
+
+class FakeLLM:
+    def invoke(self, messages, **kwargs):
+        return SimpleNamespace(content="four", usage_metadata={"input_tokens": 12, "output_tokens": 3})
+
+
+def test_spans_aggregate_counters_and_percentiles():
+    def work(n):
+        with inst.span("stage") as current:
+            current.add("bytes", n)
+            inst.add("cache_hits")          # lands on the innermost span of this thread
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(1, 21)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    inst.add("loose")
+    with pytest.raises(ValueError), inst.span("stage"):
+        raise ValueError
+
+    stages = inst.recorder.summary()
+    assert stages["stage"]["count"] == 21 and stages["stage"]["errors"] == 1
+    assert stages["stage"]["bytes"] == 210 and stages["stage"]["cache_hits"] == 20
+    assert stages["run"] == {"loose": 1}
+    assert inst.percentile([1, 2, 3, 4, 5], 50) == 3
+    assert inst.percentile(list(range(101)), 95) == 95
+
+
+def test_llm_calls_record_bytes_tokens_and_cache_hits(tmp_path):
+    llm = inst.InstrumentedLLM(CachedLLM(FakeLLM(), LLMCache(tmp_path / "c.sqlite"),
+                                         deployment="d", temperature=0), "plan")
+    messages = [{"role": "user", "content": [{"type": "text", "text": "2+2?"},
+                                             {"type": "image_url", "image_url": {"url": "data:x"}}]}]
+    assert llm.invoke(messages).content == "four"
+    assert llm.invoke(messages).content == "four"
+
+    plan = inst.recorder.summary()["plan"]
+    assert plan["count"] == 2
+    assert plan["request_bytes"] == 2 * len("2+2?data:x")
+    assert plan["response_bytes"] == 8
+    assert (plan["input_tokens"], plan["output_tokens"]) == (12, 3)    # the hit cost no tokens
+    assert (plan["llm_cache_misses"], plan["llm_cache_hits"]) == (1, 1)
+
+
+def test_report_and_prometheus_textfile(tmp_path):
+    for seconds in (0.1, 0.2, 0.3):
+        inst.recorder.record("openai_call", seconds, {"input_tokens": 10})
+
+    report = inst.write_report(tmp_path / "run.json", tmp_path / "run.prom", job="deck", slides=3)
+
+    saved = json.loads((tmp_path / "run.json").read_text())
+    assert saved == report and saved["slides"] == 3
+    assert saved["stages"]["openai_call"]["p50_s"] == pytest.approx(0.2)
+    prom = (tmp_path / "run.prom").read_text().splitlines()
+    assert 'deck_automation_stage_seconds{job="deck",stage="openai_call",quantile="0.95"} 0.29' in prom
+    assert 'deck_automation_stage_seconds_count{job="deck",stage="openai_call"} 3' in prom
+    assert 'deck_automation_input_tokens_total{job="deck",stage="openai_call"} 30' in prom
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from common.llm_cache import CacheMissError, CachedLLM, LLMCache, llm_cache_key
+
+
+class CountingLLM:
+    deployment_name = "gpt-4o"
+    temperature = 0.7
+
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages, **kwargs):
+        self.calls += 1
+        return AIMessage(content=f"reply {self.calls}")
+
+
+def test_key_normalises_dict_and_langchain_messages():
+    as_dicts = [{"role": "system", "content": "be brief "},
+                {"role": "user", "content": "hello"}]
+    as_messages = [SystemMessage(content="be brief"), HumanMessage(content="hello")]
+
+    assert llm_cache_key(as_dicts, "gpt-4o", 0.7) == llm_cache_key(as_messages, "gpt-4o", 0.7)
+    assert llm_cache_key(as_dicts, "gpt-4o", 0.7) != llm_cache_key(as_dicts, "gpt-4o", 0.2)
+    assert llm_cache_key(as_dicts, "gpt-4o", 0.7) != llm_cache_key(as_dicts, "gpt-35", 0.7)
+
+
+def test_repeated_requests_are_served_from_cache(tmp_path):
+    inner = CountingLLM()
+    llm = CachedLLM(inner, LLMCache(tmp_path / "cache.sqlite"))
+
+    first = llm.invoke([HumanMessage(content="outline please")])
+    second = llm.invoke([HumanMessage(content="outline please")])
+
+    assert inner.calls == 1
+    assert first.content == second.content == "reply 1"
+
+
+def test_replay_serves_expired_entries_and_fails_on_miss(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite", ttl=60)
+    CachedLLM(CountingLLM(), cache).invoke("known request")
+    cache._db.execute("UPDATE responses SET created = ?", (time.time() - 3600,))
+
+    replay = CachedLLM(None, cache, replay=True, deployment="gpt-4o", temperature=0.7)
+    assert replay.invoke("known request").content == "reply 1"
+    with pytest.raises(CacheMissError):
+        replay.invoke("unknown request")
+
+    # Outside replay the expired entry is refreshed from the model
+    inner = CountingLLM()
+    CachedLLM(inner, cache).invoke("known request")
+    assert inner.calls == 1
+
+
+def test_size_cap_evicts_least_recently_used(tmp_path):
+    cache = LLMCache(tmp_path / "cache.sqlite", max_bytes=25)
+    cache.put("a", "x" * 10)
+    cache.put("b", "y" * 10)
+    assert cache.get("a") is not None
+    cache.put("c", "z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
@@ -0,0 +1,82 @@
+"""
+Startup cost of the command-line entry points.
+
+`--help` must not pull in langchain, the OpenAI/Hugging Face clients,
+python-pptx, Pillow, numpy or matplotlib: after it runs, none of them may
+be in sys.modules. Import time itself depends on the machine, so it is
+only checked as an opt-in benchmark: set STARTUP_BUDGET_MS to a budget in
+milliseconds for the modules `--help` imports (as measured by
+`python -X importtime`).
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO = Path(__file__).resolve().parent.parent
+SCRIPTS = [
+    "Module 1/deck_generator.py",
+    "Module 1/batch_generator.py",
+    "Module 3/deck_image_generator.py",
+    "pipeline.py",
+]
+HEAVY_MODULES = {"langchain_openai", "langchain_core", "openai", "huggingface_hub",
+                 "pptx", "PIL", "matplotlib", "numpy", "requests"}
+
+# Runs a script as __main__ the way `python script --help` would, then
+# prints every module that ended up loaded
+RUN_HELP = """
+import json, os, runpy, sys
+script = sys.argv[1]
+sys.argv = [script, "--help"]
+sys.path[0] = os.path.dirname(os.path.abspath(script))
+try:
+    runpy.run_path(script, run_name="__main__")
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def run(*args):
+    env = {k: v for k, v in os.environ.items() if k not in ("HF_TOKEN", "AZURE_OPENAI_ENDPOINT")}
+    result = subprocess.run([sys.executable, *args], cwd=REPO, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return result.stderr
+
+
+def modules_after_help(script):
+    """Names in sys.modules once `script --help` has run"""
+    return json.loads(run("-c", RUN_HELP, script).splitlines()[-1])
+
+
+def import_times(*args):
+    """Return {module: self time in µs} reported by -X importtime"""
+    modules = {}
+    for line in run("-X", "importtime", *args).splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(self_us)
+    return modules
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_help_skips_heavy_imports(script):
+    heavy = sorted(name for name in modules_after_help(script) if name.split(".")[0] in HEAVY_MODULES)
+    assert not heavy, f"{script} --help imports {heavy}"
+
+
+@pytest.mark.skipif(not os.environ.get("STARTUP_BUDGET_MS"), reason="set STARTUP_BUDGET_MS to benchmark")
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_help_import_time_benchmark(script):
+    budget_ms = float(os.environ["STARTUP_BUDGET_MS"])
+    interpreter = import_times("-c", "pass")
+    modules = {name: us for name, us in import_times(script, "--help").items()
+               if name not in interpreter}
+    total_ms = sum(modules.values()) / 1000
+    assert total_ms < budget_ms, f"{script} --help spends {total_ms:.0f} ms importing"
@@ -0,0 +1,154 @@
+###############################################################################
+# pipeline.py  –  Generate, theme and illustrate a deck in one process
+###############################################################################
+"""
+Runs deck generation (Module 1), template application (Module 2) and image
+generation (Module 3) in one process, without saving and re-parsing the
+deck between them.
+
+Each slide is queued for the image stage as soon as it has been added to
+the deck. Prompts are planned for every --slides_per_request slides as
+they arrive, so with --stream the first images are generated while the
+model is still writing later slides. The template is parsed while the
+slide request is running, and theming and saving the deck overlap with
+image generation.
+"""
+import argparse
+import hashlib
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent
+for module in ("Module 3", "Module 2", "Module 1"):
+    sys.path.insert(0, str(REPO / module))
+
+import deck_generator as dg
+import deck_image_generator as dig
+from common.instrumentation import add_report_arguments, write_report_from_args
+from common.llm_cache import CacheMissError
+from run_journal import RunJournal
+from slide_stream import iter_slides, until_broken
+
+
+def build_deck(folder_path, prompt, args, slide_contents):
+    """
+    Generate the deck in memory, putting each slide's text on the
+    `slide_contents` queue as soon as the slide is added. Returns the
+    Presentation.
+    """
+    from pptx import Presentation
+    openai_messages = dg.build_request(folder_path, prompt, args, dg.openai_call)
+    errors = []
+    if args.stream:
+        print("Streaming slide content from AI...")
+        slides = iter_slides(until_broken(dg.openai_stream(openai_messages), errors, fatal=CacheMissError))
+    else:
+        print("Generating slide content with AI...")
+        slides = dg.parse_slides_json(dg.openai_call(openai_messages)).get("slides", [])
+
+    prs = Presentation()
+    embedder = dg.PictureEmbedder(dpi=args.embed_dpi)
+    for n, slide_data in enumerate(slides, 1):
+        slide = dg.add_slide(prs, slide_data, folder_path, embedder)
+        slide_contents.put(dig.extract_slide_content(slide))
+        print(f"Added slide {n}: {slide_data.get('title', '')}")
+    if errors:
+        print(f"Warning: reply stream interrupted after {len(prs.slides)} slides: {errors[0]}")
+    return prs
+
+
+def run_pipeline(folder, prompt, output_path, image_folder, args):
+    """
+    Generate a deck from `folder`, theme it with args.template (if any),
+    save it to `output_path` and generate images for every slide into
+    `image_folder`. Returns the number of slides; raises
+    DeckGenerationError if no deck could be built.
+    """
+    from apply_template import prepare_template, theme_presentation
+    folder_path = Path(folder).expanduser()
+    if not folder_path.is_dir():
+        raise dg.DeckGenerationError(f"{folder} is not a valid directory")
+    image_folder = Path(image_folder)
+    image_folder.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    slide_contents = queue.Queue()
+    def queued_contents():
+        while (content := slide_contents.get()) is not None:
+            yield content
+
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="pipeline") as stages:
+        template = stages.submit(prepare_template, args.template) if args.template else None
+        run_sha = hashlib.sha256(f"{folder_path.resolve()}|{prompt}".encode("utf-8")).hexdigest()
+        images = stages.submit(dig.generate_images, queued_contents(), image_folder,
+                               RunJournal(image_folder, input_sha=run_sha),
+                               concurrency=args.concurrency, rate=args.rate,
+                               slides_per_request=args.slides_per_request,
+                               max_attempts=args.max_attempts)
+        try:
+            prs = build_deck(folder_path, prompt, args, slide_contents)
+        except CacheMissError as ex:
+            raise dg.DeckGenerationError(str(ex)) from ex
+        except Exception as ex:
+            raise dg.DeckGenerationError(f"Could not build PowerPoint: {ex}") from ex
+        finally:
+            slide_contents.put(None)        # lets the image stage finish the slides it has
+        if not len(prs.slides):
+            raise dg.DeckGenerationError("Could not build PowerPoint: no slides received")
+
+        # Theme and save while images are still being generated
+        if template is not None:
+            print(f"Applying template {args.template}...")
+            prs = theme_presentation(prs, template.result(), log=lambda *a, **k: None)
+        dg.save_presentation(prs, output_path)
+        print(f"Deck ready after {time.perf_counter() - start:.1f}s; waiting for images...")
+        images.result()
+
+    print(f"Pipeline finished in {time.perf_counter() - start:.1f}s")
+    return len(prs.slides)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description='Generate a PowerPoint deck, apply a template and generate slide images in one run')
+    parser.add_argument('--folder', '-f', required=True, help='Path to folder with markdown and images')
+    parser.add_argument('--prompt', '-p', required=True, help='Prompt describing what slides to generate')
+    parser.add_argument('--template', '-t', help='Template presentation to apply (default: none)')
+    parser.add_argument('--output', '-o', default='deck.pptx', help='Output PowerPoint file name')
+    parser.add_argument('--images', default='output_images', help='Output folder for slide images')
+    dg.add_generation_arguments(parser)
+    dig.add_image_arguments(parser)
+    add_report_arguments(parser, "<output>.metrics.json")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    if args.incremental:
+        print("Error: --incremental is not supported by the pipeline; use deck_generator.py")
+        return
+    if args.template and not Path(args.template).exists():
+        print(f"Error: Template file {args.template} does not exist")
+        return
+    if not dig.configure_images(args):
+        return
+
+    # One cached client serves both the slide and the image-prompt requests
+    dg.configure_llm(args)
+    dig.llm = dg.llm
+
+    try:
+        run_pipeline(args.folder, args.prompt, args.output, args.images, args)
+    except dg.DeckGenerationError as ex:
+        print(f"Error: {ex}")
+        return
+    finally:
+        write_report_from_args(args, f"{args.output}.metrics.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import time
+from types import SimpleNamespace
+
+from pptx import Presentation
+
+import pipeline
+from common.instrumentation import recorder
+from pipeline import dg, dig
+from image_backends import StubBackend
+from run_journal import DONE, JOURNAL_NAME, load_journal
+
+
+class FakeLLM:
+    """Answers the slide request with `slides` and planner requests with numbered prompts"""
+
+    def __init__(self, slides):
+        self.slides = slides
+        self.calls = []
+
+    def stream(self, messages):
+        self.calls.append("deck")
+        yield SimpleNamespace(content='{"slides": [')
+        for n, slide in enumerate(self.slides):
+            time.sleep(0.05)
+            yield SimpleNamespace(content=("," if n else "") + json.dumps(slide))
+        yield SimpleNamespace(content="]}")
+        self.calls.append("stream done")
+
+    def invoke(self, messages):
+        if isinstance(messages[0], dict):
+            self.calls.append("deck")
+            return SimpleNamespace(content=json.dumps({"slides": self.slides}))
+        self.calls.append("plan")
+        numbers = [int(line.split()[1]) for line in messages[1].content.splitlines()
+                   if line.startswith("Slide ")]
+        return SimpleNamespace(content=json.dumps(
+            {"slides": [{"slide": n, "prompts": [f"p{n}-{k}" for k in range(3)]} for n in numbers]}))
+
+
+def test_pipeline_themes_deck_and_generates_images_in_one_run(tmp_path, monkeypatch):
+    source = tmp_path / "notes"
+    source.mkdir()
+    (source / "notes.md").write_text("# Topic\nSome notes", encoding="utf-8")
+    template = Presentation()
+    template.slide_layouts[1].name = "Branded content"
+    template.save(tmp_path / "template.pptx")
+
+    slides = [{"title": f"Slide {i}", "points": [f"point {i}"], "notes": "n"} for i in range(4)]
+    llm = FakeLLM(slides)
+    monkeypatch.setattr(dg, "llm", llm)
+    monkeypatch.setattr(dig, "llm", llm)
+    monkeypatch.setattr(dig, "image_cache", None)
+    monkeypatch.setattr(dig, "IMAGE_WIDTH", 8)
+    monkeypatch.setattr(dig, "IMAGE_HEIGHT", 8)
+    monkeypatch.setattr(dig, "image_backend", None)
+    monkeypatch.setattr(dig, "_image_backend_ready", False)
+    dig.set_image_backend(StubBackend())
+
+    args = pipeline.build_parser().parse_args(["--folder", str(source), "--prompt", "Make slides",
+                                            "--template", str(tmp_path / "template.pptx"), "--rate", "0"])
+    recorder.reset()
+    count = pipeline.run_pipeline(source, "Make slides", tmp_path / "deck.pptx",
+                                  tmp_path / "images", args)
+
+    assert count == 4
+    deck = Presentation(tmp_path / "deck.pptx")
+    assert [s.shapes.title.text for s in deck.slides] == [f"Slide {i}" for i in range(4)]
+    assert {s.slide_layout.name for s in deck.slides} == {"Branded content"}
+    assert llm.calls == ["deck", "plan"]
+    statuses = [s for slide in load_journal(tmp_path / "images" / JOURNAL_NAME)["slides"].values()
+                for s in slide["images"].values()]
+    assert statuses == [DONE] * 12
+    assert (tmp_path / "images" / "slide_4" / "image_3.png").exists()
+    stages = recorder.summary()
+    assert stages["generate_image"]["count"] == 12
+    assert stages["plan_image_prompts"]["response_bytes"] > 0
+    assert {"read_folder", "openai_call", "theme_presentation", "save_pptx"} <= set(stages)
+
+
+def test_images_start_while_the_reply_is_still_streaming(tmp_path, monkeypatch):
+    source = tmp_path / "notes"
+    source.mkdir()
+    (source / "notes.md").write_text("# Topic\nSome notes", encoding="utf-8")
+    llm = FakeLLM([{"title": f"Slide {i}", "points": [f"point {i}"]} for i in range(8)])
+
+    class RecordingBackend(StubBackend):
+        def generate(self, prompt, **kwargs):
+            llm.calls.append("image")
+            return super().generate(prompt, **kwargs)
+
+    monkeypatch.setattr(dg, "llm", llm)
+    monkeypatch.setattr(dig, "llm", llm)
+    monkeypatch.setattr(dig, "image_cache", None)
+    monkeypatch.setattr(dig, "IMAGE_WIDTH", 8)
+    monkeypatch.setattr(dig, "IMAGE_HEIGHT", 8)
+    monkeypatch.setattr(dig, "image_backend", None)
+    monkeypatch.setattr(dig, "_image_backend_ready", False)
+    dig.set_image_backend(RecordingBackend())
+
+    args = pipeline.build_parser().parse_args(["--folder", str(source), "--prompt", "Make slides", "--stream",
+                                               "--slides_per_request", "2", "--rate", "0"])
+    assert pipeline.run_pipeline(source, "Make slides", tmp_path / "deck.pptx", tmp_path / "images", args) == 8
+
+    assert llm.calls.index("image") < llm.calls.index("stream done")
+    assert llm.calls.count("image") == 24